@@ -4,23 +4,162 @@ import json
 import threading
 import ctypes
 import psutil
-import pvporcupine
+import numpy as np
 import pyaudio
+import stat
 import struct
 import subprocess
-import pyttsx3
 import speech_recognition as sr
-import webbrowser
-import tkinter as tk
-from tkinter import filedialog
 from dotenv import load_dotenv, find_dotenv
 import datetime
 import time
 import logging
+import logging.handlers
+import contextlib
+import hashlib
+import heapq
+import hmac
+import http.server
+import bisect
+import itertools
+import math
+import queue
+import re
+import secrets
+import select
+import shutil
+import signal
+import socket
+import socketserver
+import wave
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # === Basic Logging Setup ===
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# === Pipeline Stage Timing & Metrics ===
+# Callables taking (stage, started, ended, fields) with time.perf_counter() timestamps.
+# The metrics registry below always listens; tracing and benchmarks/bench_pipeline.py add their own.
+stage_listeners = []
+
+
+def emit_stage(stage, started, ended=None, **fields):
+    for listener in list(stage_listeners):
+        try:
+            listener(stage, started, started if ended is None else ended, fields)
+        except Exception as e:
+            logging.error(f"Stage listener failed for '{stage}': {e}")
+
+
+@contextlib.contextmanager
+def timed_stage(stage, **fields):
+    started = time.perf_counter()
+    try:
+        yield fields # Callers may add fields (e.g. the outcome) while the stage runs
+    finally:
+        emit_stage(stage, started, time.perf_counter(), **fields)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # Seconds
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """Thread-safe counters and histograms, rendered in the Prometheus text exposition format."""
+
+    def __init__(self, prefix="novavoice"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._described = {} # name -> (type, help, buckets)
+        self._counters = {} # (name, labels) -> value
+        self._histograms = {} # (name, labels) -> [per-bucket counts, sum, count]
+
+    def describe(self, name, kind, help_text, buckets=LATENCY_BUCKETS):
+        self._described[name] = (kind, help_text, buckets)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        buckets = self._described[name][2]
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def counters(self):
+        with self._lock:
+            return {f"{self.prefix}_{name}{_prometheus_labels(labels)}": value
+                    for (name, labels), value in sorted(self._counters.items())}
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, [list(h[0]), h[1], h[2]]) for key, h in self._histograms.items())
+        lines = []
+        for name, (kind, help_text, buckets) in sorted(self._described.items()):
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            if kind == "counter":
+                lines.extend(f"{full_name}{_prometheus_labels(labels)} {value}"
+                             for (counter_name, labels), value in counters if counter_name == name)
+                continue
+            for (histogram_name, labels), (counts, total, count) in histograms:
+                if histogram_name != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{full_name}_bucket{_prometheus_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{full_name}_bucket{_prometheus_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{full_name}_sum{_prometheus_labels(labels)} {total}")
+                lines.append(f"{full_name}_count{_prometheus_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("stage_duration_seconds", "histogram", "Time spent in each voice pipeline stage.")
+metrics.describe("wake_process_seconds", "histogram", "Porcupine processing time per audio frame.",
+                 buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025))
+metrics.describe("wake_detections_total", "counter", "Wake words detected.")
+metrics.describe("audio_overflows_total", "counter", "Input overflows reported by the audio device.")
+metrics.describe("audio_read_errors_total", "counter", "Other errors reading from the audio device.")
+metrics.describe("audio_frames_skipped_total", "counter", "Frames a slow reader lost to the ring buffer.")
+metrics.describe("recognition_failures_total", "counter", "Commands that produced no transcript, by reason.")
+metrics.describe("exe_cache_lookups_total", "counter", "Launch-time lookups in exe_cache, by result.")
+metrics.describe("executable_lookups_total", "counter", "find_executable() results, by where the answer came from.")
+metrics.describe("tts_dropped_total", "counter", "Queued speech dropped because a new wake word arrived.")
+metrics.describe("tts_cache_lookups_total", "counter", "Spoken messages played from a cached clip or synthesized live, by result.")
+
+
+def _record_stage_metrics(stage, started, ended, fields):
+    if stage == "wake":
+        metrics.inc("wake_detections_total")
+    elif stage == "handler":
+        metrics.observe("stage_duration_seconds", ended - started, stage=stage, command=fields.get("command"))
+    else:
+        metrics.observe("stage_duration_seconds", ended - started, stage=stage)
+
+
+stage_listeners.append(_record_stage_metrics)
+
 
 # === Helper: Correct path resolution when bundled ===
 def resource_path(relative_path):
@@ -45,17 +184,16 @@ elif __file__:
 else:
     script_or_exe_dir = os.getcwd()
 
+# Per-user config folder (%APPDATA%\NovaVoice) searched for .env, the PPN file and custom commands.
+# Only probed here; nothing needs to be created just to look for files.
+appdata_roaming_path = os.getenv('APPDATA')
+app_config_dir = os.path.join(appdata_roaming_path, app_name_for_folders) if appdata_roaming_path else None
+
 # --- .env File Loading ---
 expected_dotenv_locations = []
 loaded_dotenv_path_info = {"loaded": False, "path": "Not found"}
-try:
-    appdata_roaming_path = os.getenv('APPDATA')
-    if appdata_roaming_path:
-        app_config_dir = os.path.join(appdata_roaming_path, app_name_for_folders)
-        os.makedirs(app_config_dir, exist_ok=True) # Ensure dir exists
-        expected_dotenv_locations.append(os.path.join(app_config_dir, ".env"))
-except Exception as e_appdata:
-    logging.error(f"Error determining APPDATA for .env: {e_appdata}")
+if app_config_dir:
+    expected_dotenv_locations.append(os.path.join(app_config_dir, ".env"))
 expected_dotenv_locations.append(os.path.join(script_or_exe_dir, ".env"))
 
 for dotenv_path_to_try in expected_dotenv_locations:
@@ -87,18 +225,32 @@ if not PORCUPINE_ACCESS_KEY:
     logging.error("PORCUPINE_ACCESS_KEY not set. Wake word detection fails.")
     print("WARNING: PORCUPINE_ACCESS_KEY not loaded. Ensure .env has the key.")
 
+
+def env_number(name, default, cast=float):
+    # Optional numeric settings from .env; a bad value falls back to the default
+    raw_value = os.getenv(name)
+    if raw_value is None or raw_value.strip() == "":
+        return default
+    try:
+        return cast(raw_value)
+    except ValueError:
+        logging.warning(f"Invalid value for {name}: {raw_value!r}. Using default {default}.")
+        return default
+
+
+def env_flag(name, default):
+    raw_value = os.getenv(name)
+    if raw_value is None or raw_value.strip() == "":
+        return default
+    return raw_value.strip().lower() in ("1", "true", "yes", "on")
+
+
 # --- Wake Word PPN File Loading ---
 WAKE_WORD_PPN_FILENAME = "hey google_windows.ppn" # Make sure you have this file or update
 WAKE_WORD_PPN = None
 expected_ppn_locations = []
-try:
-    appdata_roaming_path = os.getenv('APPDATA')
-    if appdata_roaming_path:
-        app_config_dir_ppn = os.path.join(appdata_roaming_path, app_name_for_folders)
-        os.makedirs(app_config_dir_ppn, exist_ok=True) # Ensure dir exists
-        expected_ppn_locations.append(os.path.join(app_config_dir_ppn, WAKE_WORD_PPN_FILENAME))
-except Exception:
-    pass
+if app_config_dir:
+    expected_ppn_locations.append(os.path.join(app_config_dir, WAKE_WORD_PPN_FILENAME))
 expected_ppn_locations.append(os.path.join(script_or_exe_dir, WAKE_WORD_PPN_FILENAME))
 try:
     # For bundled files, resource_path is crucial
@@ -139,6 +291,9 @@ except Exception as e_mkdir:
 CACHE_FILE = os.path.join(writable_user_data_dir, "exe_cache.json")
 DAILY_CACHE_FILE = os.path.join(writable_user_data_dir, "daily_text.json")
 NOTES_FILE = os.path.join(writable_user_data_dir, "notes.txt")
+EXE_INDEX_FILE = os.path.join(writable_user_data_dir, "exe_index.json")
+EXE_INDEX_MISSES_FILE = os.path.join(writable_user_data_dir, "exe_index_misses.json")
+CALIBRATION_FILE = os.path.join(writable_user_data_dir, "calibration.json")
 
 
 SEARCH_PATHS = [
@@ -183,18 +338,66 @@ def load_json_data(file_path, default_data=None):
     return default_data
 
 
+def save_json_atomic(file_path, data):
+    # Write to a temp file next to the target and rename it into place,
+    # so a crash or a concurrent reader never sees a half-written file.
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 # --- Load Custom Commands ---
+CUSTOM_ACTION_FIELDS = {"launch_executable": "exe_name", "url": "url", "shell": "shell_cmd"} # Field each action needs
+
+
+def read_custom_commands(path):
+    """Parse and check custom_commands.json. Returns (valid commands, problems with the others);
+    raises OSError or ValueError if the file can't be used at all."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f) # json.JSONDecodeError is a ValueError
+    commands = data.get("commands") if isinstance(data, dict) else None
+    if not isinstance(commands, list):
+        raise ValueError('expected an object with a "commands" list')
+    valid, problems = [], []
+    for number, cmd_config in enumerate(commands, 1):
+        if not isinstance(cmd_config, dict):
+            problems.append(f"command {number} is not an object")
+            continue
+        label = f"command {number} ('{cmd_config.get('phrase') or cmd_config.get('app_name') or '?'}')"
+        action = cmd_config.get("action")
+        required = CUSTOM_ACTION_FIELDS.get(action)
+        if required is None:
+            problems.append(f"{label} has unknown action {action!r}; use one of {', '.join(CUSTOM_ACTION_FIELDS)}")
+        elif not isinstance(cmd_config.get(required), str) or not cmd_config[required].strip():
+            problems.append(f"{label} is missing '{required}'")
+        elif not any(isinstance(cmd_config.get(key), str) and cmd_config[key].strip() for key in ("phrase", "app_name")):
+            problems.append(f"{label} needs a 'phrase' (or an 'app_name' for launch_executable)")
+        elif "timeout" in cmd_config and (isinstance(cmd_config["timeout"], bool)
+                                          or not isinstance(cmd_config["timeout"], (int, float))
+                                          or cmd_config["timeout"] <= 0):
+            problems.append(f"{label} has a 'timeout' that isn't a positive number of seconds")
+        elif not isinstance(cmd_config.get("speak_result", False), bool):
+            problems.append(f"{label} has a 'speak_result' that isn't true or false")
+        else:
+            valid.append(cmd_config)
+    return valid, problems
+
+
 custom_cmds_path_to_use = None
 custom_cmds_filename = "custom_commands.json"
 custom_cmds_locations_to_try = []
-try:
-    appdata_roaming_path_cmds = os.getenv('APPDATA')
-    if appdata_roaming_path_cmds:
-        app_config_dir_cmds = os.path.join(appdata_roaming_path_cmds, app_name_for_folders)
-        os.makedirs(app_config_dir_cmds, exist_ok=True) # Ensure dir exists
-        custom_cmds_locations_to_try.append(os.path.join(app_config_dir_cmds, custom_cmds_filename))
-except Exception:
-    pass
+if app_config_dir:
+    custom_cmds_locations_to_try.append(os.path.join(app_config_dir, custom_cmds_filename))
 custom_cmds_locations_to_try.append(os.path.join(script_or_exe_dir, custom_cmds_filename))
 
 for potential_path in custom_cmds_locations_to_try:
@@ -210,18 +413,111 @@ if not custom_cmds_path_to_use:
         f"{custom_cmds_filename} not found in primary user locations. "
         f"Will attempt to load from/create at: {custom_cmds_path_to_use} or use default empty commands."
     )
-    custom_commands_data = {"commands": []} # Default if file doesn't exist at this path either
+    custom_commands = [] # Default if file doesn't exist at this path either
 else:
-    custom_commands_data = load_json_data(custom_cmds_path_to_use, {"commands": []})
+    try:
+        custom_commands, problems = read_custom_commands(custom_cmds_path_to_use)
+        for problem in problems:
+            logging.warning(f"Skipping invalid entry in {custom_cmds_path_to_use}: {problem}")
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not load {custom_cmds_path_to_use}: {e}. Using no custom commands.")
+        custom_commands = []
+
+
+# === Trace & Metrics Export ===
+TRACE_FILE = os.getenv("NOVA_TRACE_FILE", "").strip() # JSON lines, one per timed stage (off when empty)
+TRACE_MAX_BYTES = int(env_number("NOVA_TRACE_MAX_MB", 10) * 1024 * 1024) # Rotated to .1 beyond this size
+TRACE_COUNTERS_INTERVAL = 60 # Seconds between counter snapshots written to the trace
+METRICS_PORT = env_number("NOVA_METRICS_PORT", 0, int) # Prometheus endpoint on localhost (off when 0)
+
+trace_logger = logging.getLogger("novavoice.trace")
+trace_logger.propagate = False # Trace lines stay out of the console log
+
+
+def _trace_stage(stage, started, ended, fields):
+    record = {"time": round(time.time() - (time.perf_counter() - started), 6), "stage": stage,
+              "duration_ms": round((ended - started) * 1000, 3)}
+    record.update(fields)
+    trace_logger.info(json.dumps(record, default=str))
+
+
+def _trace_counters_loop():
+    while True:
+        time.sleep(TRACE_COUNTERS_INTERVAL)
+        trace_logger.info(json.dumps({"time": round(time.time(), 6), "counters": metrics.counters()}))
+
+
+def start_trace_export(path=TRACE_FILE):
+    """Append a JSON line per timed stage (plus periodic counter snapshots) to path, written off the hot path."""
+    if not os.path.isabs(path):
+        path = os.path.join(writable_user_data_dir, path)
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=TRACE_MAX_BYTES, backupCount=1,
+                                                        encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_queue = queue.SimpleQueue()
+    trace_logger.addHandler(logging.handlers.QueueHandler(trace_queue))
+    trace_logger.setLevel(logging.INFO)
+    logging.handlers.QueueListener(trace_queue, file_handler).start() # Its own thread does the file I/O
+    stage_listeners.append(_trace_stage)
+    threading.Thread(target=_trace_counters_loop, daemon=True, name="trace-counters").start()
+    logging.info(f"Writing pipeline traces to {path}")
+
+
+class _MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Scrapes would otherwise flood the console
+
 
-custom_commands = custom_commands_data.get("commands", [])
-exe_cache = load_json_data(CACHE_FILE, {})
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    logging.info(f"Serving Prometheus metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def start_telemetry():
+    if TRACE_FILE:
+        try:
+            start_trace_export(TRACE_FILE)
+        except Exception as e:
+            logging.error(f"Could not open trace file '{TRACE_FILE}': {e}")
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_PORT)
+        except Exception as e:
+            logging.error(f"Could not start the metrics endpoint on port {METRICS_PORT}: {e}")
 
 
 # === Thread-safe TTS Setup ===
-try:
-    tts = pyttsx3.init()
-    voices = tts.getProperty('voices')
+TTS_PRIORITY_URGENT = 0 # Jumps ahead of anything already queued
+TTS_PRIORITY_NORMAL = 10
+TTS_PRIORITY_RENDER = 20 # Rendering clips for the cache, only when nothing is waiting to be said
+TTS_CACHE_ENABLED = env_flag("NOVA_TTS_CACHE", True)
+TTS_CACHE_DIR = os.path.join(writable_user_data_dir, "tts_cache")
+TTS_CACHE_MEMORY_MB = env_number("NOVA_TTS_CACHE_MB", 16.0) # Decoded clips kept in memory
+TTS_CACHE_DISK_MB = env_number("NOVA_TTS_CACHE_DISK_MB", 128.0) # Rendered clips kept on disk
+TTS_CACHE_REPEATS = 2 # Other text is cached once it has been said this many times
+TTS_CACHE_MAX_CHARS = 1000 # Longer messages are always synthesized live
+TTS_PLAYBACK_CHUNK = 4096 # Frames per write, so a clip doesn't hold the device in one call
+
+Clip = namedtuple("Clip", "pcm rate channels width")
+
+
+def _init_tts_engine():
+    import pyttsx3 # Loads the platform speech driver, so only when the worker starts
+    engine = pyttsx3.init()
+    voices = engine.getProperty('voices')
     female_voice_id = None
     # Prioritize female voices, then a known good one if available (e.g., second voice often Zira on Windows)
     for voice in voices:
@@ -230,49 +526,965 @@ try:
             female_voice_id = voice.id
             break
     if female_voice_id:
-        tts.setProperty('voice', female_voice_id)
+        engine.setProperty('voice', female_voice_id)
     elif voices: # Fallback to the first available voice if no female or specific voice found
-        tts.setProperty('voice', voices[0].id)
+        engine.setProperty('voice', voices[0].id)
+
+    engine.setProperty('rate', 160) # Adjust rate as preferred
+    engine.setProperty('volume', 1.0) # Full volume
+    return engine
 
-    tts.setProperty('rate', 160) # Adjust rate as preferred
-    tts.setProperty('volume', 1.0) # Full volume
-    tts_lock = threading.Lock()
-except Exception as e:
-    logging.error(f"Failed to initialize TTS: {e}. Voice output will be disabled.")
-    tts = None
 
+def _finished_future(result=None):
+    future = Future()
+    future.set_result(result)
+    return future
 
-def speak(text):
+
+class TTSClipCache:
+    """Speech rendered once to WAV files, keyed on (text, voice, rate), with an LRU of decoded clips.
+
+    The files live in TTS_CACHE_DIR and are pruned oldest-first past the disk budget; decoded
+    clips are evicted least recently used past the memory budget.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, memory_budget=int(TTS_CACHE_MEMORY_MB * 1e6),
+                 disk_budget=int(TTS_CACHE_DISK_MB * 1e6)):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._clips = OrderedDict() # key -> Clip, least recently used first
+        self._memory_bytes = 0
+        self._files = None # key -> [size, last used], read from the directory on first use
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, voice, rate):
+        return hashlib.sha1(f"{voice}\n{rate}\n{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def _scan_locked(self):
+        if self._files is not None:
+            return
+        self._files = {}
+        with contextlib.suppress(OSError):
+            os.makedirs(self.directory, exist_ok=True)
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".wav") and not entry.name.startswith("render-") and entry.is_file():
+                        info = entry.stat()
+                        self._files[entry.name[:-4]] = [info.st_size, info.st_mtime]
+
+    def has(self, key):
+        with self._lock:
+            self._scan_locked()
+            return key in self._files
+
+    def get(self, key):
+        with self._lock:
+            self._scan_locked()
+            clip = self._clips.get(key)
+            if clip is not None:
+                self._clips.move_to_end(key)
+                self._files.get(key, [0, 0])[1] = time.time()
+                return clip
+            if key not in self._files:
+                return None
+        try:
+            clip = self._read(self.path(key))
+        except Exception as e: # Deleted or damaged since the scan: render it again later
+            logging.warning(f"Dropping unreadable TTS clip {key}: {e}")
+            self.discard(key)
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(self.path(key))
+        self._remember(key, clip)
+        return clip
+
+    def add(self, key, rendered_path):
+        """Move a freshly rendered WAV into the cache; raises if it isn't playable PCM."""
+        clip = self._read(rendered_path)
+        os.replace(rendered_path, self.path(key))
+        with self._lock:
+            self._scan_locked()
+            self._files[key] = [os.path.getsize(self.path(key)), time.time()]
+            over = sum(size for size, _ in self._files.values()) - self.disk_budget
+            stale = []
+            for old_key, (size, _) in sorted(self._files.items(), key=lambda item: item[1][1]):
+                if over <= 0:
+                    break
+                if old_key != key:
+                    stale.append(old_key)
+                    over -= size
+        for old_key in stale:
+            self.discard(old_key)
+        self._remember(key, clip)
+        return clip
+
+    def discard(self, key):
+        with self._lock:
+            if self._files is not None:
+                self._files.pop(key, None)
+            clip = self._clips.pop(key, None)
+            if clip is not None:
+                self._memory_bytes -= len(clip.pcm)
+        with contextlib.suppress(OSError):
+            os.remove(self.path(key))
+
+    def _remember(self, key, clip):
+        with self._lock:
+            if key in self._clips or len(clip.pcm) > self.memory_budget:
+                return
+            self._clips[key] = clip
+            self._memory_bytes += len(clip.pcm)
+            while self._memory_bytes > self.memory_budget:
+                _, evicted = self._clips.popitem(last=False)
+                self._memory_bytes -= len(evicted.pcm)
+
+    @staticmethod
+    def _read(path):
+        with wave.open(path, "rb") as wav_file: # Not a WAV (nsss writes AIFF) raises wave.Error
+            clip = Clip(wav_file.readframes(wav_file.getnframes()), wav_file.getframerate(),
+                        wav_file.getnchannels(), wav_file.getsampwidth())
+        if not clip.pcm:
+            raise ValueError("empty clip")
+        return clip
+
+
+class TTSWorker:
+    """Owns the pyttsx3 engine on a dedicated thread and speaks queued messages in priority order.
+
+    Messages with a cached clip are played straight to the output device instead of being
+    synthesized again; clips are rendered on this thread whenever it has nothing to say.
+    """
+
+    def __init__(self, clip_cache=None):
+        self.engine = None
+        self.clip_cache = clip_cache
+        self._queue = queue.PriorityQueue() # (priority, sequence, text, future, queued_at)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._last = None # (text, future, priority) of the most recent request, for coalescing
+        self._ready = threading.Event()
+        self._voice = None # (voice id, rate) the clips were rendered with
+        self._pa = None
+        self._streams = {} # (rate, channels, width) -> open output stream
+        self._output_lock = threading.Lock()
+        self._said = Counter() # Live-synthesized text -> times said, for caching repeats
+        self._rendering = set() # Texts queued for rendering
+
+    def start(self, timeout=10.0):
+        threading.Thread(target=self._run, daemon=True, name="tts").start()
+        self._ready.wait(timeout)
+        return self.engine
+
+    def say(self, text, priority=TTS_PRIORITY_NORMAL):
+        with self._lock:
+            # Identical back-to-back messages share one utterance, unless the repeat is more urgent than the queued one
+            if self._last and self._last[0] == text and self._last[2] <= priority and not self._last[1].done():
+                return self._last[1]
+            future = Future()
+            self._last = (text, future, priority)
+            self._queue.put((priority, next(self._sequence), text, future, time.perf_counter()))
+        return future
+
+    def attach_output(self, pa):
+        """Play cached clips through this PyAudio instance (the one the microphone is open on)."""
+        self._pa = pa
+
+    def warm(self, phrases):
+        """Render any of phrases not cached yet, in the background."""
+        if self.clip_cache is None or self._pa is None:
+            return 0
+        return sum(1 for text in dict.fromkeys(phrases) if self._queue_render(text))
+
+    def _queue_render(self, text):
+        if not self._voice or len(text) > TTS_CACHE_MAX_CHARS:
+            return False
+        with self._lock:
+            if text in self._rendering or self.clip_cache.has(self.clip_cache.key(text, *self._voice)):
+                return False
+            self._rendering.add(text)
+            self._queue.put((TTS_PRIORITY_RENDER, next(self._sequence), text, None, time.perf_counter()))
+        return True
+
+    def wait_until_quiet(self, timeout=None):
+        """Wait until the most recently queued message has been spoken (or dropped)."""
+        with self._lock:
+            last = self._last
+        if last:
+            with contextlib.suppress(Exception): # Cancelled or timed out: nothing more to wait for
+                last[1].result(timeout)
+
+    def cancel_pending(self):
+        """Drop everything queued but not yet being spoken."""
+        dropped, renders = 0, []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[3] is None: # Clip rendering isn't speech; keep it for later
+                renders.append(item)
+            elif item[3].cancel():
+                dropped += 1
+        for item in renders:
+            self._queue.put(item)
+        if dropped:
+            logging.info(f"Dropped {dropped} queued TTS message(s).")
+            metrics.inc("tts_dropped_total", dropped)
+
+    def _run(self):
+        # pyttsx3 (SAPI/COM on Windows) must be created and driven from the same thread
+        try:
+            self.engine = _init_tts_engine()
+            if self.clip_cache is not None:
+                self._voice = (self.engine.getProperty("voice"), self.engine.getProperty("rate"))
+        except Exception as e:
+            logging.error(f"Failed to initialize TTS: {e}. Voice output will be disabled.")
+        finally:
+            self._ready.set()
+        if self.engine is None:
+            return
+        while True:
+            _, _, text, future, queued_at = self._queue.get()
+            if future is None:
+                self._render(text)
+                continue
+            if not future.set_running_or_notify_cancel(): # Cancelled while queued
+                continue
+            try:
+                logging.info(f"SPEAKING: {text}")
+                clip = self._cached_clip(text)
+                emit_stage("tts_start", queued_at, time.perf_counter(), text=text, cached=clip is not None)
+                with timed_stage("speak", chars=len(text), cached=clip is not None):
+                    if clip is None or not self._play(clip):
+                        self.engine.say(text)
+                        self.engine.runAndWait()
+                        self._note_live(text)
+                future.set_result(True)
+            except RuntimeError as e: # Specific error common with pyttsx3 if interrupted
+                logging.error(f"TTS RuntimeError: {e}")
+                future.set_result(False)
+            except Exception as e: # Catch any other TTS errors
+                logging.error(f"General TTS error: {e}")
+                future.set_result(False)
+
+    def _cached_clip(self, text):
+        if self.clip_cache is None or self._voice is None or self._pa is None:
+            return None
+        clip = self.clip_cache.get(self.clip_cache.key(text, *self._voice))
+        metrics.inc("tts_cache_lookups_total", result="hit" if clip else "miss")
+        return clip
+
+    def _play(self, clip):
+        stream_key = (clip.rate, clip.channels, clip.width)
+        with self._output_lock:
+            if self._pa is None: # Closed while this was queued
+                return False
+            return self._play_locked(clip, stream_key)
+
+    def _play_locked(self, clip, stream_key):
+        try:
+            stream = self._streams.get(stream_key)
+            if stream is None:
+                stream = self._streams[stream_key] = self._pa.open(
+                    format=self._pa.get_format_from_width(clip.width), channels=clip.channels,
+                    rate=clip.rate, output=True)
+            step = TTS_PLAYBACK_CHUNK * clip.channels * clip.width
+            for start in range(0, len(clip.pcm), step):
+                stream.write(clip.pcm[start:start + step])
+            return True
+        except Exception as e: # The device went away: say it live this time
+            logging.error(f"Error playing cached speech, synthesizing instead: {e}")
+            stream = self._streams.pop(stream_key, None)
+            if stream is not None:
+                with contextlib.suppress(Exception):
+                    stream.close()
+            return False
+
+    def _note_live(self, text):
+        if self.clip_cache is None or self._pa is None:
+            return
+        if len(self._said) > 1000: # Only recent repeats count
+            self._said.clear()
+        self._said[text] += 1
+        if self._said[text] >= TTS_CACHE_REPEATS:
+            self._queue_render(text)
+
+    def _render(self, text):
+        rendered_path = os.path.join(self.clip_cache.directory, f"render-{os.getpid()}.wav")
+        try:
+            os.makedirs(self.clip_cache.directory, exist_ok=True)
+            with timed_stage("tts_render", chars=len(text)):
+                self.engine.save_to_file(text, rendered_path)
+                self.engine.runAndWait()
+            self.clip_cache.add(self.clip_cache.key(text, *self._voice), rendered_path)
+        except Exception as e:
+            # A driver that can't write WAV files won't manage the next one either
+            logging.warning(f"Could not cache speech for '{text[:40]}', synthesizing everything live: {e}")
+            self.clip_cache = None
+            with contextlib.suppress(OSError):
+                os.remove(rendered_path)
+        finally:
+            with self._lock:
+                self._rendering.discard(text)
+
+    def close(self, timeout=5.0):
+        # Waits for a clip that's still playing, so the device isn't closed under it
+        locked = self._output_lock.acquire(timeout=timeout)
+        try:
+            for stream in list(self._streams.values()):
+                with contextlib.suppress(Exception):
+                    stream.close()
+            self._streams.clear()
+            self._pa = None
+        finally:
+            if locked:
+                self._output_lock.release()
+
+
+tts_worker = TTSWorker(TTSClipCache() if TTS_CACHE_ENABLED else None)
+tts = None # The pyttsx3 engine once start_tts() has run; speak() prints until then
+
+
+def start_tts():
+    global tts
+    if tts is None:
+        tts = tts_worker.start()
+    return tts
+
+
+compound_part = threading.local() # .replies: what one part of a compound command said, spoken later with the rest
+
+
+def speak(text, urgent=False):
+    """Queue text for speaking and return a Future that resolves once it has been spoken."""
+    replies = getattr(compound_part, "replies", None)
+    if replies is not None and not urgent: # Merged into one response by run_intents
+        replies.append(text)
+        return _finished_future(True)
     if not tts:
         logging.warning(f"TTS not available. Intended to speak: {text}")
         print(f"ASSISTANT (TTS Disabled): {text}") # Fallback to print if TTS fails
-        return
-    with tts_lock: # Ensure thread-safe TTS operations
-        try:
-            logging.info(f"SPEAKING: {text}")
-            tts.say(text)
-            tts.runAndWait()
-        except RuntimeError as e: # Specific error common with pyttsx3 if interrupted
-            logging.error(f"TTS RuntimeError: {e}")
-        except Exception as e: # Catch any other TTS errors
-            logging.error(f"General TTS error: {e}")
+        return _finished_future(False)
+    return tts_worker.say(text, TTS_PRIORITY_URGENT if urgent else TTS_PRIORITY_NORMAL)
+
+
+def speak_and_wait(text, timeout=15.0, urgent=False):
+    # For callers that must not continue until the message has been heard (sleep, shutdown, listening)
+    try:
+        return speak(text, urgent).result(timeout)
+    except Exception as e: # Timed out, or dropped by a new wake word
+        logging.warning(f"Gave up waiting for speech '{text}': {e!r}")
+        return False
 
 
 # === Speech Recognizer ===
-recognizer = sr.Recognizer()
-try:
-    mic = sr.Microphone()
-    with mic as source:
-        logging.info("Adjusting for ambient noise, please wait...")
-        recognizer.adjust_for_ambient_noise(source, duration=1) # Adjust for 1 second
-        logging.info("Ambient noise adjustment complete.")
-except Exception as e:
-    logging.error(f"Microphone not found or speech_recognition library issue: {e}")
-    if tts:
-        speak("I can't access a microphone. Please check your microphone settings.")
-    else:
-        print("ERROR: Microphone not found or speech_recognition library issue.")
-    mic = None # Indicate microphone is not available
+recognizer = sr.Recognizer() # energy_threshold is owned by noise_calibration (see Ambient Noise Calibration)
+
+
+# === Shared Audio Capture ===
+AUDIO_SAMPLE_RATE = 16000 # Porcupine's rate; wake word and command recognition share the stream
+AUDIO_SAMPLE_WIDTH = 2 # Bytes per int16 sample
+AUDIO_BUFFER_SECONDS = env_number("NOVA_AUDIO_BUFFER_SECONDS", 20.0) # Ring buffer length
+# Porcupine reports the wake word a little after it ends, so the recognizer also gets this much audio from
+# before the detection point: the end of the wake word, and anything said straight after it in one breath
+PREROLL_MS = env_number("NOVA_PREROLL_MS", 150, int)
+CONTINUATION_WINDOW_MS = 250 # How long after the wake word we look for speech that runs straight on
+AUDIO_REPLAY_FILES = [p for p in os.getenv("NOVA_AUDIO_REPLAY", "").split(os.pathsep) if p] # WAVs instead of the mic
+
+
+def frame_rms(pcm):
+    if not pcm:
+        return 0.0
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+class AudioRingBuffer:
+    """Fixed-size ring of PCM frames written by the capture thread and read through cursors."""
+
+    def __init__(self, capacity_frames):
+        self.capacity = capacity_frames
+        self.closed = False
+        self._frames = [None] * capacity_frames
+        self._next_seq = 0 # Sequence number the next written frame gets
+        self._cond = threading.Condition()
+
+    @property
+    def latest_seq(self):
+        return self._next_seq
+
+    def write(self, frame):
+        with self._cond:
+            self._frames[self._next_seq % self.capacity] = frame
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def read(self, seq, timeout=None):
+        """Return (frame, seq) for frame number seq, waiting for it. frame is None when closed or timed out."""
+        with self._cond:
+            while seq >= self._next_seq:
+                if self.closed or not self._cond.wait(timeout):
+                    return None, seq
+            oldest = self._next_seq - self.capacity
+            if seq < oldest: # The reader fell behind and the frame was overwritten
+                seq = oldest
+            return self._frames[seq % self.capacity], seq
+
+    def cursor(self, start_seq=None):
+        return AudioCursor(self, self._next_seq if start_seq is None else max(0, start_seq))
+
+
+class AudioCursor:
+    """Independent read position in an AudioRingBuffer. Also usable as a PyAudio-like stream."""
+
+    def __init__(self, ring, seq):
+        self.ring = ring
+        self.seq = seq
+
+    def read_frame(self, timeout=None):
+        frame, seq = self.ring.read(self.seq, timeout)
+        if frame is None:
+            return None
+        if seq != self.seq:
+            logging.warning(f"Audio reader fell behind, skipped {seq - self.seq} frames.")
+            metrics.inc("audio_frames_skipped_total", seq - self.seq)
+        self.seq = seq + 1
+        return frame
+
+    def seek_to_latest(self):
+        self.seq = self.ring.latest_seq
+
+    def seek(self, seq):
+        self.seq = max(0, seq)
+
+    def read(self, num_frames, exception_on_overflow=False):
+        # speech_recognition reads CHUNK frames at a time; CHUNK is the ring's frame length.
+        # An empty result tells Recognizer.listen that the stream ended.
+        return self.read_frame() or b""
+
+
+class RingBufferSource(sr.AudioSource):
+    """speech_recognition AudioSource fed from the shared ring buffer instead of a second microphone."""
+
+    def __init__(self, cursor, frame_length):
+        self.cursor = cursor
+        self.stream = None
+        self.format = pyaudio.paInt16
+        self.SAMPLE_RATE = AUDIO_SAMPLE_RATE
+        self.SAMPLE_WIDTH = AUDIO_SAMPLE_WIDTH
+        self.CHUNK = frame_length
+
+    def __enter__(self):
+        self.stream = self.cursor
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+
+class WavReplaySource:
+    """Stand-in for a PyAudio input stream that replays 16 kHz mono int16 WAV files."""
+
+    def __init__(self, wav_paths, realtime=True, trailing_silence=1.0):
+        chunks = []
+        for wav_path in wav_paths:
+            with wave.open(wav_path, "rb") as wav_file:
+                if (wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth()) != \
+                        (AUDIO_SAMPLE_RATE, 1, AUDIO_SAMPLE_WIDTH):
+                    raise ValueError(f"{wav_path} must be {AUDIO_SAMPLE_RATE} Hz mono 16-bit PCM.")
+                chunks.append(wav_file.readframes(wav_file.getnframes()))
+        chunks.append(b"\x00" * int(trailing_silence * AUDIO_SAMPLE_RATE) * AUDIO_SAMPLE_WIDTH)
+        self.pcm = b"".join(chunks)
+        self.realtime = realtime # Pace reads like a real microphone
+        self._pos = 0
+        self._started = None
+
+    def read(self, num_frames, exception_on_overflow=False):
+        if self._pos >= len(self.pcm):
+            raise EOFError("End of replayed audio.")
+        if self._started is None:
+            self._started = time.monotonic()
+        num_bytes = num_frames * AUDIO_SAMPLE_WIDTH
+        chunk = self.pcm[self._pos:self._pos + num_bytes]
+        self._pos += num_bytes
+        if self.realtime:
+            due = self._started + self._pos / AUDIO_SAMPLE_WIDTH / AUDIO_SAMPLE_RATE
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return chunk.ljust(num_bytes, b"\x00")
+
+    def is_active(self):
+        return self._pos < len(self.pcm)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self._pos = len(self.pcm)
+
+
+class AudioCapture:
+    """Single owner of the input stream: one thread reads frames into the shared ring buffer."""
+
+    def __init__(self, stream, frame_length, buffer_seconds=AUDIO_BUFFER_SECONDS):
+        self.stream = stream
+        self.frame_length = frame_length
+        capacity = max(1, int(buffer_seconds * AUDIO_SAMPLE_RATE / frame_length))
+        self.ring = AudioRingBuffer(capacity)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True, name="audio-capture")
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def frames_for_ms(self, milliseconds):
+        return int(milliseconds / 1000 * AUDIO_SAMPLE_RATE / self.frame_length)
+
+    def _capture_loop(self):
+        frame_bytes = self.frame_length * AUDIO_SAMPLE_WIDTH
+        try:
+            while self._running:
+                try:
+                    pcm = self.stream.read(self.frame_length, exception_on_overflow=False)
+                except EOFError: # Replay source exhausted
+                    logging.info("Audio source reached its end.")
+                    break
+                except IOError as e_io:
+                    if hasattr(e_io, 'errno') and e_io.errno == pyaudio.paInputOverflowed:
+                        logging.warning("Audio input overflowed. Skipping this frame.")
+                        metrics.inc("audio_overflows_total")
+                        continue # Skip this frame and try again
+                    # For other IOErrors, log and briefly pause
+                    logging.error(f"Audio stream read IOError (not overflow): {e_io}")
+                    metrics.inc("audio_read_errors_total")
+                    time.sleep(0.1)
+                    continue
+                except Exception as e_read_generic:
+                    if not self._running: # Stream closed during shutdown
+                        break
+                    logging.error(f"Unexpected error reading audio stream: {e_read_generic}")
+                    metrics.inc("audio_read_errors_total")
+                    time.sleep(0.1) # Brief pause before retrying
+                    continue
+                if len(pcm) != frame_bytes:
+                    logging.warning(f"Dropping short audio frame ({len(pcm)} bytes).")
+                    continue
+                self.ring.write(pcm)
+        finally:
+            self.ring.close() # Wakes every reader so nobody blocks forever
+
+
+# === Earcon ===
+PROMPT_STYLE = os.getenv("NOVA_PROMPT", "earcon").strip().lower() # After a pause: "earcon" (a chime) or "speech"
+EARCON_FILE = os.getenv("NOVA_EARCON_FILE", "").strip() # 16-bit WAV played instead of the built-in chime
+EARCON_TAIL_MS = 50 # Output latency allowance: microphone audio until this long after the chime isn't recognized
+
+
+def synthesize_chime(rate=AUDIO_SAMPLE_RATE, notes=((1319, 45), (1760, 55)), volume=0.25):
+    # Two short rising tones (E6, A6) with 5 ms fades so they don't click
+    parts = []
+    for frequency, milliseconds in notes:
+        t = np.arange(int(rate * milliseconds / 1000)) / rate
+        envelope = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.005)
+        parts.append(np.sin(2 * np.pi * frequency * t) * envelope)
+    return (np.concatenate(parts) * volume * 32767).astype("<i2").tobytes()
+
+
+class EarconPlayer:
+    """A short chime decoded into memory once and played on an output stream opened at startup.
+
+    play() only wakes the player thread, so acknowledging the wake word takes a few milliseconds
+    instead of a spoken prompt, and listening can start straight away.
+    """
+
+    def __init__(self):
+        self.pcm = b""
+        self.rate = AUDIO_SAMPLE_RATE
+        self.channels = 1
+        self.duration_ms = 0.0
+        self._stream = None
+        self._wanted = threading.Event()
+        self._closed = False
+
+    def load(self, path=EARCON_FILE):
+        if path:
+            with wave.open(path, "rb") as wav_file:
+                if wav_file.getsampwidth() != AUDIO_SAMPLE_WIDTH:
+                    raise ValueError(f"{path} must be 16-bit PCM")
+                self.rate, self.channels = wav_file.getframerate(), wav_file.getnchannels()
+                self.pcm = wav_file.readframes(wav_file.getnframes())
+        else:
+            self.pcm = synthesize_chime(self.rate)
+        self.duration_ms = len(self.pcm) / (AUDIO_SAMPLE_WIDTH * self.channels) / self.rate * 1000
+        return self.duration_ms
+
+    def open(self, pa):
+        self._stream = pa.open(format=pyaudio.paInt16, channels=self.channels, rate=self.rate, output=True)
+        threading.Thread(target=self._run, daemon=True, name="earcon").start()
+
+    @property
+    def ready(self):
+        return self._stream is not None and bool(self.pcm)
+
+    def play(self):
+        if not self.ready:
+            return False
+        self._wanted.set()
+        return True
+
+    def close(self):
+        self._closed = True
+        self._wanted.set()
+
+    def _run(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            if self._closed:
+                break
+            try:
+                self._stream.write(self.pcm)
+            except Exception as e:
+                logging.error(f"Error playing the earcon: {e}")
+        with contextlib.suppress(Exception):
+            self._stream.close()
+
+
+earcon = EarconPlayer()
+
+
+# === Ambient Noise Calibration ===
+CALIBRATION_SECONDS = 1.0 # Quiet audio sampled when there is no saved threshold, or on "recalibrate"
+NOISE_ADAPT_SECONDS = env_number("NOVA_NOISE_ADAPT_SECONDS", 20.0) # Time constant of the background adaptation
+NOISE_LOUD_ADAPT_FACTOR = 10 # Frames above the threshold (speech, or a room that got noisier) adapt this much slower
+NOISE_MIN_THRESHOLD = 50.0 # Keeps digital silence from making every frame count as loud
+CALIBRATION_SAVE_TOLERANCE = 0.05 # Relative change before the saved threshold is rewritten
+
+
+class NoiseCalibration:
+    """Speech energy threshold: saved between runs and adapted from the frames the wake-word loop reads anyway.
+
+    Follows speech_recognition's dynamic threshold (threshold -> frame RMS * dynamic_energy_ratio), but
+    smoothed over NOISE_ADAPT_SECONDS and applied outside of command listening so it costs nothing there.
+    """
+
+    def __init__(self, path, adapt_seconds=NOISE_ADAPT_SECONDS):
+        self.path = path
+        self.adapt_seconds = adapt_seconds
+        self._saved_threshold = None
+
+    @property
+    def threshold(self):
+        return recognizer.energy_threshold
+
+    def _set(self, value):
+        recognizer.energy_threshold = max(NOISE_MIN_THRESHOLD, value)
+
+    def load(self):
+        """Apply the saved threshold. Returns False if there is none yet."""
+        value = load_json_data(self.path, {}).get("energy_threshold")
+        if not isinstance(value, (int, float)) or value <= 0:
+            return False
+        self._set(float(value))
+        self._saved_threshold = self.threshold
+        logging.info(f"Using saved energy threshold {self.threshold:.0f} from {self.path}")
+        return True
+
+    def observe(self, pcm):
+        # Called for every wake-loop frame; only a few numpy operations
+        frame_seconds = len(pcm) / AUDIO_SAMPLE_WIDTH / AUDIO_SAMPLE_RATE
+        energy = frame_rms(pcm)
+        rate = frame_seconds / self.adapt_seconds
+        if energy >= self.threshold:
+            rate /= NOISE_LOUD_ADAPT_FACTOR
+        target = energy * recognizer.dynamic_energy_ratio
+        self._set(self.threshold + min(1.0, rate) * (target - self.threshold))
+
+    def calibrate(self, ring, frame_length, duration=CALIBRATION_SECONDS):
+        with RingBufferSource(ring.cursor(), frame_length) as source:
+            recognizer.adjust_for_ambient_noise(source, duration=duration)
+        self._set(self.threshold)
+        logging.info(f"Ambient noise calibration complete (energy threshold {self.threshold:.0f}).")
+        self.save()
+
+    def calibrate_in_background(self, ring, frame_length, duration=CALIBRATION_SECONDS):
+        def _calibrate():
+            try:
+                self.calibrate(ring, frame_length, duration)
+            except Exception as e:
+                logging.error(f"Ambient noise calibration failed: {e}")
+
+        threading.Thread(target=_calibrate, daemon=True, name="calibration").start()
+
+    def save(self):
+        try:
+            save_json_atomic(self.path, {"energy_threshold": round(self.threshold, 1),
+                                         "updated": datetime.datetime.now().isoformat(timespec="seconds")})
+            self._saved_threshold = self.threshold
+        except Exception as e:
+            logging.error(f"Error saving calibration to {self.path}: {e}")
+
+    def save_if_changed(self):
+        saved = self._saved_threshold
+        if saved is None or abs(self.threshold - saved) > saved * CALIBRATION_SAVE_TOLERANCE:
+            self.save()
+
+
+noise_calibration = NoiseCalibration(CALIBRATION_FILE)
+
+
+# === Voice Activity Detection ===
+VAD_ENABLED = env_flag("NOVA_VAD", True) # Replaces Recognizer.listen() endpointing
+VAD_ONSET_MS = env_number("NOVA_VAD_ONSET_MS", 90) # Speech needed before an utterance counts as started
+VAD_HANGOVER_MS = env_number("NOVA_VAD_HANGOVER_MS", 300) # Non-speech needed to end the utterance
+VAD_MARGIN_DB = env_number("NOVA_VAD_MARGIN_DB", 9.0) # How far above the noise floor speech must be
+VAD_MAX_FLATNESS = 0.45 # Spectral flatness: broadband noise is near 1, voiced speech well below
+VAD_MIN_NOISE_DB = 30.0 # Keeps digital silence from dragging the noise floor to zero
+VAD_PREROLL_MS = 300 # Audio kept from before the onset, like Recognizer.listen() does
+
+
+def vad_frame_features(frames):
+    """Vectorized features for a (n_frames, frame_length) int16 array: (energy in dB, spectral flatness)."""
+    samples = frames.astype(np.float32)
+    energy_db = 10 * np.log10(np.mean(samples * samples, axis=1) + 1.0)
+    power = np.abs(np.fft.rfft(samples * np.hanning(samples.shape[1]), axis=1)) ** 2 + 1e-3
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, flatness
+
+
+class VoiceActivityDetector:
+    """Frame classifier (energy over an adaptive noise floor + spectral flatness) with onset and hangover."""
+
+    def __init__(self, noise_floor_rms=None, onset_ms=VAD_ONSET_MS, hangover_ms=VAD_HANGOVER_MS,
+                 margin_db=VAD_MARGIN_DB):
+        if noise_floor_rms is None: # Seed from the calibrated threshold (energy_threshold is an RMS level)
+            noise_floor_rms = recognizer.energy_threshold / recognizer.dynamic_energy_ratio
+        self.noise_db = max(VAD_MIN_NOISE_DB, 20 * math.log10(max(noise_floor_rms, 1.0)))
+        self.onset_ms = onset_ms
+        self.hangover_ms = hangover_ms
+        self.margin_db = margin_db
+        self.in_speech = False
+        self._speech_run_ms = 0.0
+        self._silence_run_ms = 0.0
+
+    def is_speech(self, pcm):
+        frame = np.frombuffer(pcm, dtype="<i2")[np.newaxis, :]
+        energy_db, flatness = vad_frame_features(frame)
+        speech = energy_db[0] > self.noise_db + self.margin_db and flatness[0] < VAD_MAX_FLATNESS
+        if not speech: # Track the room: the floor follows non-speech frames only
+            self.noise_db = max(VAD_MIN_NOISE_DB, 0.95 * self.noise_db + 0.05 * energy_db[0])
+        return speech
+
+    def process(self, pcm):
+        """Classify one frame; returns "start" or "end" when the utterance state changes, else None."""
+        frame_ms = len(pcm) / AUDIO_SAMPLE_WIDTH / AUDIO_SAMPLE_RATE * 1000
+        if self.is_speech(pcm):
+            self._speech_run_ms += frame_ms
+            self._silence_run_ms = 0.0
+            if not self.in_speech and self._speech_run_ms >= self.onset_ms:
+                self.in_speech = True
+                return "start"
+        else:
+            self._speech_run_ms = 0.0
+            self._silence_run_ms += frame_ms
+            if self.in_speech and self._silence_run_ms >= self.hangover_ms:
+                self.in_speech = False
+                return "end"
+        return None
+
+
+def vad_segment(cursor, timeout, phrase_time_limit, vad=None):
+    """Yield (pcm, audio_ms) for one utterance read from cursor: a little audio before the onset through end-of-speech.
+
+    audio_ms is how much audio had been read from the cursor when the frame was yielded.
+    Raises sr.WaitTimeoutError if no speech starts within timeout seconds.
+    """
+    vad = vad or VoiceActivityDetector()
+    heard_ms = 0.0
+    start_ms = None
+    preroll = deque()
+    while True:
+        pcm = cursor.read_frame(timeout=1.0)
+        if pcm is None: # Audio source closed
+            return
+        frame_ms = len(pcm) / AUDIO_SAMPLE_WIDTH / AUDIO_SAMPLE_RATE * 1000
+        heard_ms += frame_ms
+        event = vad.process(pcm)
+        if start_ms is None:
+            preroll.append(pcm)
+            if event == "start":
+                start_ms = heard_ms
+                for earlier_pcm in preroll: # Includes the onset frames themselves
+                    yield earlier_pcm, heard_ms
+                preroll.clear()
+                continue
+            if heard_ms > timeout * 1000:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            while len(preroll) * frame_ms > VAD_PREROLL_MS + vad.onset_ms:
+                preroll.popleft()
+            continue
+        yield pcm, heard_ms
+        if event == "end" or heard_ms - start_ms >= phrase_time_limit * 1000:
+            return
+
+
+def listen_with_vad(cursor, timeout, phrase_time_limit):
+    frames = [pcm for pcm, _ in vad_segment(cursor, timeout, phrase_time_limit)]
+    if not frames:
+        raise sr.WaitTimeoutError("audio source ended before speech started")
+    return sr.AudioData(b"".join(frames), AUDIO_SAMPLE_RATE, AUDIO_SAMPLE_WIDTH)
+
+
+# === Speech Recognition Backends ===
+class RecognizerBackend:
+    """Turns captured sr.AudioData into text, raising sr.UnknownValueError / sr.RequestError like speech_recognition.
+
+    Backends with supports_streaming also offer start_stream(), returning an object whose
+    feed(pcm) gives (partial_text, is_final) for each frame and whose finish() gives the final text.
+    """
+    name = "base"
+    supports_streaming = False
+
+    def recognize(self, audio):
+        raise NotImplementedError
+
+    def start_stream(self):
+        raise NotImplementedError
+
+
+class GoogleRecognizerBackend(RecognizerBackend):
+    """Google Web Speech API through speech_recognition (needs a network connection)."""
+    name = "google"
+
+    def recognize(self, audio):
+        return recognizer.recognize_google(audio)
+
+
+class VoskRecognizerBackend(RecognizerBackend):
+    """Offline CPU recognition with a Vosk model (pip install vosk; point NOVA_VOSK_MODEL at an unpacked model)."""
+    name = "vosk"
+    supports_streaming = True
+
+    def __init__(self, model_path=None):
+        import vosk # Optional dependency, only needed when this backend is selected
+        model_path = model_path or os.getenv("NOVA_VOSK_MODEL")
+        if not model_path or not os.path.isdir(model_path):
+            raise ValueError(f"Vosk model directory not found: {model_path!r}. Set NOVA_VOSK_MODEL in your .env file.")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def recognize(self, audio):
+        kaldi = self._vosk.KaldiRecognizer(self.model, AUDIO_SAMPLE_RATE)
+        kaldi.AcceptWaveform(audio.get_raw_data(convert_rate=AUDIO_SAMPLE_RATE, convert_width=AUDIO_SAMPLE_WIDTH))
+        text = json.loads(kaldi.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def start_stream(self):
+        return _VoskStream(self._vosk.KaldiRecognizer(self.model, AUDIO_SAMPLE_RATE))
+
+
+class _VoskStream:
+    def __init__(self, kaldi):
+        self.kaldi = kaldi
+        self.final_text = None
+
+    def feed(self, pcm):
+        if self.kaldi.AcceptWaveform(pcm): # Vosk detected the end of the utterance itself
+            self.final_text = json.loads(self.kaldi.Result()).get("text", "")
+            return self.final_text, True
+        return json.loads(self.kaldi.PartialResult()).get("partial", ""), False
+
+    def finish(self):
+        text = self.final_text if self.final_text is not None else json.loads(self.kaldi.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class StubRecognizerBackend(RecognizerBackend):
+    """Deterministic backend for tests: returns scripted transcripts in order and ignores the audio.
+
+    Transcripts come from the constructor or from NOVA_STUB_TRANSCRIPTS, separated by "|".
+    When streaming, one more word of the transcript is revealed per word_ms of audio fed.
+    """
+    name = "stub"
+    supports_streaming = True
+
+    def __init__(self, transcripts=None, word_ms=None):
+        if transcripts is None:
+            transcripts = [t.strip() for t in os.getenv("NOVA_STUB_TRANSCRIPTS", "").split("|") if t.strip()]
+        self.transcripts = deque(transcripts)
+        self.word_ms = word_ms or env_number("NOVA_STUB_WORD_MS", 300)
+
+    def recognize(self, audio):
+        if not self.transcripts:
+            raise sr.UnknownValueError()
+        return self.transcripts.popleft()
+
+    def start_stream(self):
+        return _StubStream(self.transcripts.popleft() if self.transcripts else "", self.word_ms)
+
+
+class _StubStream:
+    def __init__(self, transcript, word_ms):
+        self.words = transcript.split()
+        self.word_ms = word_ms
+        self.fed_ms = 0.0
+
+    def feed(self, pcm):
+        self.fed_ms += len(pcm) / AUDIO_SAMPLE_WIDTH / AUDIO_SAMPLE_RATE * 1000
+        return " ".join(self.words[:int(self.fed_ms // self.word_ms)]), False
+
+    def finish(self):
+        if not self.words:
+            raise sr.UnknownValueError()
+        return " ".join(self.words)
+
+
+RECOGNIZER_BACKENDS = {
+    "google": GoogleRecognizerBackend,
+    "vosk": VoskRecognizerBackend,
+    "stub": StubRecognizerBackend,
+}
+RECOGNIZER_BACKEND_NAME = os.getenv("NOVA_RECOGNIZER", "google").strip().lower()
+
+
+def load_recognizer_backend(name=RECOGNIZER_BACKEND_NAME):
+    backend_class = RECOGNIZER_BACKENDS.get(name)
+    if backend_class is None:
+        logging.error(f"Unknown speech recognition backend '{name}'. Choose from: {', '.join(RECOGNIZER_BACKENDS)}.")
+        backend_class = GoogleRecognizerBackend
+    try:
+        backend = backend_class()
+    except Exception as e:
+        logging.error(f"Could not load the '{name}' speech recognition backend: {e}. Falling back to Google.")
+        backend = GoogleRecognizerBackend()
+    logging.info(f"Using the '{backend.name}' speech recognition backend.")
+    return backend
+
+
+recognizer_backend = None # Loaded during startup (a Vosk model can take a while)
 
 
 # === System Control Helpers (Windows-specific) ===
@@ -310,42 +1522,617 @@ def get_battery_status():
         return None
 
 
+# === System Metrics Sampler ===
+SYSTEM_SAMPLE_SECONDS = max(1.0, env_number("NOVA_SYSTEM_SAMPLE_SECONDS", 5)) # CPU, RAM and disk reading interval
+SYSTEM_HISTORY_MINUTES = env_number("NOVA_SYSTEM_HISTORY_MINUTES", 15) # How far back trend questions can look
+SYSTEM_PROCESS_SAMPLE_SECONDS = 60 # Per-process memory costs more to collect, so it's read less often
+SYSTEM_BATTERY_SAMPLE_SECONDS = 60
+SYSTEM_TOP_PROCESSES = 5 # Kept per process sample
+SYSTEM_DISK_PATH = 'C:\\' if os.name == 'nt' else '/'
+
+SystemSample = namedtuple("SystemSample", "taken cpu ram_percent ram_used ram_total "
+                                          "disk_percent disk_used disk_total battery plugged")
+
+
+class SystemSampler:
+    """CPU, RAM, disk and battery readings taken on a background thread into fixed-size ring buffers,
+    so system questions are answered from memory instead of blocking on psutil."""
+
+    def __init__(self, interval=SYSTEM_SAMPLE_SECONDS, history_minutes=SYSTEM_HISTORY_MINUTES,
+                 process_interval=SYSTEM_PROCESS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.history_seconds = history_minutes * 60
+        self.process_interval = process_interval
+        self.samples = deque(maxlen=max(2, int(self.history_seconds / interval))) # SystemSample, oldest first
+        self.process_samples = deque(maxlen=max(2, int(self.history_seconds / process_interval))) # (taken, [(name, rss)])
+        self._battery = None
+        self._battery_checked = None
+        self._battery_supported = True # Cleared on machines without one, so it isn't asked again
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            psutil.cpu_percent(interval=None) # Primes the counter: readings cover the time since the previous call
+            self._thread = threading.Thread(target=self._run, daemon=True, name="system-sampler")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        next_processes = time.monotonic()
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+                if time.monotonic() >= next_processes:
+                    next_processes = time.monotonic() + self.process_interval
+                    self.sample_processes()
+            except Exception as e:
+                logging.error(f"System sampling failed: {e}")
+
+    def sample(self, cpu_interval=None):
+        """Take one reading now and add it to the history."""
+        now = time.monotonic()
+        cpu = psutil.cpu_percent(interval=cpu_interval)
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage(SYSTEM_DISK_PATH)
+        if self._battery_supported and (self._battery_checked is None
+                                        or now - self._battery_checked >= SYSTEM_BATTERY_SAMPLE_SECONDS):
+            self._battery_checked = now
+            self._battery = get_battery_status()
+            self._battery_supported = self._battery is not None
+        battery, plugged = self._battery or (None, None)
+        sample = SystemSample(now, cpu, mem.percent, mem.used, mem.total, disk.percent, disk.used, disk.total,
+                              battery, plugged)
+        self.samples.append(sample)
+        return sample
+
+    def sample_processes(self):
+        usage = {} # Process name -> resident bytes, summed over its instances (browsers run dozens)
+        for proc in psutil.process_iter(["name", "memory_info"]):
+            name, mem = proc.info.get("name"), proc.info.get("memory_info")
+            if name and mem:
+                usage[name] = usage.get(name, 0) + mem.rss
+        top = sorted(usage.items(), key=lambda item: item[1], reverse=True)[:SYSTEM_TOP_PROCESSES]
+        self.process_samples.append((time.monotonic(), top))
+        return top
+
+    def latest(self, max_age=None):
+        sample = self.samples[-1] if self.samples else None
+        if sample is None or (max_age is not None and time.monotonic() - sample.taken > max_age):
+            return None
+        return sample
+
+    def window(self, seconds):
+        """Samples from the last `seconds`, oldest first."""
+        cutoff = time.monotonic() - seconds
+        return [sample for sample in list(self.samples) if sample.taken >= cutoff]
+
+    def top_memory(self, seconds):
+        """[(process name, average resident bytes)] over the process samples in the window, largest first."""
+        cutoff = time.monotonic() - seconds
+        samples = [top for taken, top in list(self.process_samples) if taken >= cutoff]
+        totals = Counter()
+        for top in samples:
+            totals.update(dict(top))
+        return [(name, total / len(samples)) for name, total in totals.most_common(SYSTEM_TOP_PROCESSES)]
+
+
+system_sampler = SystemSampler()
+
+
+# === Executable Index ===
+EXE_INDEX_MAX_DEPTH = 5 # Same depth limit the filesystem search uses
+EXE_INDEX_EXTENSIONS = (".exe", ".bat", ".cmd", ".com", ".lnk") # Only these are indexed
+EXE_INDEX_REFRESH_INTERVAL = 15 * 60 # Seconds between background incremental refreshes
+EXE_INDEX_NEGATIVE_TTL = 6 * 60 * 60 # Seconds a "not found" answer is trusted
+
+
+def normalize_exe_name(exe_name):
+    # Lowercase and default to ".exe" when there is no extension, matching how
+    # the filesystem search compares file names.
+    name_no_ext, ext = os.path.splitext(exe_name.lower())
+    return name_no_ext + (ext or ".exe")
+
+
+class ExecutableIndex:
+    """Persistent basename -> paths index over SEARCH_PATHS, refreshed incrementally by directory mtime."""
+
+    def __init__(self, index_file, misses_file, roots, max_depth=EXE_INDEX_MAX_DEPTH):
+        self.index_file = index_file
+        self.misses_file = misses_file
+        self.roots = list(roots)
+        self.max_depth = max_depth
+        self.ready = False # True once the index covers every root
+        self.dirs = {} # dir path -> {"m": mtime, "f": [exe file names], "s": [subdir names]}
+        self.names = {} # lowercase basename -> [full paths], shallowest first
+        self.misses = {} # normalized exe name -> time.time() of the failed search
+        self.generation = 0 # Bumped whenever the set of names changes
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock() # Only one refresh walks the disk at a time
+
+    def load(self):
+        data = load_json_data(self.index_file, {})
+        if data.get("roots") == self.roots and isinstance(data.get("dirs"), dict):
+            with self._lock:
+                self.dirs = data["dirs"]
+                self.names = self._build_names(self.dirs)
+                self.ready = bool(self.dirs)
+                self.generation += 1
+            logging.info(f"Loaded executable index with {len(self.names)} names from {self.index_file}")
+        misses = load_json_data(self.misses_file, {})
+        with self._lock:
+            self.misses = {k: v for k, v in misses.items() if time.time() - v < EXE_INDEX_NEGATIVE_TTL}
+
+    @staticmethod
+    def _build_names(dirs):
+        names = {}
+        for dir_path, record in dirs.items():
+            for file_name in record["f"]:
+                names.setdefault(file_name.lower(), []).append(os.path.join(dir_path, file_name))
+        for paths in names.values():
+            paths.sort(key=lambda p: (p.count(os.sep), p))
+        return names
+
+    @staticmethod
+    def _scan_dir(dir_path):
+        files, subdirs = [], []
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(EXE_INDEX_EXTENSIONS):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        return files, subdirs
+
+    def refresh(self):
+        """Rescan only directories whose mtime changed since the last refresh."""
+        with self._refresh_lock:
+            started = time.time()
+            old_dirs = self.dirs
+            new_dirs = {}
+            rescanned = 0
+            stack = [(root, 0) for root in self.roots if os.path.isdir(root)]
+            while stack:
+                dir_path, depth = stack.pop()
+                try:
+                    mtime = os.stat(dir_path).st_mtime
+                except OSError:
+                    continue
+                record = old_dirs.get(dir_path)
+                if not record or record["m"] != mtime:
+                    try:
+                        files, subdirs = self._scan_dir(dir_path)
+                    except OSError: # Permission denied, vanished mid-scan, etc.
+                        continue
+                    record = {"m": mtime, "f": files, "s": subdirs}
+                    rescanned += 1
+                new_dirs[dir_path] = record
+                if depth < self.max_depth:
+                    stack.extend((os.path.join(dir_path, d), depth + 1) for d in record["s"])
+
+            changed = rescanned > 0 or len(new_dirs) != len(old_dirs)
+            if changed:
+                names = self._build_names(new_dirs)
+                with self._lock:
+                    self.dirs = new_dirs
+                    self.names = names
+                    self.generation += 1
+                    # A newly installed executable invalidates its negative entry
+                    stale_misses = [k for k in self.misses if k in names]
+                    for key in stale_misses:
+                        self.misses.pop(key, None)
+                try:
+                    save_json_atomic(self.index_file, {"roots": self.roots, "dirs": new_dirs})
+                except Exception as e:
+                    logging.error(f"Error writing executable index to {self.index_file}: {e}")
+                if stale_misses:
+                    self._save_misses()
+            self.ready = True
+            logging.info(f"Executable index refreshed: {len(new_dirs)} dirs, {rescanned} rescanned, "
+                         f"{len(self.names)} names in {time.time() - started:.1f}s.")
+
+    def lookup(self, exe_name):
+        """Return (path, covered). covered=False means the index can't answer and a walk is needed."""
+        key = normalize_exe_name(exe_name)
+        if not self.ready or not key.endswith(EXE_INDEX_EXTENSIONS):
+            return None, False
+        with self._lock:
+            candidates = list(self.names.get(key, ()))
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate, True
+        # Indexed paths that vanished mean the index is stale for this name
+        return None, not candidates
+
+    def remember(self, exe_name, path):
+        key = normalize_exe_name(exe_name)
+        with self._lock:
+            if key not in self.names:
+                self.generation += 1
+            paths = self.names.setdefault(key, [])
+            if path not in paths:
+                paths.insert(0, path)
+            self.misses.pop(key, None)
+
+    def known_names(self):
+        with self._lock:
+            return list(self.names)
+
+    def is_known_missing(self, exe_name):
+        missed_at = self.misses.get(normalize_exe_name(exe_name))
+        return missed_at is not None and time.time() - missed_at < EXE_INDEX_NEGATIVE_TTL
+
+    def record_miss(self, exe_name):
+        with self._lock:
+            self.misses[normalize_exe_name(exe_name)] = time.time()
+        self._save_misses()
+
+    def _save_misses(self):
+        with self._lock:
+            misses = dict(self.misses)
+        try:
+            save_json_atomic(self.misses_file, misses)
+        except Exception as e:
+            logging.error(f"Error writing executable index misses to {self.misses_file}: {e}")
+
+    def start_background_refresh(self, interval=EXE_INDEX_REFRESH_INTERVAL):
+        def _refresh_loop():
+            self.load()
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.error(f"Executable index refresh failed: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=_refresh_loop, daemon=True, name="exe-index").start()
+
+
+exe_index = ExecutableIndex(EXE_INDEX_FILE, EXE_INDEX_MISSES_FILE, SEARCH_PATHS)
+
+
+# === Executable Cache ===
+EXE_CACHE_MAX_ENTRIES = env_number("NOVA_EXE_CACHE_SIZE", 256, int) # Least recently launched apps are evicted beyond this
+EXE_CACHE_FLUSH_DELAY = 2.0 # Seconds changes are batched before exe_cache.json is rewritten
+EXE_CACHE_VALIDATE_INTERVAL = 10 * 60 # Seconds before a used entry's path is stat()ed again
+
+
+class ExeCache:
+    """Thread-safe LRU of exe name -> path for apps found before, persisted write-behind.
+
+    Lookups never touch the disk: a used entry is queued for a background stat(), and entries
+    whose file is gone are dropped there (a failed launch also drops it). Changes are written
+    to exe_cache.json at most once per EXE_CACHE_FLUSH_DELAY, through a temp file and rename.
+    """
+
+    def __init__(self, path, max_entries=EXE_CACHE_MAX_ENTRIES, flush_delay=EXE_CACHE_FLUSH_DELAY,
+                 validate_interval=EXE_CACHE_VALIDATE_INTERVAL):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.flush_delay = flush_delay
+        self.validate_interval = validate_interval
+        self.flushes = 0
+        self.generation = 0 # Bumped whenever names are added or removed
+        self._entries = OrderedDict() # key -> [path, size, mtime_ns], least recently used first
+        self._checked = {} # key -> time.monotonic() of the last background stat()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # Keeps snapshots reaching the disk in order
+        self._loaded = False
+        self._dirty = False
+        self._flush_timer = None
+        self._validate_queue = queue.Queue()
+        self._queued = set()
+        self._validator = None
+
+    def load(self):
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        for key, value in load_json_data(self.path, {}).items():
+            if isinstance(value, str): # The old {name: path} format; stat() data is filled in by validation
+                value = [value, None, None]
+            if isinstance(value, list) and len(value) == 3 and isinstance(value[0], str):
+                self._entries[key.lower()] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logging.info(f"Loaded {len(self._entries)} cached executable path(s) from {self.path}")
+
+    def get(self, exe_name):
+        key = exe_name.lower()
+        with self._lock:
+            self._load_locked()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            path = entry[0]
+            checked_at = self._checked.get(key)
+            needs_check = checked_at is None or time.monotonic() - checked_at >= self.validate_interval
+        if needs_check:
+            self._queue_validation(key)
+        return path
+
+    def put(self, exe_name, path):
+        key = exe_name.lower()
+        with self._lock:
+            self._load_locked()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == path:
+                self._entries.move_to_end(key)
+                return
+            if entry is None:
+                self.generation += 1
+            self._entries[key] = [path, None, None]
+            self._entries.move_to_end(key)
+            self._checked.pop(key, None)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._checked.pop(evicted, None)
+            self._mark_dirty()
+        self._queue_validation(key)
+
+    def discard(self, exe_name, path=None):
+        """Forget exe_name (only if it still maps to path, when given)."""
+        key = exe_name.lower()
+        with self._lock:
+            self._load_locked()
+            entry = self._entries.get(key)
+            if entry is None or (path is not None and entry[0] != path):
+                return False
+            del self._entries[key]
+            self._checked.pop(key, None)
+            self.generation += 1
+            self._mark_dirty()
+            return True
+
+    def names(self):
+        with self._lock:
+            self._load_locked()
+            return list(self._entries)
+
+    def _mark_dirty(self):
+        # Called with self._lock held; one timer per batch of changes
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write pending changes now; returns True if the file was written."""
+        with self._flush_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel() # No-op when this is the timer firing
+                self._flush_timer = None
+                if not self._dirty:
+                    return False
+                snapshot = {key: list(entry) for key, entry in self._entries.items()}
+                self._dirty = False
+            try:
+                save_json_atomic(self.path, snapshot)
+                self.flushes += 1
+                logging.debug(f"Wrote {len(snapshot)} cached executable path(s) to {self.path}")
+                return True
+            except Exception as e:
+                logging.error(f"Error writing exe_cache to {self.path}: {e}")
+                with self._lock:
+                    self._mark_dirty() # Try again after the next delay
+                return False
+
+    def _queue_validation(self, key):
+        with self._lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            if self._validator is None:
+                self._validator = threading.Thread(target=self._validate_loop, daemon=True, name="exe-cache-validate")
+                self._validator.start()
+        self._validate_queue.put(key)
+
+    def _validate_loop(self):
+        while True:
+            key = self._validate_queue.get()
+            try:
+                self.validate(key)
+            except Exception as e:
+                logging.error(f"Validating cached path for {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(key)
+
+    def validate(self, exe_name):
+        """stat() the cached path: drop it if gone, record new stat() data if the file changed."""
+        key = exe_name.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            path = entry[0] if entry else None
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+            signature = [st.st_size, st.st_mtime_ns] if stat.S_ISREG(st.st_mode) else None
+        except OSError:
+            signature = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != path: # Replaced while we were checking
+                return None
+            self._checked[key] = time.monotonic()
+            if signature is None:
+                del self._entries[key]
+                self._checked.pop(key, None)
+                self.generation += 1
+                self._mark_dirty()
+            elif entry[1:] != signature:
+                if entry[1] is not None:
+                    logging.info(f"Cached executable {path} changed on disk (updated?); keeping it.")
+                entry[1:] = signature
+                self._mark_dirty()
+        if signature is None:
+            logging.info(f"Cached path for {key} ('{path}') no longer exists. Removed from cache.")
+            metrics.inc("exe_cache_lookups_total", result="stale")
+            return False
+        return True
+
+
+exe_cache = ExeCache(CACHE_FILE)
+
+
 # === Finder & Launcher ===
-def find_executable(exe_name):
-    logging.debug(f"Searching for executable: {exe_name}")
-    for base in SEARCH_PATHS:
-        if not os.path.exists(base):
-            logging.debug(f"Search path {base} does not exist, skipping.")
-            continue
-        # Limit recursion depth to avoid excessively long searches
-        for root, dirs, files in os.walk(base, topdown=True):
-            # Calculate current depth relative to the base search path
-            current_depth = os.path.abspath(root).count(os.sep) - os.path.abspath(base).count(os.sep)
-            if current_depth > 5: # Max depth (e.g., C:\Program Files\Folder1\Folder2\Folder3\Folder4\Folder5)
-                logging.debug(f"Reached max search depth in {root}, pruning walk here.")
-                dirs[:] = [] # Don't go deeper in this branch
-                continue
+SEARCH_MAX_WORKERS = min(8, (os.cpu_count() or 2) * 2) # scandir releases the GIL, so oversubscribe a little
+
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="exe-search")
+_search_lock = threading.Lock()
+_active_searches = set() # ExecutableSearches still walking the disk; a newer search cancels them
+
+
+class ExecutableSearch:
+    """Parallel, cancellable os.scandir search for one executable name across several roots."""
+
+    def __init__(self, exe_name, roots, max_depth=EXE_INDEX_MAX_DEPTH):
+        self.exe_name = exe_name
+        self.target = normalize_exe_name(exe_name) # Computed once, not per directory
+        self.roots = list(roots)
+        self.max_depth = max_depth
+        self.result = None
+        self.cancelled = False
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._pending = deque() # (dir path, depth) waiting to be scanned, shared by all workers
+        self._outstanding = 0 # Directories queued or being scanned
+
+    def cancel(self):
+        self.cancelled = True
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def run(self, max_workers=SEARCH_MAX_WORKERS):
+        with self._cond:
+            for root in self.roots:
+                if os.path.isdir(root):
+                    self._pending.append((root, 0))
+                else:
+                    logging.debug(f"Search path {root} does not exist, skipping.")
+            self._outstanding = len(self._pending)
+        # Every worker pulls from the shared queue, so roots and large subtrees
+        # are spread across the pool instead of being walked one after another.
+        workers = [_search_pool.submit(self._worker) for _ in range(max_workers)]
+        for worker in workers:
+            worker.result()
+        return self.result
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and self._outstanding and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set() or not self._pending:
+                    return
+                dir_path, depth = self._pending.popleft() # Breadth-first: shallow installs are found first
+            subdirs = self._scan(dir_path, depth)
+            with self._cond:
+                self._pending.extend(subdirs)
+                self._outstanding += len(subdirs) - 1
+                self._cond.notify_all()
+
+    def _scan(self, dir_path, depth):
+        target, target_len = self.target, len(self.target)
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if self._stop.is_set():
+                        return []
+                    name = entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if depth < self.max_depth:
+                                subdirs.append((entry.path, depth + 1))
+                        elif len(name) == target_len and name.lower() == target and not entry.is_dir():
+                            with self._cond:
+                                if self.result is None:
+                                    self.result = entry.path
+                                    logging.info(f"Found {self.exe_name} as {name} at {entry.path}")
+                            self._stop.set() # First match wins, stop every worker
+                            return []
+                    except OSError:
+                        continue
+        except OSError: # Permission denied, vanished mid-search, etc.
+            pass
+        return subdirs
+
+
+def _search_filesystem(exe_name, supersede=True):
+    search = ExecutableSearch(exe_name, SEARCH_PATHS)
+    with _search_lock:
+        if supersede: # Only the newest request keeps walking the disk; a path already found is kept
+            for other in _active_searches:
+                other.cancel()
+        _active_searches.add(search)
+    try:
+        return search.run(), search.cancelled
+    finally:
+        with _search_lock:
+            _active_searches.discard(search)
+
 
-            exe_name_lower_no_ext, exe_ext = os.path.splitext(exe_name.lower())
-            if not exe_ext: exe_ext = ".exe" # Default to .exe if no extension
+def find_executable(exe_name, supersede=True):
+    # Returns (path or None, where the answer came from: "index", "search", "cancelled", ...)
+    with timed_stage("find_executable", exe=exe_name) as lookup:
+        found_path, lookup["result"] = _find_executable(exe_name, supersede)
+    metrics.inc("executable_lookups_total", result=lookup["result"])
+    return found_path, lookup["result"]
+
+
+def _find_executable(exe_name, supersede=True):
+    # Returns (path or None, where the answer came from)
+    logging.debug(f"Searching for executable: {exe_name}")
+    if exe_index.is_known_missing(exe_name):
+        logging.info(f"{exe_name} was not found by a recent search, skipping.")
+        return None, "known_missing"
+
+    found_path, covered = exe_index.lookup(exe_name)
+    if not found_path and covered:
+        # The index covers this name but has no match: pick up anything installed
+        # since the last refresh before giving up (only changed dirs are rescanned).
+        exe_index.refresh()
+        found_path, covered = exe_index.lookup(exe_name)
+    if found_path:
+        logging.info(f"Found {exe_name} in executable index at {found_path}")
+        return found_path, "index"
+
+    if not covered: # Index not built yet or extension not indexed
+        found_path, cancelled = _search_filesystem(exe_name, supersede)
+        if found_path:
+            exe_index.remember(exe_name, found_path)
+            return found_path, "search"
+        if cancelled:
+            logging.info(f"Search for {exe_name} was cancelled by a newer request.")
+            return None, "cancelled"
 
-            for f in files:
-                f_lower = f.lower()
-                f_lower_no_ext, f_ext = os.path.splitext(f_lower)
-                if f_lower_no_ext == exe_name_lower_no_ext and f_ext == exe_ext:
-                    found_path = os.path.join(root, f)
-                    logging.info(f"Found {exe_name} as {f} at {found_path}")
-                    return found_path
+    exe_index.record_miss(exe_name)
     logging.info(f"{exe_name} not found in standard search paths.")
-    return None
+    return None, "not_found"
 
 
 def launch_executable_async(exe_name, app_name):
-    path = exe_cache.get(exe_name.lower())
-    if path and not os.path.exists(path): # Check if cached path is still valid
-        logging.info(f"Cached path for {exe_name} ('{path}') no longer exists. Removing from cache.")
-        exe_cache.pop(exe_name.lower(), None)
-        path = None # Force a new search
+    # Apps opened by one compound command ("open chrome and spotify") don't cancel each other's searches
+    supersede = getattr(compound_part, "replies", None) is None
+
+    path = exe_cache.get(exe_name) # No disk access: the path is checked in the background
+    metrics.inc("exe_cache_lookups_total", result="hit" if path else "miss")
 
     if path:
         try:
@@ -354,21 +2141,33 @@ def launch_executable_async(exe_name, app_name):
             return True
         except Exception as e:
             logging.error(f"Error starting cached {app_name} from {path}: {e}")
-            exe_cache.pop(exe_name.lower(), None) # Remove bad cache entry
+            exe_cache.discard(exe_name, path) # Remove bad cache entry
+            metrics.inc("exe_cache_lookups_total", result="stale")
+
+    if exe_index.is_known_missing(exe_name): # Answer repeated misses without another search
+        speak(
+            f"Sorry, I couldn't find {app_name} to open. You might need to add it as a custom command if it's in a non-standard location.")
+        return False
+
+    indexed_path, _ = exe_index.lookup(exe_name)
+    if indexed_path:
+        exe_cache.put(exe_name, indexed_path)
+        try:
+            os.startfile(indexed_path)
+            speak(f"Opening {app_name}.")
+            return True
+        except Exception as e:
+            logging.error(f"Error starting indexed {app_name} from {indexed_path}: {e}")
 
     speak(f"Searching for {app_name}, please wait.")
 
     def _search_and_launch_thread():
-        found_path = find_executable(exe_name)
+        found_path, result = find_executable(exe_name, supersede)
+        if result == "cancelled": # A newer search took over before this one found anything
+            speak(f"I stopped searching for {app_name}.")
+            return
         if found_path:
-            exe_cache[exe_name.lower()] = found_path # Update cache
-            try:
-                # Ensure CACHE_FILE (defined globally using writable_user_data_dir) is used
-                with open(CACHE_FILE, 'w', encoding="utf-8") as f_cache:
-                    json.dump(exe_cache, f_cache)
-                logging.info(f"Updated exe_cache at {CACHE_FILE}")
-            except Exception as e_cache_write:
-                logging.error(f"Error writing to exe_cache.json at {CACHE_FILE}: {e_cache_write}")
+            exe_cache.put(exe_name, found_path) # Written to CACHE_FILE shortly, batched with other changes
 
             try:
                 os.startfile(found_path)
@@ -385,9 +2184,517 @@ def launch_executable_async(exe_name, app_name):
     return False # Indicates that the launch is happening asynchronously
 
 
+# === Notes Store ===
+NOTES_DIR = os.path.join(writable_user_data_dir, "notes")
+NOTES_SEGMENT_BYTES = 4 * 1024 * 1024 # A new segment file is started beyond this size
+NOTE_OFFSET = struct.Struct("<Q") # One fixed-width entry per note in a segment's .idx file
+NOTE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S" # Same "<time>: <text>" lines notes.txt always used
+NOTES_MIGRATED_MARKER = "imported-notes.txt" # Written with the imported segments, before notes.txt is renamed
+
+
+def _parse_note_record(note_id, line):
+    text = line.rstrip("\n")
+    if text[19:21] == ": ":
+        try:
+            return note_id, datetime.datetime.strptime(text[:19], NOTE_TIME_FORMAT), text[21:]
+        except ValueError:
+            pass
+    return note_id, None, text
+
+
+class NotesStore:
+    """Append-only notes in rotating text segments, each with a fixed-width offset index.
+
+    Note ids are sequential across segments, so any note (and the latest N) is found by seeking
+    the index instead of reading the text. Appends are fsynced; a crash between writing a note and
+    indexing it is repaired the next time the store is opened.
+    """
+
+    def __init__(self, directory, legacy_file=None, segment_bytes=NOTES_SEGMENT_BYTES):
+        self.directory = directory
+        self.legacy_file = legacy_file # Old single notes.txt, imported once when the store is empty
+        self.segment_bytes = segment_bytes
+        self.segments = [] # [number, first note id, note count, data size], oldest first
+        self._lock = threading.RLock()
+        self._opened = False
+
+    def _paths(self, number):
+        base = os.path.join(self.directory, f"notes-{number:06d}")
+        return base + ".txt", base + ".idx"
+
+    @property
+    def count(self):
+        self.open()
+        last = self.segments[-1] if self.segments else None
+        return last[1] + last[2] if last else 0
+
+    def open(self):
+        with self._lock:
+            if self._opened:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_segments()
+            self._opened = True
+            if self.legacy_file and os.path.exists(self.legacy_file):
+                if not self.segments:
+                    self.migrate(self.legacy_file)
+                elif os.path.exists(os.path.join(self.directory, NOTES_MIGRATED_MARKER)):
+                    os.replace(self.legacy_file, self.legacy_file + ".migrated") # Imported, but not renamed before a crash
+
+    def _load_segments(self):
+        numbers = sorted(int(name[6:-4]) for name in os.listdir(self.directory)
+                         if name.startswith("notes-") and name.endswith(".txt") and name[6:-4].isdigit())
+        self.segments = []
+        first_id = 0
+        for number in numbers:
+            count, size = self._recover(number)
+            self.segments.append([number, first_id, count, size])
+            first_id += count
+
+    def _recover(self, number):
+        # Make the segment and its index agree: drop a torn last line, index lines written after the last offset.
+        # Only the ends of the two files are read, so opening stays fast however many notes there are.
+        data_path, idx_path = self._paths(number)
+        with open(data_path, "r+b") as data, open(idx_path, "a+b") as idx:
+            size = data.seek(0, os.SEEK_END)
+            if size and self._read_at(data, size - 1, 1) != b"\n":
+                end = self._last_newline_end(data, size)
+                logging.warning(f"Dropping {size - end} bytes of an incomplete note at the end of {data_path}")
+                data.truncate(end)
+                size = end
+            idx_size = idx.seek(0, os.SEEK_END)
+            count = idx_size // NOTE_OFFSET.size # A torn final entry is ignored
+            while count and NOTE_OFFSET.unpack(self._read_at(idx, (count - 1) * NOTE_OFFSET.size,
+                                                             NOTE_OFFSET.size))[0] >= size:
+                count -= 1
+            if idx_size != count * NOTE_OFFSET.size:
+                idx.truncate(count * NOTE_OFFSET.size)
+            scan_from = 0
+            if count: # Skip past the last indexed line
+                data.seek(NOTE_OFFSET.unpack(self._read_at(idx, (count - 1) * NOTE_OFFSET.size, NOTE_OFFSET.size))[0])
+                data.readline()
+                scan_from = data.tell()
+            added = []
+            data.seek(scan_from)
+            while data.tell() < size:
+                added.append(data.tell())
+                data.readline()
+            if added:
+                idx.write(b"".join(NOTE_OFFSET.pack(offset) for offset in added)) # Append mode: goes to the end
+                logging.info(f"Indexed {len(added)} unindexed note(s) in {data_path}")
+        return count + len(added), size
+
+    @staticmethod
+    def _read_at(f, position, length):
+        f.seek(position)
+        return f.read(length)
+
+    @staticmethod
+    def _last_newline_end(f, size, block=4096):
+        position = size
+        while position > 0:
+            start = max(0, position - block)
+            chunk = NotesStore._read_at(f, start, position - start)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+        return 0
+
+    def append(self, text, when=None):
+        """Durably store one note and return its id."""
+        return self.append_many([(text, when)])[0]
+
+    def append_many(self, notes, durable=True):
+        """Store (text, when) pairs with one fsync per segment touched; returns their ids."""
+        records = []
+        for text, when in notes:
+            when = when or datetime.datetime.now()
+            records.append(f"{when.strftime(NOTE_TIME_FORMAT)}: {' '.join(text.split())}\n".encode("utf-8"))
+        return self._write_records(records, durable)
+
+    def _write_records(self, records, durable=True):
+        ids = []
+        with self._lock:
+            self.open()
+            data = idx = None
+            segment = self.segments[-1] if self.segments else None
+            try:
+                for record in records:
+                    if segment is None or (segment[3] and segment[3] + len(record) > self.segment_bytes):
+                        if data is not None:
+                            self._close_segment_files(data, idx, durable)
+                            data = idx = None
+                        number = segment[0] + 1 if segment else 1
+                        first_id = segment[1] + segment[2] if segment else 0
+                        segment = [number, first_id, 0, 0]
+                        self.segments.append(segment)
+                    if data is None:
+                        data_path, idx_path = self._paths(segment[0])
+                        data, idx = open(data_path, "ab"), open(idx_path, "ab")
+                    data.write(record) # The note goes in before its index entry, so recovery can always re-index
+                    idx.write(NOTE_OFFSET.pack(segment[3]))
+                    ids.append(segment[1] + segment[2])
+                    segment[2] += 1
+                    segment[3] += len(record)
+            finally:
+                if data is not None:
+                    self._close_segment_files(data, idx, durable)
+        return ids
+
+    @staticmethod
+    def _close_segment_files(data, idx, durable):
+        data.flush()
+        if durable:
+            os.fsync(data.fileno())
+        data.close()
+        idx.close() # The index is rebuilt from the data if it is ever behind
+
+    def _read_range(self, segment, start, stop):
+        # Notes start..stop-1 (segment-local) with two seeks: one in the index, one in the data
+        data_path, idx_path = self._paths(segment[0])
+        with open(idx_path, "rb") as idx:
+            idx.seek(start * NOTE_OFFSET.size)
+            raw = idx.read((stop - start + 1) * NOTE_OFFSET.size) # One extra entry marks where the last note ends
+        offsets = [offset for (offset,) in NOTE_OFFSET.iter_unpack(raw)]
+        end = offsets[stop - start] if len(offsets) > stop - start else segment[3]
+        with open(data_path, "rb") as data:
+            data.seek(offsets[0])
+            block = data.read(end - offsets[0])
+        lines = block.split(b"\n")[:stop - start]
+        return [_parse_note_record(segment[1] + start + i, line.decode("utf-8", errors="replace"))
+                for i, line in enumerate(lines)]
+
+    def read(self, start, stop):
+        """Notes with ids start..stop-1, oldest first; one index and one data read per segment touched."""
+        notes = []
+        with self._lock:
+            self.open()
+            for segment in self.segments:
+                first, last = max(start, segment[1]), min(stop, segment[1] + segment[2])
+                if first < last:
+                    notes.extend(self._read_range(segment, first - segment[1], last - segment[1]))
+        return notes
+
+    def get(self, note_id):
+        """Return (note_id, datetime or None, text), or None if there is no such note."""
+        notes = self.read(note_id, note_id + 1) if note_id >= 0 else []
+        return notes[0] if notes else None
+
+    def tail(self, n):
+        """The latest n notes, oldest first, without reading anything older."""
+        count = self.count
+        return self.read(max(0, count - n), count)
+
+    def migrate(self, legacy_file, batch=10000):
+        """One-time import of an old notes.txt; the original is kept as notes.txt.migrated.
+
+        The notes are written to a separate directory that replaces the (empty) store only once the
+        import is complete, so an interrupted import starts again from scratch at the next open.
+        """
+        staging, replaced = self.directory + ".migrating", self.directory + ".old"
+        for leftover in (staging, replaced): # From an import that was interrupted
+            shutil.rmtree(leftover, ignore_errors=True)
+        staged = NotesStore(staging, segment_bytes=self.segment_bytes)
+        imported = 0
+        with open(legacy_file, "r", encoding="utf-8", errors="replace") as f:
+            pending = []
+            for line in f:
+                line = line.rstrip("\r\n")
+                if line.strip():
+                    pending.append((line + "\n").encode("utf-8"))
+                if len(pending) >= batch:
+                    imported += len(staged._write_records(pending))
+                    pending = []
+            if pending:
+                imported += len(staged._write_records(pending))
+        with open(os.path.join(staging, NOTES_MIGRATED_MARKER), "w", encoding="utf-8") as marker:
+            marker.write(f"{legacy_file}\n")
+            marker.flush()
+            os.fsync(marker.fileno())
+        # Nothing but derived files (the search index) is in the store yet, so it is swapped out whole
+        os.replace(self.directory, replaced)
+        os.replace(staging, self.directory)
+        shutil.rmtree(replaced, ignore_errors=True)
+        self._load_segments()
+        os.replace(legacy_file, legacy_file + ".migrated")
+        logging.info(f"Migrated {imported} note(s) from {legacy_file} into {self.directory}")
+
+
+notes_store = NotesStore(NOTES_DIR, legacy_file=NOTES_FILE)
+
+
+# === Notes Search ===
+NOTES_INDEX_FILE = os.path.join(NOTES_DIR, "search-index.json")
+NOTES_INDEX_COMPACT_BYTES = 1024 * 1024 # The delta log is folded into the snapshot past this size (or half the snapshot)
+NOTE_STOPWORDS = {"a", "an", "and", "are", "at", "be", "for", "i", "in", "is", "it", "me", "my",
+                  "of", "on", "or", "that", "the", "this", "to", "with"}
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MONTHS = ("january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december")
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40, "sixty": 60}
+DURATION_UNITS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+def note_terms(text):
+    # Lowercased words minus stopwords, with a plain plural "s" dropped so "appointments" finds "appointment"
+    terms = set()
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(word) < 2 or word in NOTE_STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.add(word)
+    return terms
+
+
+def parse_spoken_date_range(phrase, today=None):
+    """(first day, last day) for "today", "yesterday", "last tuesday", "last week", "3 days ago",
+    "october 3rd" and the like; None if the phrase isn't a date."""
+    today = today or datetime.date.today()
+    words = [w for w in re.findall(r"[a-z0-9]+", phrase.lower()) if w not in ("on", "the", "of")]
+    text = " ".join(words)
+    day = datetime.timedelta(days=1)
+    if text == "today":
+        return today, today
+    if text == "yesterday":
+        return today - day, today - day
+    if text in ("this week", "last week"):
+        monday = today - today.weekday() * day
+        if text == "last week":
+            monday -= 7 * day
+        return monday, min(monday + 6 * day, today)
+    if text in ("this month", "last month"):
+        first = today.replace(day=1)
+        if text == "last month":
+            first = (first - day).replace(day=1)
+            return first, today.replace(day=1) - day
+        return first, today
+    match = re.fullmatch(r"(\d+|[a-z]+) days? ago", text)
+    if match:
+        count = int(match.group(1)) if match.group(1).isdigit() else NUMBER_WORDS.get(match.group(1))
+        if count is not None:
+            return today - count * day, today - count * day
+    for number, name in enumerate(WEEKDAYS):
+        if text in (name, "this " + name, "last " + name):
+            back = (today.weekday() - number) % 7
+            if back == 0 and text.startswith("last "):
+                back = 7 # "Last Tuesday" said on a Tuesday means a week ago
+            return today - back * day, today - back * day
+    match = (re.fullmatch(r"([a-z]+) (\d{1,2})(?:st|nd|rd|th)?(?: (\d{4}))?", text)
+             or re.fullmatch(r"(\d{1,2})(?:st|nd|rd|th)? ([a-z]+)(?: (\d{4}))?", text))
+    if match:
+        month_name, day_number = match.group(1), match.group(2)
+        if month_name.isdigit():
+            month_name, day_number = day_number, month_name
+        if month_name in MONTHS:
+            year = int(match.group(3)) if match.group(3) else today.year
+            try:
+                date = datetime.date(year, MONTHS.index(month_name) + 1, int(day_number))
+            except ValueError:
+                return None
+            if date > today and not match.group(3): # "December 24th" said in January means last year's
+                with contextlib.suppress(ValueError):
+                    date = date.replace(year=year - 1)
+            return date, date
+    return None
+
+
+def parse_spoken_duration(text):
+    """Seconds for "five minutes", "the last 2 hours", "past hour" and the like; None if there's no duration."""
+    match = re.search(r"\b(\d+|[a-z]+) (second|minute|hour)s?\b", text)
+    if match:
+        count = int(match.group(1)) if match.group(1).isdigit() else NUMBER_WORDS.get(match.group(1))
+        if count:
+            return count * DURATION_UNITS[match.group(2)]
+    match = re.search(r"\b(?:last|past|an|the) (second|minute|hour)\b", text)
+    return DURATION_UNITS[match.group(1)] if match else None
+
+
+class NotesSearchIndex:
+    """Inverted index (term -> note ids) and date index (day -> note ids) kept in step with a NotesStore.
+
+    Posting lists are in id order, so new notes are appended and lookups intersect sorted lists.
+    Only notes added since the last save are read back from the store, so the text is never
+    rescanned once indexed. Saves append just those notes' postings to a delta log next to the
+    snapshot; the log is folded into a new snapshot once it grows past half the snapshot's size.
+    """
+
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".log"
+        self.terms = {}
+        self.dates = {} # "YYYY-MM-DD" -> note ids
+        self.indexed = 0 # Notes 0..indexed-1 are in the index
+        self._dirty = False
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock() # Keeps log appends and snapshots in order without holding _lock
+        self._compact = False # Next save writes a full snapshot instead of a delta
+        self._pending_from = 0 # Postings of notes _pending_from..indexed-1, not saved yet
+        self._pending_terms = {}
+        self._pending_dates = {}
+        self._snapshot_bytes = 0
+        self._log_bytes = 0
+
+    def open(self):
+        self.sync()
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.terms, self.dates, self.indexed = data["terms"], data["dates"], int(data["indexed"])
+            self._snapshot_bytes = os.path.getsize(self.path)
+            self._replay_log()
+            logging.info(f"Loaded notes search index ({self.indexed} notes, {len(self.terms)} terms)")
+        except FileNotFoundError:
+            self._compact = True
+        except Exception as e:
+            logging.warning(f"Rebuilding notes search index; couldn't load {self.path}: {e}")
+            self.terms, self.dates, self.indexed = {}, {}, 0
+            self._compact = True
+        self._pending_from = self.indexed
+
+    def _replay_log(self):
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        self._log_bytes = sum(len(line.encode("utf-8")) for line in lines)
+        for line in lines:
+            try:
+                delta = json.loads(line)
+                if delta["to"] <= self.indexed:
+                    continue # Already in the snapshot (a crash came before the log was cleared)
+                if delta["from"] != self.indexed:
+                    raise ValueError(f"gap before note {delta['from']}")
+            except Exception as e:
+                # A torn last line or a gap: sync() re-reads the rest from the store, and the next save starts clean
+                logging.warning(f"Stopped replaying {self.log_path} at note {self.indexed}: {e}")
+                self._compact = True
+                return
+            for term, ids in delta["terms"].items():
+                self.terms.setdefault(term, []).extend(ids)
+            for day, ids in delta["dates"].items():
+                self.dates.setdefault(day, []).extend(ids)
+            self.indexed = delta["to"]
+
+    def sync(self, batch=10000):
+        """Index any notes the store has that the index doesn't yet; returns how many were added."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            count = self.store.count
+            if self.indexed > count: # The store was replaced under us
+                logging.warning("Notes search index is ahead of the notes store; rebuilding it.")
+                self.terms, self.dates, self.indexed = {}, {}, 0
+                self._pending_from, self._pending_terms, self._pending_dates = 0, {}, {}
+                self._compact = True
+            track = not self._compact # A full snapshot is coming anyway; don't keep a second copy of the postings
+            added = 0
+            while self.indexed < count:
+                notes = self.store.read(self.indexed, min(count, self.indexed + batch))
+                if not notes:
+                    break
+                for note_id, when, text in notes:
+                    for term in note_terms(text):
+                        self.terms.setdefault(term, []).append(note_id)
+                        if track:
+                            self._pending_terms.setdefault(term, []).append(note_id)
+                    if when:
+                        day = when.strftime("%Y-%m-%d")
+                        self.dates.setdefault(day, []).append(note_id)
+                        if track:
+                            self._pending_dates.setdefault(day, []).append(note_id)
+                self.indexed = notes[-1][0] + 1
+                added += len(notes)
+            if added:
+                self._dirty = True
+            return added
+
+    def search(self, query, limit=None):
+        """Ids of notes containing every term of query, newest first; stops after limit matches."""
+        terms = note_terms(query)
+        matches = []
+        with self._lock:
+            postings = sorted((self.terms.get(term, []) for term in terms), key=len)
+            if not postings:
+                return matches
+            # Walk the rarest term's ids from the newest, checking the others by binary search
+            for note_id in reversed(postings[0]):
+                if all(self._contains(others, note_id) for others in postings[1:]):
+                    matches.append(note_id)
+                    if limit is not None and len(matches) >= limit:
+                        break
+        return matches
+
+    @staticmethod
+    def _contains(ids, note_id):
+        position = bisect.bisect_left(ids, note_id)
+        return position < len(ids) and ids[position] == note_id
+
+    def on_dates(self, first_day, last_day):
+        """Ids of notes taken between the two dates (inclusive), oldest first."""
+        matches = []
+        with self._lock:
+            day = first_day
+            while day <= last_day:
+                matches.extend(self.dates.get(day.strftime("%Y-%m-%d"), []))
+                day += datetime.timedelta(days=1)
+        return matches
+
+    def save_if_dirty(self):
+        """Persist the notes indexed since the last save; returns True if anything was written."""
+        with self._save_lock:
+            with self._lock: # Only long enough to take the pending postings or a shallow snapshot
+                if not self._dirty:
+                    return False
+                self._dirty = False
+                compact = (self._compact or (self.indexed - self._pending_from) * 4 >= self.indexed # A bulk catch-up
+                           or self._log_bytes >= max(NOTES_INDEX_COMPACT_BYTES, self._snapshot_bytes // 2))
+                if compact:
+                    # Shallow copies: the lists only grow, by ids >= indexed, so they're cut back to it below
+                    indexed, terms, dates = self.indexed, dict(self.terms), dict(self.dates)
+                    self._compact = False
+                else:
+                    delta = {"from": self._pending_from, "to": self.indexed,
+                             "terms": self._pending_terms, "dates": self._pending_dates}
+                self._pending_from, self._pending_terms, self._pending_dates = self.indexed, {}, {}
+            try:
+                if compact:
+                    save_json_atomic(self.path, {"indexed": indexed,
+                                                 "terms": {term: ids[:bisect.bisect_left(ids, indexed)] for term, ids in terms.items()},
+                                                 "dates": {day: ids[:bisect.bisect_left(ids, indexed)] for day, ids in dates.items()}})
+                    self._snapshot_bytes = os.path.getsize(self.path)
+                    open(self.log_path, "w").close() # Everything logged is in the snapshot now
+                    self._log_bytes = 0
+                else:
+                    line = (json.dumps(delta, separators=(",", ":")) + "\n").encode("utf-8")
+                    with open(self.log_path, "ab") as f:
+                        f.write(line)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._log_bytes += len(line)
+                return True
+            except Exception as e:
+                logging.error(f"Error saving notes search index to {self.path}: {e}")
+                with self._lock:
+                    self._dirty = self._compact = True # Retried as a full snapshot next time
+                return False
+
+
+notes_search = NotesSearchIndex(notes_store, NOTES_INDEX_FILE)
+
+
 # === Built-in Browser Opener ===
 def open_default_browser(url="https://www.google.com"):
     try:
+        import webbrowser # Deferred: only needed when a command opens a page
         webbrowser.open(url) # Opens in the default browser
         logging.info(f"Opened {url} in default browser.")
         return True
@@ -399,6 +2706,8 @@ def open_default_browser(url="https://www.google.com"):
 # === GUI Prompt for Manual Path ===
 def prompt_for_exe(title="Select executable"):
     try:
+        import tkinter as tk # Deferred: Tk is slow to import and rarely needed
+        from tkinter import filedialog
         root = tk.Tk()
         root.withdraw() # Hide the main Tkinter window
         path = filedialog.askopenfilename(
@@ -413,6 +2722,640 @@ def prompt_for_exe(title="Select executable"):
         return None
 
 
+# === Shell Command Executor ===
+SHELL_MAX_JOBS = max(1, env_number("NOVA_SHELL_MAX_JOBS", 2, int)) # Custom "shell" commands running at once; more wait their turn
+SHELL_TIMEOUT = env_number("NOVA_SHELL_TIMEOUT", 300) # Default seconds before a command is stopped ("timeout" overrides it per command)
+SHELL_KILL_GRACE = 5.0 # Seconds between asking a timed-out command to stop and killing it
+SHELL_OUTPUT_BYTES = 64 * 1024 # Output kept per job (the end of it)
+SHELL_HISTORY = 20 # Finished jobs kept for the log and "what's running"
+metrics.describe("shell_jobs_total", "counter", "Custom shell commands by outcome.")
+
+
+class OutputTail:
+    """The last `limit` bytes written to it, and how many came before them."""
+
+    def __init__(self, limit=SHELL_OUTPUT_BYTES):
+        self.limit = limit
+        self.dropped = 0
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        with self._lock:
+            self._buffer += data
+            excess = len(self._buffer) - self.limit
+            if excess > 0:
+                del self._buffer[:excess]
+                self.dropped += excess
+
+    def text(self):
+        with self._lock:
+            return self._buffer.decode("utf-8", errors="replace")
+
+
+class ShellJob:
+    def __init__(self, job_id, name, command, timeout, speak_result):
+        self.id = job_id
+        self.name = name # The phrase that started it, for logs and "what's running"
+        self.command = command
+        self.timeout = timeout
+        self.speak_result = speak_result
+        self.state = "queued" # -> running -> finished / failed / timed_out / error / cancelled
+        self.returncode = None
+        self.stopping = False # Set when the assistant stops it on exit
+        self.output = OutputTail()
+        self.process = None
+        self.started = None # time.perf_counter(), like the stage timings
+        self.ended = None
+        self.done = threading.Event()
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.ended or time.perf_counter()) - self.started
+
+
+class ShellExecutor:
+    """Runs custom "shell" commands with a concurrency limit, a timeout per command (terminate,
+    then kill the whole process tree) and their output captured; every process is waited for."""
+
+    def __init__(self, max_jobs=SHELL_MAX_JOBS, kill_grace=SHELL_KILL_GRACE):
+        self.max_jobs = max_jobs
+        self.kill_grace = kill_grace
+        self.running = {} # job id -> ShellJob
+        self.pending = deque()
+        self.history = deque(maxlen=SHELL_HISTORY)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, name, command, timeout=None, speak_result=False):
+        """Start the command now if a slot is free, otherwise queue it. Returns the ShellJob."""
+        job = ShellJob(next(self._ids), name, command, timeout or SHELL_TIMEOUT, speak_result)
+        with self._lock:
+            if self._closed:
+                job.state = "cancelled"
+                job.done.set()
+                return job
+            if len(self.running) >= self.max_jobs:
+                self.pending.append(job)
+                logging.info(f"Shell job {job.id} ('{name}') queued behind {len(self.running)} running job(s).")
+                return job
+            self.running[job.id] = job
+        self._start(job)
+        return job
+
+    def _start(self, job):
+        job.started = time.perf_counter()
+        try:
+            if os.name == "nt":
+                options = {"creationflags": 0x08000000 | subprocess.CREATE_NEW_PROCESS_GROUP} # CREATE_NO_WINDOW
+            else:
+                options = {"start_new_session": True} # Its own process group, so the whole tree can be signalled
+            job.process = subprocess.Popen(job.command, shell=True, stdin=subprocess.DEVNULL,
+                                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **options)
+        except Exception as e:
+            logging.error(f"Error starting shell command '{job.command}': {e}")
+            job.output.write(str(e).encode("utf-8", errors="replace"))
+            self._finish(job, "error")
+            return
+        job.state = "running"
+        logging.info(f"Shell job {job.id} ('{job.name}') started as pid {job.process.pid}, timeout {job.timeout:g}s.")
+        threading.Thread(target=self._read_output, args=(job,), daemon=True, name=f"shell-{job.id}-output").start()
+        threading.Thread(target=self._supervise, args=(job,), daemon=True, name=f"shell-{job.id}").start()
+
+    @staticmethod
+    def _read_output(job):
+        stream = job.process.stdout
+        try:
+            for chunk in iter(lambda: stream.read1(4096), b""):
+                job.output.write(chunk)
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+
+    def _supervise(self, job):
+        try:
+            job.process.wait(timeout=job.timeout)
+            state = "cancelled" if job.stopping else "finished" if job.process.returncode == 0 else "failed"
+        except subprocess.TimeoutExpired:
+            logging.warning(f"Shell job {job.id} ('{job.name}') ran past {job.timeout:g}s; stopping it.")
+            self._stop_process(job.process)
+            state = "timed_out"
+        self._finish(job, state)
+
+    def _stop_process(self, process):
+        # Ask the whole tree to stop, then kill it if it hasn't after the grace period
+        for force in (False, True):
+            try:
+                if os.name == "nt":
+                    subprocess.run(["taskkill", "/T", "/PID", str(process.pid)] + (["/F"] if force else []),
+                                   capture_output=True, creationflags=0x08000000)
+                else:
+                    os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+            except (OSError, subprocess.SubprocessError) as e:
+                logging.debug(f"Stopping pid {process.pid}: {e}")
+            try:
+                process.wait(timeout=self.kill_grace)
+                return
+            except subprocess.TimeoutExpired:
+                continue
+        process.wait() # SIGKILL can't be ignored; reap it
+
+    def _finish(self, job, state):
+        job.state = state
+        job.ended = time.perf_counter()
+        job.returncode = job.process.returncode if job.process else None
+        next_jobs = []
+        with self._lock:
+            self.running.pop(job.id, None)
+            self.history.append(job)
+            while self.pending and len(self.running) + len(next_jobs) < self.max_jobs and not self._closed:
+                next_jobs.append(self.pending.popleft())
+            for next_job in next_jobs:
+                self.running[next_job.id] = next_job
+        job.done.set()
+        metrics.inc("shell_jobs_total", result=state)
+        emit_stage("shell_job", job.started, job.ended, command=job.name, result=state)
+        tail = job.output.text().strip()[-500:]
+        log = logging.info if state == "finished" else logging.warning
+        log(f"Shell job {job.id} ('{job.name}') {state.replace('_', ' ')} after {job.elapsed():.1f}s"
+            f" (exit code {job.returncode})" + (f"; output ends: {tail!r}" if tail else ""))
+        if job.speak_result and state != "cancelled":
+            speak(self.describe_result(job))
+        for next_job in next_jobs:
+            self._start(next_job)
+
+    @staticmethod
+    def describe_result(job):
+        if job.state == "finished":
+            return f"{job.name} finished."
+        if job.state == "failed":
+            return f"{job.name} failed with exit code {job.returncode}."
+        if job.state == "timed_out":
+            return f"{job.name} was still running after {job.timeout:g} seconds, so I stopped it."
+        return f"I couldn't run {job.name}."
+
+    def snapshot(self):
+        """(running jobs, queued jobs), oldest first."""
+        with self._lock:
+            return sorted(self.running.values(), key=lambda job: job.id), list(self.pending)
+
+    def shutdown(self, wait=True):
+        """Drop queued jobs and stop running ones."""
+        with self._lock:
+            self._closed = True
+            cancelled, running = list(self.pending), list(self.running.values())
+            self.pending.clear()
+        for job in cancelled:
+            job.state = "cancelled"
+            job.done.set()
+        for job in running:
+            job.stopping = True
+            if job.process and job.process.poll() is None:
+                self._stop_process(job.process)
+        if wait:
+            for job in running:
+                job.done.wait(self.kill_grace)
+
+
+shell_executor = ShellExecutor()
+
+
+# === Timers & Reminders ===
+REMINDERS_FILE = os.path.join(writable_user_data_dir, "reminders.json")
+SCHEDULER_RESYNC_SECONDS = env_number("NOVA_SCHEDULER_RESYNC_SECONDS", 60) # Longest sleep while a timer waits on a time of day
+SCHEDULER_CLOCK_JUMP = 1.0 # Seconds the wall clock may drift from the monotonic one before timers are re-synced
+REMINDER_MISSED_GRACE = 12 * 3600 # A one-off reminder missed while the assistant was off is still said if this recent
+REMINDERS_READ_LIMIT = 5 # Upcoming reminders read aloud; the rest are only counted
+metrics.describe("timers_fired_total", "counter", "Scheduler timers run.")
+metrics.describe("scheduler_resyncs_total", "counter", "Times timers were re-synced after a suspend or clock change.")
+
+
+class ScheduledTimer:
+    __slots__ = ("due", "at", "callback", "name", "interval", "cancelled", "queued")
+
+    def __init__(self, due, callback, name, interval=None, at=None):
+        self.due = due # time.monotonic() deadline
+        self.at = at # time.time() it should run at, for timers set for a time of day
+        self.callback = callback
+        self.name = name
+        self.interval = interval # Seconds between runs of a repeating timer
+        self.cancelled = False
+        self.queued = False
+
+
+class TimerScheduler:
+    """Runs callbacks when they fall due, from one thread that sleeps until the earliest deadline.
+
+    Timers sit in a heap on the monotonic clock. A timer for a time of day also remembers its
+    wall-clock time; when the wall clock moves against the monotonic one (a suspend, or the clock
+    being changed) those deadlines are recomputed. Sleeps are capped at `resync` seconds only while
+    such a timer is pending, so a jump is noticed in time; with nothing due the thread doesn't wake.
+    Cancelled timers stay in the heap until they reach the top (or make up half of it).
+    """
+
+    def __init__(self, resync=SCHEDULER_RESYNC_SECONDS):
+        self.resync = resync
+        self.wakeups = 0 # Times the thread woke up, for the benchmark
+        self._heap = [] # (due, seq, timer)
+        self._seq = itertools.count()
+        self._cancelled = 0 # Cancelled timers still in the heap
+        self._wall = 0 # Timers in the heap with a wall-clock time
+        self._offset = time.time() - time.monotonic()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, daemon=True, name="scheduler")
+                self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=2)
+
+    def call_later(self, delay, callback, name=""):
+        return self._push(ScheduledTimer(time.monotonic() + delay, callback, name))
+
+    def call_every(self, interval, callback, name="", first=None):
+        delay = interval if first is None else first
+        return self._push(ScheduledTimer(time.monotonic() + delay, callback, name, interval=interval))
+
+    def call_at(self, when, callback, name=""):
+        """Run callback at `when` (a datetime or time.time() value) by the wall clock."""
+        if isinstance(when, datetime.datetime):
+            when = when.timestamp()
+        with self._cond:
+            return self._push(ScheduledTimer(when - self._offset, callback, name, at=when))
+
+    def cancel(self, timer):
+        with self._cond:
+            if timer.cancelled:
+                return
+            timer.cancelled = True
+            if not timer.queued:
+                return
+            self._cancelled += 1
+            if timer.at is not None:
+                self._wall -= 1
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._rebuild()
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap) - self._cancelled
+
+    def _push(self, timer):
+        with self._cond:
+            timer.queued = True
+            if timer.at is not None:
+                self._wall += 1
+            heapq.heappush(self._heap, (timer.due, next(self._seq), timer))
+            if self._heap[0][2] is timer: # New earliest deadline: the thread has to wake sooner
+                self._cond.notify()
+        return timer
+
+    def _rebuild(self):
+        for _, _, timer in self._heap:
+            if timer.cancelled:
+                timer.queued = False
+            elif timer.at is not None:
+                timer.due = timer.at - self._offset
+        self._heap = [(timer.due, seq, timer) for _, seq, timer in self._heap if not timer.cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    def _resync_if_clock_moved(self):
+        offset = time.time() - time.monotonic()
+        if abs(offset - self._offset) <= SCHEDULER_CLOCK_JUMP:
+            return
+        logging.info(f"Scheduler: wall clock moved {offset - self._offset:+.0f}s (suspend or clock change); "
+                     f"re-syncing {self._wall} timer(s) set for a time of day.")
+        self._offset = offset
+        self._rebuild()
+        metrics.inc("scheduler_resyncs_total")
+
+    def _pop_due(self):
+        due, now = [], time.monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            timer = heapq.heappop(self._heap)[2]
+            timer.queued = False
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            if timer.at is not None:
+                self._wall -= 1
+            due.append(timer)
+        return due
+
+    def _sleep_time(self):
+        if not self._heap:
+            return None # Until a timer is added
+        wait = max(0.0, self._heap[0][0] - time.monotonic())
+        return min(wait, self.resync) if self._wall else wait
+
+    def _run(self):
+        logging.info("Scheduler thread started.")
+        while True:
+            with self._cond:
+                self._resync_if_clock_moved()
+                due = self._pop_due()
+                while not due and not self._stopped:
+                    self._cond.wait(self._sleep_time())
+                    self.wakeups += 1
+                    self._resync_if_clock_moved()
+                    due = self._pop_due()
+                if self._stopped:
+                    return
+            for timer in due:
+                try:
+                    timer.callback()
+                except Exception as e:
+                    logging.error(f"Scheduled task '{timer.name}' failed: {e}", exc_info=True)
+                metrics.inc("timers_fired_total")
+                if timer.interval is not None and not timer.cancelled:
+                    # Catch up by skipping runs rather than firing a burst of them
+                    timer.due = max(timer.due + timer.interval, time.monotonic())
+                    self._push(timer)
+
+
+timer_scheduler = TimerScheduler()
+
+
+# "at 5", "at 5:30", "at 5 30", "at 5 pm", "at 5:30 p.m.", "at 17:00", "at noon"
+_TIME_OF_DAY = r"(noon|midday|midnight|(\d{1,2})(?:[:.](\d{2})| (\d{2})\b)?(?: o'?clock)?(?: ?([ap])\.? ?m\b\.?)?)"
+_DURATION = r"((?:\d+|[a-z]+) (?:second|minute|hour)s?)\b"
+AT_TIME_PATTERN = re.compile(r"\bat " + _TIME_OF_DAY)
+IN_DURATION_PATTERN = re.compile(r"\bin " + _DURATION)
+HOUR_WORDS = ("one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve")
+MINUTE_WORDS = {"fifteen": 15, "twenty": 20, "thirty": 30, "forty five": 45, "forty": 40, "fifty": 50} # "five thirty"
+REMINDER_DAY_PATTERN = re.compile(r"\b(?:(today|tonight|tomorrow)|(?:on |this |next )?(" + "|".join(WEEKDAYS) + r"))\b")
+ROUTINE_DAYS = {"day": tuple(range(7)), "morning": tuple(range(7)), "evening": tuple(range(7)), "night": tuple(range(7)),
+                "weekday": tuple(range(5)), "weekend": (5, 6), **{name: (number,) for number, name in enumerate(WEEKDAYS)}}
+_ROUTINE_DAY = "(?:" + "|".join(ROUTINE_DAYS) + ")s?"
+# "every day", "every weekday", "every monday and friday", "every tuesdays, thursdays"
+ROUTINE_EVERY_PATTERN = re.compile(rf"\bevery ({_ROUTINE_DAY}(?:(?:,? and |, | ){_ROUTINE_DAY})*)\b")
+
+
+def parse_time_of_day(match):
+    """(hour, minute, ambiguous) from an AT_TIME_PATTERN match, or None; ambiguous means no AM/PM was said."""
+    if match.group(1) in ("noon", "midday"):
+        return 12, 0, False
+    if match.group(1) == "midnight":
+        return 0, 0, False
+    hour, minute = int(match.group(2)), int(match.group(3) or match.group(4) or 0)
+    if hour > 23 or minute > 59:
+        return None
+    if match.group(5):
+        if not 1 <= hour <= 12:
+            return None
+        return hour % 12 + (12 if match.group(5) == "p" else 0), minute, False
+    return hour, minute, 1 <= hour <= 11
+
+
+def next_occurrence(hour, minute, days=tuple(range(7)), after=None, ambiguous=False):
+    """The first datetime after `after` at hour:minute on one of `days` (0 is Monday).
+    If ambiguous (no AM/PM said), whichever of hour and hour + 12 comes first."""
+    after = after or datetime.datetime.now()
+    hours = (hour, hour + 12) if ambiguous else (hour,)
+    for offset in range(8):
+        day = after.date() + datetime.timedelta(days=offset)
+        if day.weekday() not in days:
+            continue
+        upcoming = [datetime.datetime.combine(day, datetime.time(h, minute)) for h in hours]
+        upcoming = [when for when in upcoming if when > after]
+        if upcoming:
+            return min(upcoming)
+    return None
+
+
+def _reminder_subject(text):
+    text = re.sub(r"\s+", " ", text).strip(" ,?.!")
+    return re.sub(r"^(?:to|that|about|of) ", "", text)
+
+
+def parse_reminder(text, now=None):
+    """(due datetime, subject) for "remind me at 5 to stretch", "remind me to call mom in ten minutes",
+    "remind me tomorrow at 9 am to pay rent"; None if no time was given. The subject may be empty."""
+    now = now or datetime.datetime.now()
+    body = re.sub(r"^.*?\bremind me\b", "", text.lower())
+    match = IN_DURATION_PATTERN.search(body)
+    seconds = parse_spoken_duration(match.group(1)) if match else None
+    if seconds:
+        return now + datetime.timedelta(seconds=seconds), _reminder_subject(body[:match.start()] + body[match.end():])
+    match = AT_TIME_PATTERN.search(body)
+    parsed = parse_time_of_day(match) if match else None
+    if not parsed:
+        return None
+    hour, minute, ambiguous = parsed
+    body = body[:match.start()] + body[match.end():]
+    after, days = now, tuple(range(7))
+    day_match = REMINDER_DAY_PATTERN.search(body)
+    if day_match:
+        body = body[:day_match.start()] + body[day_match.end():]
+        if day_match.group(1) == "tonight" and ambiguous:
+            hour, ambiguous = hour + 12, False
+        elif day_match.group(1) == "tomorrow":
+            after = datetime.datetime.combine(now.date(), datetime.time.max) # Anything on or after tomorrow's midnight
+            days = ((now.weekday() + 1) % 7,)
+        elif day_match.group(2):
+            days = (WEEKDAYS.index(day_match.group(2)),)
+    due = next_occurrence(hour, minute, days, after, ambiguous)
+    return (due, _reminder_subject(body)) if due else None
+
+
+def reminder_time_answer(answer):
+    """An answer to "When should I remind you?" worded the way parse_reminder reads times:
+    "5 pm" -> "at 5 pm", "five o'clock" -> "at 5 o'clock", "noon" -> "at noon", "ten minutes" -> "in ten minutes"."""
+    answer = answer.lower().strip(" ?.!")
+    if AT_TIME_PATTERN.search(answer) or IN_DURATION_PATTERN.search(answer):
+        return answer
+    match = re.search(r"\b" + _DURATION, answer)
+    if match and parse_spoken_duration(match.group(1)):
+        return f"{answer[:match.start()]}in {answer[match.start():]}"
+    answer = re.sub(r"\b(\d{1,2}|" + "|".join(HOUR_WORDS) + ") (" + "|".join(MINUTE_WORDS) + r")\b",
+                    lambda words: f"{words.group(1)}:{MINUTE_WORDS[words.group(2)]:02d}", answer)
+    answer = re.sub(r"\b(" + "|".join(HOUR_WORDS) + r")\b", lambda word: str(HOUR_WORDS.index(word.group(1)) + 1), answer)
+    match = re.search(r"\b" + _TIME_OF_DAY, answer)
+    if match and parse_time_of_day(AT_TIME_PATTERN.match(f"at {match.group(1)}")):
+        return f"{answer[:match.start()]}at {answer[match.start():]}"
+    return answer
+
+
+def parse_routine(text):
+    """(days, hour, minute, action) for "every weekday at 9 say the date" or "every monday and friday
+    at 6 pm remind me to water the plants"; None if the days or time aren't understood. The action
+    is whatever else was said, before or after: "remind me to stretch every day at 3" works too."""
+    text = text.lower().strip(" ?.!")
+    every = ROUTINE_EVERY_PATTERN.search(text)
+    match = every and (AT_TIME_PATTERN.search(text, every.end()) or AT_TIME_PATTERN.search(text))
+    parsed = parse_time_of_day(match) if match else None
+    if not parsed:
+        return None
+    hour, minute, ambiguous = parsed
+    days, words = set(), re.findall(r"[a-z]+", every.group(1))
+    for word in words:
+        if word in ROUTINE_DAYS:
+            days.update(ROUTINE_DAYS[word])
+        elif word != "and": # "mondays", "weekdays"
+            days.update(ROUTINE_DAYS[word[:-1]])
+    if ambiguous: # Routines repeat, so "at 9" has to settle on one of them: 7-11 is morning, 1-6 afternoon
+        evening = any(word in ("evening", "evenings", "night", "nights") for word in words)
+        if evening or (hour < 7 and not any(word in ("morning", "mornings") for word in words)):
+            hour += 12
+    (first, first_end), (second, second_end) = sorted((every.span(), match.span()))
+    action = f"{text[:first]} {text[first_end:second]} {text[second_end:]}"
+    return sorted(days), hour, minute, _reminder_subject(action)
+
+
+def routine_action(action):
+    """("say", text) or ("command", phrase) for what a routine should do when it fires."""
+    if action.startswith("remind me "):
+        return "say", f"Reminder: {_reminder_subject(action[len('remind me '):])}."
+    if action.startswith("say "):
+        spoken = action[len("say "):]
+        # "say the date" means read it out, "say time for lunch" means say those words
+        if re.sub(r"^(?:the|my|what's|what is) ", "", spoken) in COMMAND_DISPATCHER:
+            return "command", spoken
+        return "say", spoken
+    matcher = command_matcher
+    if matcher.match_dispatcher(action) or action in matcher.custom_phrases or action.startswith(("open ", "launch ")):
+        return "command", action
+    return "say", f"Reminder: {action}."
+
+
+class ReminderStore:
+    """Reminders and routines set by voice, kept in reminders.json and armed on a TimerScheduler.
+
+    Each entry stores when it's next due as a timestamp. A routine also stores its days and time
+    of day, and after it fires is re-armed for the next occurrence by local time (so it follows
+    daylight saving changes). `run_command` runs the phrase of a "command" entry.
+    """
+
+    def __init__(self, path, scheduler, run_command=None):
+        self.path = path
+        self.scheduler = scheduler
+        self.run_command = run_command
+        self._entries = {} # id -> {"id", "kind", "text", "label", "due", "repeat"}
+        self._timers = {} # id -> ScheduledTimer
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def load(self):
+        data = load_json_data(self.path, {})
+        if not isinstance(data, dict):
+            logging.warning(f"Ignoring {self.path}: expected an object with a 'reminders' list.")
+            data = {}
+        now, dropped = time.time(), 0
+        with self._lock:
+            for entry in data.get("reminders", []):
+                try:
+                    entry = {"id": int(entry["id"]), "kind": entry["kind"], "text": str(entry["text"]),
+                             "label": str(entry.get("label", entry["text"])), "due": float(entry["due"]),
+                             "repeat": entry.get("repeat")}
+                    if entry["kind"] not in ("say", "command"):
+                        raise ValueError(f"unknown kind '{entry['kind']}'")
+                    if entry["repeat"]:
+                        entry["due"] = self._next_due(entry["repeat"]) # Occurrences missed while off are skipped
+                except (KeyError, TypeError, ValueError) as e:
+                    logging.warning(f"Skipping a reminder in {self.path}: {e!r}")
+                    dropped += 1
+                    continue
+                if not entry["repeat"] and entry["due"] < now - REMINDER_MISSED_GRACE:
+                    logging.info(f"Dropping reminder '{entry['label']}', missed at {datetime.datetime.fromtimestamp(entry['due'])}.")
+                    dropped += 1
+                    continue
+                self._entries[entry["id"]] = entry
+                self._arm(entry)
+            self._next_id = max([int(data.get("next_id", 1))] + [entry_id + 1 for entry_id in self._entries])
+        if dropped:
+            with self._lock:
+                self._save_quietly()
+        logging.info(f"Loaded {len(self._entries)} reminder(s) and routine(s) from {self.path}")
+        return len(self._entries)
+
+    def add(self, kind, text, label, due, repeat=None):
+        with self._lock:
+            entry = {"id": self._next_id, "kind": kind, "text": text, "label": label,
+                     "due": due.timestamp() if isinstance(due, datetime.datetime) else due, "repeat": repeat}
+            self._next_id += 1
+            self._entries[entry["id"]] = entry
+            try:
+                self._save_locked()
+            except Exception:
+                del self._entries[entry["id"]]
+                raise
+            self._arm(entry)
+        return entry
+
+    def remove(self, entry_id):
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                return None
+            self.scheduler.cancel(self._timers.pop(entry_id))
+            self._save_quietly()
+        return entry
+
+    def upcoming(self):
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda entry: entry["due"])
+
+    def find(self, subject):
+        words = note_terms(subject)
+        return [entry for entry in self.upcoming() if words and words <= note_terms(entry["label"])]
+
+    @staticmethod
+    def _next_due(repeat):
+        hour, minute = (int(part) for part in repeat["time"].split(":"))
+        when = next_occurrence(hour, minute, tuple(int(day) for day in repeat["days"]))
+        if when is None:
+            raise ValueError(f"routine has no days: {repeat!r}")
+        return when.timestamp()
+
+    def _arm(self, entry):
+        entry_id = entry["id"]
+        self._timers[entry_id] = self.scheduler.call_at(entry["due"], lambda: self._fire(entry_id), f"reminder {entry_id}")
+
+    def _fire(self, entry_id):
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return
+            if entry["repeat"]:
+                entry["due"] = self._next_due(entry["repeat"])
+                self._arm(entry)
+            else:
+                del self._entries[entry_id]
+                self._timers.pop(entry_id, None)
+            self._save_quietly()
+        logging.info(f"Reminder {entry_id} due: {entry['label']}")
+        if entry["kind"] == "command" and self.run_command:
+            threading.Thread(target=self.run_command, args=(entry["text"],), daemon=True, name="routine").start()
+        else:
+            speak(entry["text"])
+
+    def _save_locked(self):
+        save_json_atomic(self.path, {"next_id": self._next_id,
+                                     "reminders": sorted(self._entries.values(), key=lambda entry: entry["id"])})
+
+    def _save_quietly(self):
+        try:
+            self._save_locked()
+        except Exception as e:
+            logging.error(f"Could not save reminders to {self.path}: {e}")
+
+
+
 # --- Command Handler Functions ---
 def cmd_open_google(command_text):
     if open_default_browser("https://www.google.com"):
@@ -435,12 +3378,12 @@ def cmd_mute_system(command_text):
 
 
 def cmd_sleep_system(command_text):
-    speak("Putting the computer to sleep.")
+    speak_and_wait("Putting the computer to sleep.", timeout=10) # Finish speaking before suspending
     sleep_system()
 
 
 def cmd_shutdown_system(command_text):
-    speak("Shutting down the computer.")
+    speak_and_wait("Shutting down the computer.", timeout=10) # Finish speaking before shutting down
     shutdown_system()
 
 
@@ -467,30 +3410,72 @@ def cmd_get_current_date(command_text):
 
 
 def cmd_get_system_info(command_text):
-    speak("Getting system information...")
+    text = command_text.lower()
+    parts = [part for part, words in (("cpu", ("cpu", "processor")), ("ram", ("ram", "memory")),
+                                      ("disk", ("disk", "storage"))) if any(word in text for word in words)]
     try:
-        # CPU Usage
-        cpu_usage = psutil.cpu_percent(interval=1) # Get usage over 1 second
-        speak(f"Current CPU usage is {cpu_usage} percent.")
-
-        # Memory (RAM) Usage
-        mem = psutil.virtual_memory()
-        mem_total_gb = round(mem.total / (1024**3), 1) # Total RAM in GB
-        mem_used_gb = round(mem.used / (1024**3), 1)   # Used RAM in GB
-        speak(f"RAM usage is {mem.percent} percent. Currently using {mem_used_gb} of {mem_total_gb} gigabytes.")
-
-        # Disk Usage (for C: drive on Windows, / on Linux/Mac)
-        disk_path = 'C:\\' if os.name == 'nt' else '/'
-        disk = psutil.disk_usage(disk_path)
-        disk_total_gb = round(disk.total / (1024**3), 1) # Total disk space in GB
-        disk_used_gb = round(disk.used / (1024**3), 1)   # Used disk space in GB
-        speak(f"Disk {disk_path} is {disk.percent} percent used. Used {disk_used_gb} of {disk_total_gb} gigabytes.")
+        # Answered from the background sampler; only before its first reading is a (short) one taken here
+        sample = system_sampler.latest(max_age=3 * system_sampler.interval) or system_sampler.sample(cpu_interval=0.2)
+        if not parts or "cpu" in parts:
+            speak(f"Current CPU usage is {sample.cpu} percent.")
+        if not parts or "ram" in parts:
+            mem_total_gb = round(sample.ram_total / (1024**3), 1) # Total RAM in GB
+            mem_used_gb = round(sample.ram_used / (1024**3), 1)   # Used RAM in GB
+            speak(f"RAM usage is {sample.ram_percent} percent. Currently using {mem_used_gb} of {mem_total_gb} gigabytes.")
+        if not parts or "disk" in parts:
+            disk_total_gb = round(sample.disk_total / (1024**3), 1) # Total disk space in GB
+            disk_used_gb = round(sample.disk_used / (1024**3), 1)   # Used disk space in GB
+            speak(f"Disk {SYSTEM_DISK_PATH} is {sample.disk_percent} percent used. Used {disk_used_gb} of {disk_total_gb} gigabytes.")
 
     except Exception as e:
         speak("Sorry, I couldn't retrieve all system information at the moment.")
         logging.error(f"Error getting system info: {e}")
 
 
+def cmd_system_trend(command_text):
+    text = command_text.lower()
+    label, field = "CPU usage", "cpu"
+    if "memory" in text or "ram" in text:
+        label, field = "RAM usage", "ram_percent"
+    elif "disk" in text:
+        label, field = "disk usage", "disk_percent"
+    seconds = min(parse_spoken_duration(text) or 5 * 60, system_sampler.history_seconds)
+    samples = system_sampler.window(seconds)
+    if len(samples) < 2:
+        speak("I haven't been measuring for long enough yet. Ask me again in a minute.")
+        return
+    values = [getattr(sample, field) for sample in samples]
+    covered = min(seconds, samples[-1].taken - samples[0].taken + system_sampler.interval)
+    speak(f"{label} over the last {format_duration(covered)} averaged {sum(values) / len(values):.0f} percent, "
+          f"peaking at {max(values):.0f}. It's {values[-1]:.0f} percent now.")
+
+
+def format_bytes(size):
+    if size >= 1024**3:
+        return f"{size / 1024**3:.1f} gigabytes"
+    return f"{size / 1024**2:.0f} megabytes"
+
+
+def cmd_top_memory(command_text):
+    seconds = min(parse_spoken_duration(command_text.lower()) or system_sampler.history_seconds,
+                  system_sampler.history_seconds)
+    try:
+        top = system_sampler.top_memory(seconds)
+        if not top: # Nothing sampled yet
+            top = system_sampler.sample_processes()
+    except Exception as e:
+        speak("Sorry, I couldn't check which programs are using memory.")
+        logging.error(f"Error getting per-process memory: {e}")
+        return
+    if not top:
+        speak("I couldn't see any running programs.")
+        return
+    name, size = top[0]
+    name = os.path.splitext(name)[0]
+    others = ", ".join(f"{os.path.splitext(n)[0]} with {format_bytes(s)}" for n, s in top[1:3])
+    speak(f"{name} has been using the most memory, about {format_bytes(size)}." + (f" Then {others}." if others else ""))
+
+
 def cmd_create_folder(command_text):
     folder_name = ""
     # Define various trigger phrases for creating a folder
@@ -501,8 +3486,7 @@ def cmd_create_folder(command_text):
             break
 
     if not folder_name:
-        speak("What name would you like for the folder?")
-        # Potentially listen for a follow-up, but for now, just prompts.
+        ask_followup("What name would you like for the folder?", lambda answer: cmd_create_folder("create folder " + answer))
         return
 
     # Sanitize folder name (remove invalid characters for Windows filenames)
@@ -560,81 +3544,230 @@ def cmd_take_note(command_text): # Expects the full command text to extract the
     # Define trigger phrases for taking a note
     triggers = ["take a note ", "note to self ", "add note ", "make a note ", "new note "]
     for trigger in triggers:
-        if command_text.lower().startswith(trigger):
+        if command_text.lower().startswith(trigger) or command_text.lower() == trigger.strip(): # Bare "take a note" asks
             note_content = command_text[len(trigger):].strip()
             break
 
     if not note_content or note_content.lower() == "note": # If only "note" or empty after trigger
-        speak("What should the note say?")
-        # Could add a listen here for the content, but simple for now
+        ask_followup("What should the note say?", lambda answer: cmd_take_note("take a note " + answer))
         return
 
     try:
-        # NOTES_FILE is defined globally using writable_user_data_dir
-        with open(NOTES_FILE, "a", encoding="utf-8") as f: # Append to notes file
-            f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: {note_content}\n")
+        note_id = notes_store.append(note_content)
         speak("Noted.")
-        logging.info(f"Note added to {NOTES_FILE}")
+        logging.info(f"Note {note_id} added to {NOTES_DIR}")
     except Exception as e:
         speak("Sorry, I couldn't save your note right now.")
-        logging.error(f"Error writing notes to {NOTES_FILE}: {e}")
+        logging.error(f"Error writing notes to {NOTES_DIR}: {e}")
+        return
+    try:
+        notes_search.sync() # Indexes just the new note
+    except Exception as e:
+        logging.error(f"Error indexing new note for search: {e}")
 
 
 def cmd_read_notes(command_text):
+    if NOTE_QUERY_PATTERN.search(command_text.lower()): # "What are my notes from yesterday?"
+        return cmd_find_notes(command_text)
     try:
-        # NOTES_FILE is defined globally
-        if os.path.exists(NOTES_FILE):
-            with open(NOTES_FILE, "r", encoding="utf-8") as f:
-                notes = f.readlines()
-            if notes:
-                speak("Here are your latest notes:")
-                time.sleep(0.2) # Slight pause for effect
-                # Read the last few notes (e.g., last 3)
-                for note_line in notes[-min(len(notes), 3):]:
-                    # Attempt to extract content after "YYYY-MM-DD HH:MM:SS: "
-                    content = note_line.split(": ", 1)[1].strip() if ": " in note_line else note_line.strip()
-                    speak(content)
-                    time.sleep(0.3) # Pause between notes
-            else:
-                speak("You don't have any notes saved yet.")
+        notes = notes_store.tail(3) # Only the last few notes are read from disk
+        if notes:
+            speak("Here are your latest notes:")
+            for _, _, content in notes:
+                speak(content)
         else:
             speak("You don't have any notes saved yet.")
-            logging.info(f"Notes file not found at {NOTES_FILE} when trying to read.")
     except Exception as e:
         speak("Sorry, I couldn't read your notes right now.")
-        logging.error(f"Error reading notes from {NOTES_FILE}: {e}")
+        logging.error(f"Error reading notes from {NOTES_DIR}: {e}")
+
+
+# "notes about dentist", "notes from last tuesday", "notes that mention the passport"
+NOTE_QUERY_PATTERN = re.compile(r"\bnotes?\s+(about|on|from|for|mentioning|containing|regarding|that mentions?|that say)\s+(.+)$")
+NOTES_READ_LIMIT = 3 # Matches read aloud; the rest are only counted
+
+
+def cmd_find_notes(command_text):
+    match = NOTE_QUERY_PATTERN.search(command_text.lower())
+    if not match:
+        ask_followup("What should I look for in your notes? A topic, or a day like 'yesterday'.",
+                     lambda answer: cmd_find_notes(("notes " if NOTE_QUERY_PATTERN.search("notes " + answer) else "notes about ") + answer))
+        return
+    subject = match.group(2).strip(" ?.!")
+    try:
+        notes_search.sync() # Normally a no-op; catches up if startup indexing hasn't finished
+        date_range = parse_spoken_date_range(subject)
+        if date_range:
+            matches = notes_search.on_dates(*date_range)
+            note_ids = matches[-NOTES_READ_LIMIT:]
+            total = len(matches)
+            found = f"{total} note{'s' if total != 1 else ''} from {subject}"
+        else:
+            matches = notes_search.search(subject, limit=NOTES_READ_LIMIT + 1) # One extra tells us there are more
+            note_ids = sorted(matches[:NOTES_READ_LIMIT]) # Newest few, read oldest first
+            total = len(matches)
+            found = (f"{total} note{'s' if total != 1 else ''}" if total <= NOTES_READ_LIMIT else "several notes") + f" about {subject}"
+        if not total:
+            speak(f"I didn't find any notes {'from' if date_range else 'about'} {subject}.")
+            return
+        speak(f"I found {found}." + (" Here are the latest:" if total > NOTES_READ_LIMIT else ""))
+        for note_id in note_ids:
+            note = notes_store.get(note_id)
+            if note:
+                speak(note[2])
+    except Exception as e:
+        speak("Sorry, I couldn't search your notes right now.")
+        logging.error(f"Error searching notes for '{subject}': {e}")
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    if not minutes:
+        return f"{seconds} second{'s' if seconds != 1 else ''}"
+    hours, minutes = divmod(minutes, 60)
+    text = f"{minutes} minute{'s' if minutes != 1 else ''}"
+    if hours:
+        text = f"{hours} hour{'s' if hours != 1 else ''}" + (f" {text}" if minutes else "")
+    return text
+
+
+def cmd_whats_running(command_text):
+    running, queued = shell_executor.snapshot()
+    if not running and not queued:
+        speak("None of your custom commands are running.")
+        return
+    if running:
+        described = [f"{job.name}, for {format_duration(job.elapsed())}" for job in running]
+        speak(f"{len(running)} running: " + "; ".join(described) + ".")
+    if queued:
+        speak(f"{len(queued)} waiting to start: " + ", ".join(job.name for job in queued) + ".")
+
+
+def describe_when(due):
+    when = datetime.datetime.fromtimestamp(due) if not isinstance(due, datetime.datetime) else due
+    clock = when.strftime("%I:%M %p").lstrip("0") # e.g., "5:00 PM"
+    days = (when.date() - datetime.date.today()).days
+    if days == 0:
+        return f"at {clock}"
+    if days == 1:
+        return f"tomorrow at {clock}"
+    if days < 7:
+        return f"on {when.strftime('%A')} at {clock}"
+    return f"on {when.strftime('%B')} {when.day} at {clock}"
+
+
+def describe_routine(repeat):
+    days = sorted(repeat["days"])
+    names = {(0, 1, 2, 3, 4, 5, 6): "every day", (0, 1, 2, 3, 4): "every weekday", (5, 6): "every weekend"}
+    hour, minute = (int(part) for part in repeat["time"].split(":"))
+    clock = datetime.time(hour, minute).strftime("%I:%M %p").lstrip("0")
+    return f"{names.get(tuple(days)) or 'every ' + ' and '.join(WEEKDAYS[day].capitalize() for day in days)} at {clock}"
+
+
+def cmd_set_reminder(command_text):
+    if parse_routine(command_text): # "remind me every day at 8 to drink water" repeats
+        cmd_add_routine(command_text)
+        return
+    parsed = parse_reminder(command_text)
+    if not parsed:
+        ask_followup("When should I remind you? For example, at 5 PM, or in ten minutes.",
+                     lambda answer: cmd_set_reminder(f"{command_text} {reminder_time_answer(answer)}"))
+        return
+    due, subject = parsed
+    if not subject:
+        ask_followup("What should I remind you about?", lambda answer: cmd_set_reminder(f"{command_text} to {answer}"))
+        return
+    try:
+        reminders.add("say", f"Reminder: {subject}.", subject, due)
+    except Exception as e:
+        speak("Sorry, I couldn't save that reminder.")
+        logging.error(f"Error saving reminder to {REMINDERS_FILE}: {e}")
+        return
+    speak(f"Okay, I'll remind you {describe_when(due)}: {subject}.")
+
+
+def cmd_add_routine(command_text):
+    parsed = parse_routine(command_text)
+    if not parsed:
+        speak("I didn't catch when that should happen. Try 'every weekday at 9 AM say the date'.")
+        return
+    days, hour, minute, action = parsed
+    if not action:
+        ask_followup("What should I do then? For example, say the date.", lambda answer: cmd_add_routine(f"{command_text} {answer}"))
+        return
+    kind, text = routine_action(action)
+    repeat = {"days": days, "time": f"{hour:02d}:{minute:02d}"}
+    try:
+        reminders.add(kind, text, action, next_occurrence(hour, minute, tuple(days)), repeat=repeat)
+    except Exception as e:
+        speak("Sorry, I couldn't save that routine.")
+        logging.error(f"Error saving routine to {REMINDERS_FILE}: {e}")
+        return
+    speak(f"Okay, {describe_routine(repeat)}: {action}.")
+
+
+def cmd_list_reminders(command_text):
+    upcoming = reminders.upcoming()
+    if not upcoming:
+        speak("You don't have any reminders or routines set.")
+        return
+    speak(f"You have {len(upcoming)} reminder{'s' if len(upcoming) != 1 else ''} set."
+          + (" Here are the next few:" if len(upcoming) > REMINDERS_READ_LIMIT else ""))
+    for entry in upcoming[:REMINDERS_READ_LIMIT]:
+        when = describe_routine(entry["repeat"]) if entry["repeat"] else describe_when(entry["due"])
+        speak(f"{when}: {entry['label']}.")
+
+
+def cmd_cancel_reminder(command_text):
+    text = command_text.lower().strip(" ?.!")
+    if re.search(r"\ball (?:my |of my |the )?(?:reminders|routines)\b", text):
+        cancelled = [reminders.remove(entry["id"]) for entry in reminders.upcoming()]
+        speak(f"Cancelled {len(cancelled)} reminder{'s' if len(cancelled) != 1 else ''}." if cancelled else "You don't have any reminders set.")
+        return
+    subject = _reminder_subject(re.sub(r"^.*?\b(?:reminder|routine)s?\b", "", text))
+    if not subject:
+        ask_followup("Which reminder should I cancel?", lambda answer: cmd_cancel_reminder(f"cancel the reminder {answer}"))
+        return
+    matches = reminders.find(subject)
+    if not matches:
+        speak(f"I couldn't find a reminder about {subject}.")
+        return
+    for entry in matches:
+        reminders.remove(entry["id"])
+    speak(f"Cancelled {entry['label']}." if len(matches) == 1 else f"Cancelled {len(matches)} reminders about {subject}.")
 
 
 def cmd_show_help(command_text):
     built_ins = [
         "open Google", "open YouTube",
         "take a note [followed by your note]", "read my notes",
+        "find my notes about [topic]", "notes from [day]",
         "create folder [folder name]", "empty recycle bin",
         "system information",
         "mute system", "put computer to sleep", "turn off computer",
         "what's my battery level", "what time is it", "what is today's date",
+        "average CPU over the last five minutes", "what's using the most memory",
         "tell me today's Bible verse",
-        "what can you open"
+        "what can you open", "recalibrate microphone", "what's running",
+        "remind me at [time] to [something]", "every weekday at [time] say the date", "what are my reminders"
     ]
     speak("I can understand commands like:")
-    time.sleep(0.2)
     # Speak a few examples
     for i, cmd_example in enumerate(built_ins):
         if i < 7: # Speak first 7 examples
             speak(cmd_example)
-            time.sleep(0.1)
         else:
             break
     speak("And I can try to open applications by name, like 'open Word' or 'launch Spotify'.")
-    if custom_commands:
+    custom_cmds = command_matcher.custom_commands # Current set, including edits since startup
+    if custom_cmds:
         speak("I also know your custom commands, such as:")
-        for i, c_cmd in enumerate(custom_commands):
+        for i, c_cmd in enumerate(custom_cmds):
             if i < 2: # Speak first 2 custom command phrases
                 speak(c_cmd.get("phrase", "a custom task"))
-                time.sleep(0.1)
             else:
                 break
-        if len(custom_commands) > 2:
+        if len(custom_cmds) > 2:
             speak("and a few others.")
     speak("For a more detailed overview of my functions, just ask 'what can you do'.")
 
@@ -646,15 +3779,14 @@ def cmd_list_known_apps(command_text):
         known_apps_friendly_names.add(app_alias.title())
 
     # From exe_cache (previously found apps)
-    if exe_cache:
-        for exe_name_lower_key in exe_cache.keys():
-            app_name_from_cache = exe_name_lower_key.replace(".exe", "")
-            # Simple title casing for display
-            app_name_from_cache = ' '.join(word.capitalize() for word in app_name_from_cache.split())
-            known_apps_friendly_names.add(app_name_from_cache)
+    for exe_name_lower_key in exe_cache.names():
+        app_name_from_cache = exe_name_lower_key.replace(".exe", "")
+        # Simple title casing for display
+        app_name_from_cache = ' '.join(word.capitalize() for word in app_name_from_cache.split())
+        known_apps_friendly_names.add(app_name_from_cache)
 
     # From custom commands that launch executables
-    for cmd_config in custom_commands:
+    for cmd_config in command_matcher.custom_commands:
         if cmd_config.get("action") == "launch_executable":
             app_name = cmd_config.get("app_name")
             if app_name:
@@ -689,38 +3821,45 @@ def cmd_list_known_apps(command_text):
         speak("You can also try asking for any other application not mentioned, and I'll search for it.")
 
 
+def cmd_recalibrate(command_text):
+    if audio_capture is None:
+        speak("Microphone is not available, so I can't recalibrate.")
+        return
+    speak_and_wait("Recalibrating. Please stay quiet for a moment.", timeout=10)
+    try:
+        noise_calibration.calibrate(audio_capture.ring, audio_capture.frame_length)
+    except Exception as e:
+        logging.error(f"Recalibration failed: {e}")
+        speak("Sorry, I couldn't recalibrate the microphone.")
+        return
+    speak("Done. I've adjusted to the background noise.")
+
+
 def cmd_tell_capabilities(command_text):
     speak("I can help you with various tasks on your computer after you say my wake word.")
-    time.sleep(0.2)
     speak("Here's an overview of what I can do:")
-    time.sleep(0.3)
     speak(
         "First, I can open applications. For example, you can ask me to 'open Chrome', 'launch Spotify', or 'open Notepad'. "
         "I have a list of common applications, and I can also search for others if you ask. "
         "If you'd like a list of applications I'm already familiar with or have found before, you can say 'what applications can you open'.")
-    time.sleep(0.5)
     speak("Second, I can open websites. For example, try saying 'open Google' or 'open YouTube'.")
-    time.sleep(0.5)
     speak(
         "Third, I can provide information. You can ask me 'what time is it', 'what is today's date', 'what's my battery level', or for 'system information' like CPU and RAM usage.")
-    time.sleep(0.5)
     speak(
         "Fourth, I can perform system actions on Windows. For instance, 'mute the system', 'put computer to sleep', 'turn off the computer', or 'empty the recycle bin'.")
-    time.sleep(0.5)
     speak(
         "I can also help with simple productivity tasks like 'take a note [your note here]' and 'read my notes', or 'create folder [folder name]' on your desktop.")
-    time.sleep(0.5)
+    speak(
+        "I can remind you of things, like 'remind me at 5 PM to stretch', and run routines, like 'every weekday at 9 AM say the date'.")
     speak(
         "I also try to fetch a daily Bible verse for you if you ask, though please note this is a basic feature.")
-    time.sleep(0.3)
-    if custom_commands:
+    if command_matcher.custom_commands:
         speak(
             "Additionally, I can run custom commands that you've set up in the custom_commands.json file. "
             "These can include launching specific programs with a unique phrase, opening particular web pages, or running shell scripts.")
     else:
         speak(
             "And if you were to set up custom commands in the custom_commands.json file, I could perform those too, allowing you to tailor my actions to your needs!")
-    time.sleep(0.5)
     speak("For a shorter list of example command phrases you can use, just say 'help'.")
 
 
@@ -748,8 +3887,15 @@ COMMAND_DISPATCHER = {
     "system information": cmd_get_system_info, "system info": cmd_get_system_info, "pc status": cmd_get_system_info,
     "computer status": cmd_get_system_info, "cpu usage": cmd_get_system_info, "ram usage": cmd_get_system_info,
     "disk space": cmd_get_system_info,
+    "average cpu": cmd_system_trend, "average memory": cmd_system_trend, "average ram": cmd_system_trend,
+    "cpu over the last": cmd_system_trend, "cpu usage over": cmd_system_trend, "memory over the last": cmd_system_trend,
+    "memory usage over": cmd_system_trend, "cpu trend": cmd_system_trend,
+    "most memory": cmd_top_memory, "memory hog": cmd_top_memory, "biggest memory": cmd_top_memory,
+    "recalibrate": cmd_recalibrate, "recalibrate microphone": cmd_recalibrate, "calibrate microphone": cmd_recalibrate,
 
     # Application Listing
+    "what's running": cmd_whats_running, "what is running": cmd_whats_running, "running commands": cmd_whats_running,
+    "running jobs": cmd_whats_running,
     "what can you open": cmd_list_known_apps, "what apps can you open": cmd_list_known_apps,
     "list applications": cmd_list_known_apps, "list apps": cmd_list_known_apps, "show known apps": cmd_list_known_apps,
 
@@ -758,59 +3904,744 @@ COMMAND_DISPATCHER = {
     "make a note": cmd_take_note, "new note": cmd_take_note, # `handle_command` passes full text
     "read my notes": cmd_read_notes, "show my notes": cmd_read_notes, "what are my notes": cmd_read_notes,
     "display notes": cmd_read_notes, "get notes": cmd_read_notes,
+    "find my notes": cmd_find_notes, "search my notes": cmd_find_notes, "find notes": cmd_find_notes,
+    "search notes": cmd_find_notes, "notes about": cmd_find_notes, "notes from": cmd_find_notes,
+    "notes mentioning": cmd_find_notes, "notes that mention": cmd_find_notes,
     "create folder": cmd_create_folder, "make folder": cmd_create_folder, "new folder": cmd_create_folder,
     "create directory": cmd_create_folder, "make directory": cmd_create_folder, "new directory": cmd_create_folder, # `handle_command` passes full text
+
+    # Reminders & Routines (These need the full text for the time and what to do)
+    "remind me": cmd_set_reminder, "set a reminder": cmd_set_reminder,
+    "every day": cmd_add_routine, "every weekday": cmd_add_routine, "every weekend": cmd_add_routine,
+    "every morning": cmd_add_routine, "every evening": cmd_add_routine, "every night": cmd_add_routine,
+    **{f"every {day}": cmd_add_routine for day in WEEKDAYS},
+    "my reminders": cmd_list_reminders, "list reminders": cmd_list_reminders, "my routines": cmd_list_reminders,
+    "list routines": cmd_list_reminders, "what are my reminders": cmd_list_reminders,
+    "cancel reminder": cmd_cancel_reminder, "cancel the reminder": cmd_cancel_reminder, "cancel my reminder": cmd_cancel_reminder,
+    "delete reminder": cmd_cancel_reminder, "delete the reminder": cmd_cancel_reminder, "remove the reminder": cmd_cancel_reminder,
+    "cancel the routine": cmd_cancel_reminder, "stop the routine": cmd_cancel_reminder, "delete the routine": cmd_cancel_reminder,
+    "cancel all reminders": cmd_cancel_reminder, "delete all reminders": cmd_cancel_reminder,
+    "cancel all my reminders": cmd_cancel_reminder,
 }
 
 
+# === Command Matcher ===
+class CommandMatcher:
+    """Lookup structures built once from COMMAND_DISPATCHER, APP_LAUNCH_MAP and the custom commands.
+
+    Dispatcher phrases are compiled into an Aho-Corasick automaton, so the longest phrase
+    contained in a transcript is found in one pass (ties go to the phrase listed first,
+    like the old length-sorted scan). App names and custom phrases are plain dict lookups.
+    """
+
+    def __init__(self, dispatcher, app_map, custom_cmds):
+        self.dispatcher = dict(dispatcher)
+        self.app_map = {alias.lower(): exe for alias, exe in app_map.items()}
+        self.custom_commands = list(custom_cmds)
+        self.custom_phrases = {} # phrase -> command config (first definition wins)
+        self.custom_apps = {} # app name -> launch_executable command config (first definition wins)
+        for cmd_config in self.custom_commands:
+            phrase = (cmd_config.get("phrase") or "").lower()
+            if phrase:
+                self.custom_phrases.setdefault(phrase, cmd_config)
+            app_name = (cmd_config.get("app_name") or "").lower()
+            if app_name and cmd_config.get("action") == "launch_executable":
+                self.custom_apps.setdefault(app_name, cmd_config)
+        # Routine phrases ("every monday") go by where they are in the command, not by length: see match_dispatcher
+        self.routine_phrases = {k for k, handler in self.dispatcher.items() if handler is cmd_add_routine}
+        self._build_automaton([k for k in self.dispatcher if k and k not in self.routine_phrases])
+
+    def _build_automaton(self, phrases):
+        self.phrases = phrases
+        self.goto = [{}] # state -> {char: next state}
+        self.fail = [0]
+        self.best = [None] # state -> index of the best phrase ending here (own or via fail links)
+        self.depth = [0] # state -> length of the phrase prefix it represents
+        for index, phrase in enumerate(phrases):
+            state = 0
+            for ch in phrase:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                    self.depth.append(self.depth[state] + 1)
+                state = next_state
+            if self.best[state] is None: # Duplicate phrases keep the first index
+                self.best[state] = index
+
+        # Handlers of every phrase passing through a state, to tell whether more words could change the match
+        self.handlers_below = [set() for _ in self.goto]
+        for phrase in phrases:
+            state = 0
+            for ch in phrase:
+                state = self.goto[state][ch]
+                self.handlers_below[state].add(self.dispatcher[phrase])
+
+        queue = deque(self.goto[0].values())
+        while queue: # Breadth-first, so fail targets are finished before they're used
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.best[next_state] = self._better(self.best[next_state], self.best[self.fail[next_state]])
+
+    def _better(self, a, b):
+        # Longer phrase wins; equal lengths go to the one listed first
+        if a is None or b is None:
+            return b if a is None else a
+        return a if (len(self.phrases[a]), -a) >= (len(self.phrases[b]), -b) else b
+
+    def _scan(self, text):
+        goto, fail, best = self.goto, self.fail, self.best
+        state, found = 0, None
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if best[state] is not None:
+                found = self._better(found, best[state])
+        return state, found
+
+    def match_dispatcher(self, text):
+        """Return the longest dispatcher phrase contained in text, or None.
+
+        A routine phrase only counts if it starts the command or a time is said ("... every
+        wednesday at 7"), and then wins unless a free-text command comes before it: "take a note
+        the trash goes out every wednesday" is a note, "remind me every day at 8 ..." a reminder.
+        """
+        _, found = self._scan(text)
+        keyword = self.phrases[found] if found is not None else None
+        routine = self._routine_phrase(text)
+        if routine is None or (keyword is not None and self.dispatcher[keyword] in FREE_TEXT_HANDLERS
+                               and text.find(keyword) < text.find(routine)):
+            return keyword
+        return routine
+
+    def _routine_phrase(self, text):
+        every = ROUTINE_EVERY_PATTERN.search(text)
+        if not every or not (every.start() == 0 or AT_TIME_PATTERN.search(text)):
+            return None
+        first_day = every.group(1).split(" ", 1)[0].rstrip(",")
+        phrase = f"every {first_day if first_day in ROUTINE_DAYS else first_day[:-1]}"
+        return phrase if phrase in self.routine_phrases else None
+
+    def settled_match(self, text):
+        """Like match_dispatcher, but None if more words could still turn it into a different command.
+
+        Used on partial transcripts: "what time" already settles on the time handler because every
+        phrase it could grow into ("what time is it") maps to the same handler.
+        """
+        if ROUTINE_EVERY_PATTERN.search(text): # A time may still follow and make it a routine
+            return None
+        state, found = self._scan(text)
+        if found is None:
+            return None
+        handler = self.dispatcher[self.phrases[found]]
+        while state: # The current state and its suffixes are the phrases still in progress
+            start = len(text) - self.depth[state]
+            # Transcripts grow word by word, so only phrases starting on a word boundary can still complete
+            if (start == 0 or text[start - 1] == " ") and self.handlers_below[state] - {handler}:
+                return None
+            state = self.fail[state]
+        return self.phrases[found]
+
+
+command_matcher = CommandMatcher(COMMAND_DISPATCHER, APP_LAUNCH_MAP, custom_commands)
+
+
+# === Custom Commands Hot Reload ===
+CUSTOM_COMMANDS_POLL_SECONDS = 2.0 # stat() interval when inotify isn't available (Windows, macOS)
+CUSTOM_COMMANDS_SETTLE_SECONDS = 0.25 # Wait for a burst of editor writes to finish before reloading
+INOTIFY_EVENT = struct.Struct("iIII") # wd, mask, cookie, name length
+# IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_Q_OVERFLOW: covers in-place
+# saves and the write-temp-then-rename saves most editors do
+INOTIFY_MASK = 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x4000
+metrics.describe("custom_commands_reloads_total", "counter", "Reloads of custom_commands.json, by result.")
+
+
+def reload_custom_commands(path=None):
+    """Re-read custom_commands.json and swap in a matcher built from it; on any problem the
+    current commands stay in place. Returns True if the new file was applied."""
+    global command_matcher, custom_commands
+    path = path or custom_cmds_path_to_use
+    try:
+        commands, problems = read_custom_commands(path)
+        if problems:
+            raise ValueError("; ".join(problems))
+        matcher = CommandMatcher(COMMAND_DISPATCHER, APP_LAUNCH_MAP, commands) # Built before anyone can see it
+    except (OSError, ValueError) as e:
+        logging.error(f"Keeping the previous custom commands: {path} was not applied: {e}")
+        metrics.inc("custom_commands_reloads_total", result="rejected")
+        return False
+    command_matcher = matcher # A single reference swap; a command already being handled keeps the old one
+    custom_commands = commands
+    logging.info(f"Reloaded {len(commands)} custom command(s) from {path}")
+    metrics.inc("custom_commands_reloads_total", result="ok")
+    return True
+
+
+class FileWatcher:
+    """Calls on_change() after a file is written, replaced, created or deleted.
+
+    Uses inotify on the file's directory on Linux (editors often save by renaming a temp file
+    over the original), and otherwise polls os.stat().
+    """
+
+    def __init__(self, path, on_change, poll_interval=CUSTOM_COMMANDS_POLL_SECONDS,
+                 settle=CUSTOM_COMMANDS_SETTLE_SECONDS):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.mode = None # "inotify" or "poll" once started
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        inotify_fd = self._open_inotify() if sys.platform.startswith("linux") else None
+        self.mode = "inotify" if inotify_fd is not None else "poll"
+        target = (lambda: self._inotify_loop(inotify_fd)) if inotify_fd is not None else self._poll_loop
+        self._thread = threading.Thread(target=target, daemon=True, name="file-watcher")
+        self._thread.start()
+        logging.info(f"Watching {self.path} for changes ({self.mode}).")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def _fire(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            logging.error(f"File change handler for {self.path} failed: {e}")
+
+    def _poll_loop(self):
+        last = self._signature()
+        while not self._stop.wait(self.poll_interval):
+            current = self._signature()
+            if current != last:
+                self._stop.wait(self.settle) # Let the editor finish writing
+                last = self._signature()
+                self._fire()
+
+    def _open_inotify(self):
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            if libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), INOTIFY_MASK) < 0:
+                error = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(error, "inotify_add_watch failed")
+            return fd
+        except (OSError, AttributeError) as e:
+            logging.info(f"inotify unavailable for {self.path} ({e}); polling instead.")
+            return None
+
+    def _read_events(self, fd):
+        # True if any queued event concerns our file (or events were lost)
+        name = os.path.basename(self.path).encode()
+        try:
+            buffer = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        relevant, offset = False, 0
+        while offset + INOTIFY_EVENT.size <= len(buffer):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            start = offset + INOTIFY_EVENT.size
+            if mask & 0x4000 or buffer[start:start + length].rstrip(b"\0") == name:
+                relevant = True
+            offset = start + length
+        return relevant
+
+    def _inotify_loop(self, fd):
+        try:
+            while not self._stop.is_set():
+                if not select.select([fd], [], [], 1.0)[0] or not self._read_events(fd):
+                    continue
+                while select.select([fd], [], [], self.settle)[0]: # Fold a burst of writes into one reload
+                    self._read_events(fd)
+                self._fire()
+        finally:
+            os.close(fd)
+
+
+custom_commands_watcher = None
+
+
+def start_custom_commands_watcher():
+    global custom_commands_watcher
+    if custom_commands_watcher is None:
+        custom_commands_watcher = FileWatcher(custom_cmds_path_to_use, reload_custom_commands).start()
+    return custom_commands_watcher
+
+
+# === Fuzzy App Name Index ===
+APP_MATCH_THRESHOLD = env_number("NOVA_APP_MATCH_THRESHOLD", 0.75) # Below this, "open X" falls back to searching for X.exe
+APP_MATCH_MAX_CANDIDATES = 32 # Names scored in full per lookup, however many are indexed
+APP_MATCH_EDIT_CANDIDATES = 6 # Of those, how many get the (slower) edit distance check
+APP_MATCH_POSTINGS_BUDGET = 3000 # Index entries tallied per lookup, rarest trigrams first
+APP_MATCH_PHONETIC_SCORE = 0.7 # Names that only sound the same ("spot a fi" / "spotify") are offered, not launched
+APP_MATCH_PHONETIC_OVERLAP = 0.3 # ...and only count if they also share this much of their spelling
+APP_MATCH_PHONETIC_LENGTH_RATIO = 0.75 # ...and are about as long ("stop" isn't "setup")
+APP_MATCH_SHORT_NAME = 7 # One edit in a name shorter than this often makes another word ("timer" / "times")
+# Installers and background helpers aren't things anyone asks to open, but they sound like things that are
+APP_INDEX_SKIP_PREFIXES = ("setup", "unins", "update", "install")
+APP_INDEX_SKIP_SUFFIXES = ("setup", "helper", "updater", "update", "installer", "uninstall")
+APP_NAME_SYMBOLS = {"+": "plus", "#": "sharp", "&": "and"} # So "notepad++" is "notepad plus plus", not "notepad"
+APP_NAME_FILLERS = {"the", "app", "application", "program"} # "open the audacity app"
+# Letters (and pairs) that speech recognition confuses, folded before taking the consonant skeleton
+PHONETIC_FOLDS = (("ph", "f"), ("ck", "k"), ("qu", "kw"), ("x", "ks"), ("c", "k"), ("q", "k"), ("z", "s"), ("v", "f"))
+# Source ranks: on equal scores, built-in aliases win over custom commands, then cached and indexed executables
+APP_SOURCE_BUILTIN, APP_SOURCE_CUSTOM, APP_SOURCE_CACHE, APP_SOURCE_INDEX = range(4)
+
+
+def app_match_key(name):
+    # "Spot a fi" -> "spotafi", "Spotify.exe" -> "spotify": case, spaces, punctuation and launcher extensions ignored
+    name = name.lower()
+    root, ext = os.path.splitext(name)
+    if ext in EXE_INDEX_EXTENSIONS:
+        name = root
+    for symbol, word in APP_NAME_SYMBOLS.items():
+        name = name.replace(symbol, f" {word} ")
+    words = name.split()
+    words = [word for word in words if word not in APP_NAME_FILLERS] or words
+    return "".join(ch for ch in "".join(words) if ch.isalnum())
+
+
+def phonetic_key(key):
+    # Consonant skeleton after folding look-alike sounds: "spotafi" and "spotify" both give "sptf"
+    for sound, replacement in PHONETIC_FOLDS:
+        key = key.replace(sound, replacement)
+    skeleton = key[:1]
+    for ch in key[1:]:
+        if ch not in "aeiouyhw" and ch != skeleton[-1]:
+            skeleton += ch
+    return skeleton
+
+
+def _trigrams(key):
+    padded = f"^{key}$" # Anchors make matching starts and ends count
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ch_a in enumerate(a, 1):
+        current = [i]
+        for j, ch_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ch_a != ch_b)))
+        previous = current
+    return previous[-1]
+
+
+class AppNameIndex:
+    """Fuzzy lookup of spoken app names over everything "open <app>" can launch.
+
+    Names are indexed by character trigram and by phonetic skeleton. A lookup fully scores at
+    most APP_MATCH_MAX_CANDIDATES names, so its cost doesn't grow with the number of installed
+    executables. Built from a snapshot of its sources and replaced, never modified, when they change.
+    """
+
+    def __init__(self, entries, version=None):
+        # entries: (spoken name, exe name, source rank); the first entry for a name wins
+        self.version = version
+        self.entries = [] # (key, display name, exe name, source rank, trigrams, phonetic key)
+        self.by_key = {}
+        self.trigrams = {} # trigram -> entry indexes
+        self.phonetic = {} # phonetic key -> entry indexes
+        for name, exe_name, rank in sorted(entries, key=lambda entry: entry[2]):
+            key = app_match_key(name)
+            if not key or key in self.by_key:
+                continue
+            if rank >= APP_SOURCE_CACHE and (key.startswith(APP_INDEX_SKIP_PREFIXES) or key.endswith(APP_INDEX_SKIP_SUFFIXES)):
+                continue
+            position = len(self.entries)
+            grams, sound = _trigrams(key), phonetic_key(key)
+            self.entries.append((key, name, exe_name, rank, grams, sound))
+            self.by_key[key] = position
+            for gram in grams:
+                self.trigrams.setdefault(gram, []).append(position)
+            self.phonetic.setdefault(sound, []).append(position)
+
+    def resolve(self, spoken):
+        """Return (display name, exe name, confidence 0..1) for the best match, or None.
+
+        Only spelling-level matches reach APP_MATCH_THRESHOLD; a name that merely sounds alike,
+        or is one edit away from a short name, scores APP_MATCH_PHONETIC_SCORE at most.
+        """
+        key = app_match_key(spoken)
+        if not key:
+            return None
+        if key in self.by_key:
+            _, name, exe_name, *_ = self.entries[self.by_key[key]]
+            return name, exe_name, 1.0
+        grams, sound = _trigrams(key), phonetic_key(key)
+        postings = sorted((self.trigrams[gram] for gram in grams if gram in self.trigrams), key=len)
+        hits, budget = Counter(), APP_MATCH_POSTINGS_BUDGET
+        for positions in postings: # Rarest first: they say the most, and common ones can't blow the budget
+            if budget <= 0:
+                break
+            hits.update(positions[:budget])
+            budget -= len(positions)
+        candidates = {position for position, _ in hits.most_common(APP_MATCH_MAX_CANDIDATES)}
+        if len(sound) >= 3:
+            candidates.update(self.phonetic.get(sound, ())[:APP_MATCH_MAX_CANDIDATES])
+
+        scored = []
+        for position in candidates:
+            candidate_key, name, exe_name, rank, candidate_grams, candidate_sound = self.entries[position]
+            score = 2 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            if (len(sound) >= 3 and sound == candidate_sound and score >= APP_MATCH_PHONETIC_OVERLAP
+                    and min(len(key), len(candidate_key)) >= APP_MATCH_PHONETIC_LENGTH_RATIO * max(len(key), len(candidate_key))):
+                score = max(score, APP_MATCH_PHONETIC_SCORE)
+            scored.append([score, -rank, -abs(len(candidate_key) - len(key)), candidate_key, name, exe_name])
+        scored.sort(reverse=True)
+        for entry in scored[:APP_MATCH_EDIT_CANDIDATES]: # Edit distance is the costly part: only for the front runners
+            longest = max(len(key), len(entry[3]))
+            if longest >= 5: # One typo in "code" or "vlc" is a different word, not a misspelling
+                similarity = 1 - edit_distance(key, entry[3]) / longest
+                if longest < APP_MATCH_SHORT_NAME:
+                    similarity = min(similarity, APP_MATCH_PHONETIC_SCORE)
+                entry[0] = max(entry[0], similarity)
+        best = max(scored[:APP_MATCH_EDIT_CANDIDATES], default=None)
+        return (best[4], best[5], best[0]) if best else None
+
+
+def _app_index_version():
+    return exe_index.generation, exe_cache.generation, command_matcher
+
+
+def build_app_name_index():
+    version = _app_index_version()
+    entries = [(alias, exe_name, APP_SOURCE_BUILTIN) for alias, exe_name in APP_LAUNCH_MAP.items()]
+    entries += [(app_name, cmd_config.get("exe_name"), APP_SOURCE_CUSTOM)
+                for app_name, cmd_config in version[2].custom_apps.items() if cmd_config.get("exe_name")]
+    entries += [(os.path.splitext(name)[0], name, APP_SOURCE_CACHE) for name in exe_cache.names()]
+    entries += [(os.path.splitext(name)[0], name, APP_SOURCE_INDEX) for name in exe_index.known_names()]
+    return AppNameIndex(entries, version)
+
+
+app_name_index = None
+_app_index_rebuilding = threading.Event()
+
+
+def refresh_app_name_index():
+    global app_name_index
+    try:
+        started = time.perf_counter()
+        app_name_index = build_app_name_index()
+        logging.info(f"App name index: {len(app_name_index.entries)} names in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logging.error(f"Could not build the app name index: {e}")
+    finally:
+        _app_index_rebuilding.clear()
+    return app_name_index
+
+
+def current_app_name_index():
+    """The fuzzy app index; if its sources changed since it was built, it is rebuilt in the background
+    and this lookup uses the previous one."""
+    index = app_name_index
+    if index is None:
+        return refresh_app_name_index() # Only before the startup build has finished
+    if index.version != _app_index_version() and not _app_index_rebuilding.is_set():
+        _app_index_rebuilding.set()
+        threading.Thread(target=refresh_app_name_index, daemon=True, name="app-index").start()
+    return index
+
+
 # === Voice Command Handling ===
-def handle_command(phrase_listen_timeout=5.0, phrase_time_limit=10.0):
-    if not mic:
+def _speech_follows_wake_word(wake_seq):
+    # True if the user kept talking right after the wake word ("hey google open chrome")
+    cursor = audio_capture.ring.cursor(wake_seq)
+    loud_frames = 0
+    for _ in range(max(1, audio_capture.frames_for_ms(CONTINUATION_WINDOW_MS))):
+        pcm = cursor.read_frame(timeout=1.0)
+        if pcm is None:
+            break
+        if frame_rms(pcm) > recognizer.energy_threshold:
+            loud_frames += 1
+    return loud_frames >= 2
+
+
+STREAMING_RECOGNITION = env_flag("NOVA_STREAMING", True) # Only used when the backend supports streaming
+EARLY_DISPATCH = env_flag("NOVA_EARLY_DISPATCH", True) # Act on a stable partial transcript before end-of-phrase
+EARLY_DISPATCH_STABLE_MS = env_number("NOVA_EARLY_DISPATCH_STABLE_MS", 240) # Partial must be unchanged this long
+# Never fired from a partial transcript: they need the full text or can't be undone
+EARLY_DISPATCH_EXCLUDED = {cmd_take_note, cmd_read_notes, cmd_find_notes, cmd_set_reminder, cmd_add_routine, cmd_cancel_reminder, cmd_system_trend, cmd_top_memory, cmd_create_folder, cmd_sleep_system, cmd_shutdown_system, cmd_empty_recycle_bin}
+COMMON_WAKE_PHRASES = ("hey assistant", "assistant", "hey google", "google") # Add more if needed
+# How the recognizer hears the clipped end of the wake word at the start of the pre-roll ("...gle open chrome")
+WAKE_TAIL_WORDS = frozenset(("gle", "ogle", "girl", "gal", "gull", "goal", "tant", "stant"))
+
+
+def strip_wake_phrase(command_text):
+    processed_command = command_text # This will be stripped of wake words for matching
+    for trig in COMMON_WAKE_PHRASES:
+        if processed_command.startswith(trig):
+            processed_command = processed_command.replace(trig, "", 1).strip()
+            logging.debug(f"Command after stripping '{trig}': {processed_command}")
+            break # Stop after stripping the first recognized wake phrase
+    else:
+        first_word, _, rest = processed_command.partition(" ")
+        if first_word in WAKE_TAIL_WORDS and rest.strip():
+            processed_command = rest.strip()
+            logging.debug(f"Command after stripping the wake word's tail '{first_word}': {processed_command}")
+    return processed_command
+
+
+def _early_dispatch_keyword(partial_text):
+    processed_command = strip_wake_phrase(partial_text)
+    keyword = command_matcher.settled_match(processed_command) if processed_command else None
+    if keyword and COMMAND_DISPATCHER[keyword] not in EARLY_DISPATCH_EXCLUDED:
+        return keyword
+    return None
+
+
+def listen_streaming(cursor, timeout, phrase_time_limit, early_dispatch=EARLY_DISPATCH, backend=None):
+    """Feed audio to a streaming backend frame by frame and return (text, dispatched_early, audio_ms).
+
+    With early_dispatch, a partial transcript that settles on a single command and stays unchanged
+    for EARLY_DISPATCH_STABLE_MS is returned straight away instead of waiting for end-of-phrase.
+    audio_ms is how much audio had been read when the result was returned.
+    """
+    backend = backend or recognizer_backend
+    stream = backend.start_stream()
+    heard_ms = 0.0
+    last_partial, partial_since_ms = "", 0.0
+    for pcm, heard_ms in vad_segment(cursor, timeout, phrase_time_limit):
+        partial, is_final = stream.feed(pcm)
+        if is_final:
+            break
+        if early_dispatch:
+            partial = partial.lower().strip()
+            if partial != last_partial:
+                last_partial, partial_since_ms = partial, heard_ms
+            elif partial and heard_ms - partial_since_ms >= EARLY_DISPATCH_STABLE_MS \
+                    and _early_dispatch_keyword(partial):
+                logging.info(f"Early dispatch on partial transcript '{partial}' after {heard_ms:.0f} ms of audio.")
+                return partial, True, heard_ms
+    with timed_stage("recognize", backend=backend.name, streaming=True):
+        return stream.finish(), False, heard_ms
+
+
+def handle_command(phrase_listen_timeout=5.0, phrase_time_limit=10.0, wake_seq=None):
+    if audio_capture is None:
         speak("Microphone is not available, cannot listen for commands.")
         return
 
-    speak("What would you like me to do?")
+    if wake_seq is None:
+        wake_seq = audio_capture.ring.latest_seq
+    with timed_stage("prompt") as prompt_fields:
+        prompt_fields["spoken"] = not _speech_follows_wake_word(wake_seq)
+        if not prompt_fields["spoken"]:
+            # wake_seq is where the wake word was detected (its end); step back over the detection delay so
+            # nothing said in one breath is lost. strip_wake_phrase drops the clipped "...gle" this brings in.
+            listen_from = wake_seq - audio_capture.frames_for_ms(PREROLL_MS)
+        elif earcon.play(): # A chime instead of the spoken prompt, so listening starts right away
+            prompt_fields["earcon"] = True
+            # Don't feed the chime to the recognizer either
+            listen_from = audio_capture.ring.latest_seq + audio_capture.frames_for_ms(earcon.duration_ms + EARCON_TAIL_MS)
+        else:
+            speak_and_wait("What would you like me to do?", timeout=10, urgent=True)
+            listen_from = audio_capture.ring.latest_seq # Don't feed our own prompt to the recognizer
+
+    command_text = listen_for_command(listen_from, phrase_listen_timeout, phrase_time_limit)
+    if not command_text:
+        return None # No command was recognized
+    followup_state.pending = None
+    process_command_text(command_text)
+    return continue_conversation(phrase_time_limit)
+
+
+def listen_for_command(listen_from, phrase_listen_timeout, phrase_time_limit, early_dispatch=EARLY_DISPATCH, quiet=False, **fields):
+    """Recognize what is said from ring buffer position listen_from on; "" if nothing usable was heard.
+    Unless quiet, recognition problems are reported to the user."""
+    use_streaming = STREAMING_RECOGNITION and recognizer_backend.supports_streaming
     command_text = "" # Store the full recognized text
     try:
-        with mic as source:
+        with RingBufferSource(audio_capture.ring.cursor(listen_from), audio_capture.frame_length) as source, \
+                timed_stage("listen", streaming=use_streaming, **fields) as listen_fields:
             logging.info("Listening for command...")
-            try:
+            if use_streaming: # Recognition runs while the user is still talking
+                command_text, listen_fields["early"], _ = listen_streaming(
+                    source.stream, phrase_listen_timeout, phrase_time_limit, early_dispatch=early_dispatch)
+            elif VAD_ENABLED: # Frame-level VAD decides end-of-speech
+                audio = listen_with_vad(source.stream, phrase_listen_timeout, phrase_time_limit)
+            else:
                 # Listen for the user's command
                 audio = recognizer.listen(source, timeout=phrase_listen_timeout, phrase_time_limit=phrase_time_limit)
-            except sr.WaitTimeoutError:
-                logging.info("No speech detected within timeout.")
-                # speak("I didn't hear anything.") # Optional feedback
-                return
 
-        logging.info("Processing command...")
-        command_text = recognizer.recognize_google(audio).lower().strip()
+        if not use_streaming:
+            logging.info("Processing command...")
+            with timed_stage("recognize", backend=recognizer_backend.name, streaming=False):
+                command_text = recognizer_backend.recognize(audio)
         # Don't speak back "You said: nothing" if it's a dismissal.
         # We'll let the specific handling below manage the response.
+        return command_text.lower().strip()
 
+    except sr.WaitTimeoutError:
+        logging.info("No speech detected within timeout.")
+        metrics.inc("recognition_failures_total", reason="no_speech")
+        # speak("I didn't hear anything.") # Optional feedback
     except sr.UnknownValueError:
-        speak("Sorry, I didn't catch that clearly.")
-        logging.info("Google Speech Recognition could not understand audio.")
-        return
+        if not quiet: speak("Sorry, I didn't catch that clearly.")
+        metrics.inc("recognition_failures_total", reason="unknown_value")
+        logging.info(f"Speech recognition ({recognizer_backend.name}) could not understand audio.")
     except sr.RequestError as e:
-        speak("It seems I'm having trouble reaching the speech service.")
-        logging.error(f"Could not request results from Google Speech Recognition service; {e}")
-        return
+        if not quiet: speak("It seems I'm having trouble reaching the speech service.")
+        metrics.inc("recognition_failures_total", reason="request_error")
+        logging.error(f"Could not request results from the {recognizer_backend.name} speech recognition service; {e}")
     except Exception as e: # Catch-all for other speech recognition issues
-        speak("An unexpected error occurred while trying to understand you.")
+        if not quiet: speak("An unexpected error occurred while trying to understand you.")
+        metrics.inc("recognition_failures_total", reason="error")
         logging.error(f"Error during speech recognition: {e}")
-        return
+    return ""
+
+
+# === Compound Commands ===
+INTENT_WORKERS = 4 # Parts of one compound command run side by side on this many threads
+# Split on "and", "then", "also", "plus" and commas: "open chrome, spotify and then mute the system"
+INTENT_SEPARATOR = re.compile(r"\s*,\s*(?:and then |and |then )?|\s+(?:and then|and also|and|then|also|plus)\s+")
+OPEN_VERBS = ("open ", "launch ")
+DAILY_TEXT_WORDS = ("bible verse", "daily text", "today's text", "scripture")
+# Their text runs to the end of the utterance: "take a note buy milk and eggs" is one note
+FREE_TEXT_HANDLERS = {cmd_take_note, cmd_create_folder, cmd_find_notes, cmd_read_notes, cmd_set_reminder, cmd_add_routine, cmd_cancel_reminder}
+# Not run alongside anything else: power actions, and ones that use the microphone or ask to confirm
+RUN_ALONE_HANDLERS = {cmd_sleep_system, cmd_shutdown_system, cmd_empty_recycle_bin, cmd_recalibrate}
+metrics.describe("compound_commands_total", "counter", "Utterances run as several commands.")
+
+_intent_pool = ThreadPoolExecutor(max_workers=INTENT_WORKERS, thread_name_prefix="intent")
+
+
+def _intent_target(text, matcher):
+    # What dispatch_command would run for text, in its order; None if it isn't a command on its own
+    keyword = matcher.match_dispatcher(text)
+    if keyword:
+        return "handler", COMMAND_DISPATCHER[keyword]
+    if text.startswith(OPEN_VERBS) and text.split(" ", 1)[1].strip():
+        return "open", text.split(" ", 1)[1].strip()
+    if any(words in text for words in DAILY_TEXT_WORDS):
+        return "daily_text", None
+    if text in matcher.custom_phrases:
+        return "custom", text
+    return None
 
-    if not command_text:
-        return # No command was recognized
-
-    # --- NEW: Handle "nothing" or similar dismissal responses ---
-    dismissal_phrases = [
-        "nothing", "no thanks", "not now", "i'm good", "that's all",
-        "nevermind", "actually nothing", "don't do anything",
-        "nothing right now", "nothing for now", "no thank you",
-        "it's okay", "it's alright", "no", "nope"
-    ]
-    if command_text in dismissal_phrases:
+
+def _known_app(name, matcher):
+    if name in matcher.app_map or name in matcher.custom_apps:
+        return True
+    match = current_app_name_index().resolve(name)
+    return bool(match and match[2] >= APP_MATCH_THRESHOLD)
+
+
+def split_intents(text, matcher):
+    """The independent commands in one utterance, e.g. "open chrome and spotify and mute the system"
+    -> ["open chrome", "open spotify", "mute the system"]. A bare app name after "open X" gets the
+    same verb. If any part isn't a command by itself, the utterance is left whole: [text]."""
+    if text in COMMAND_DISPATCHER or text in matcher.custom_phrases:
+        return [text]
+    bounds, start = [], 0
+    for separator in INTENT_SEPARATOR.finditer(text):
+        bounds.append((start, separator.start()))
+        start = separator.end()
+    if not bounds:
+        return [text]
+    bounds.append((start, len(text)))
+
+    intents, verb = [], None
+    for start, end in bounds:
+        piece = text[start:end].strip()
+        if not piece:
+            continue
+        target = _intent_target(piece, matcher)
+        if target is None and verb and _known_app(piece, matcher):
+            piece = verb + piece
+            target = "open", piece[len(verb):]
+        if target is None:
+            return [text]
+        if target[0] == "handler" and target[1] in FREE_TEXT_HANDLERS:
+            intents.append(text[start:]) # Keeps its "and"s
+            break
+        verb = piece.split(" ", 1)[0] + " " if target[0] == "open" else None
+        intents.append(piece)
+    return intents
+
+
+def run_intents(intents, matcher):
+    """Run the parts of a compound command and say their replies as one response.
+
+    Parts that touch different things run side by side on the intent pool; parts with the same
+    target (the same handler, or the same app) run in order within one task. Replies are
+    collected per part and joined in the order they were said. RUN_ALONE_HANDLERS run afterwards.
+    """
+    groups, alone = OrderedDict(), []
+    for index, intent in enumerate(intents):
+        target = _intent_target(intent, matcher)
+        if target[0] == "handler" and target[1] in RUN_ALONE_HANDLERS:
+            alone.append(intent)
+        else:
+            groups.setdefault(target, []).append(index)
+    replies = [[] for _ in intents]
+    metrics.inc("compound_commands_total")
+    logging.info(f"Compound command: {intents}")
+
+    stages = getattr(api_request, "stages", None) # An API request's timings include the parts run on the pool
+
+    def _run_group(indices):
+        outer = getattr(compound_part, "replies", None) # Set when an API request is collecting the replies
+        outer_stages, api_request.stages = getattr(api_request, "stages", None), stages
+        for index in indices:
+            compound_part.replies = replies[index]
+            try:
+                dispatch_command(intents[index], intents[index], matcher)
+            except Exception as e:
+                logging.error(f"Error running '{intents[index]}': {e}", exc_info=True)
+                replies[index].append(f"I couldn't {intents[index]}.")
+            finally:
+                compound_part.replies = outer
+        api_request.stages = outer_stages
+
+    with timed_stage("compound", intents=len(intents)):
+        # The group with the last part runs on this thread, so a question it asks can be answered as a follow-up
+        last = max(groups.values(), key=lambda indices: indices[-1], default=[])
+        futures = [_intent_pool.submit(_run_group, indices) for indices in groups.values() if indices is not last]
+        _run_group(last)
+        for future in futures:
+            future.result()
+    response = " ".join(line for lines in replies for line in lines)
+    if response:
+        speak(response)
+    for intent in alone:
+        dispatch_command(intent, intent, matcher)
+
+
+# "Nothing" or similar dismissal responses
+DISMISSAL_PHRASES = (
+    "nothing", "no thanks", "not now", "i'm good", "that's all",
+    "nevermind", "never mind", "actually nothing", "don't do anything",
+    "nothing right now", "nothing for now", "no thank you",
+    "it's okay", "it's alright", "no", "nope", "cancel"
+)
+
+
+def process_command_text(command_text):
+    if command_text in DISMISSAL_PHRASES or strip_wake_phrase(command_text) in DISMISSAL_PHRASES:
         speak("Okay.") # Or "Alright.", "Understood.", "No problem."
         logging.info(f"User indicated no command with: '{command_text}'")
         return # Exit handle_command and go back to listening for wake word
@@ -820,72 +4651,92 @@ def handle_command(phrase_listen_timeout=5.0, phrase_time_limit=10.0):
 
 
     # --- Process the command (existing logic) ---
-    processed_command = command_text # This will be stripped of wake words for matching
-    common_wake_phrases = ("hey assistant", "assistant", "hey google", "google") # Add more if needed
-    for trig in common_wake_phrases:
-        if processed_command.startswith(trig):
-            processed_command = processed_command.replace(trig, "", 1).strip()
-            logging.debug(f"Command after stripping '{trig}': {processed_command}")
-            break # Stop after stripping the first recognized wake phrase
+    processed_command = strip_wake_phrase(command_text) # Stripped of wake words for matching
 
     if not processed_command: # If command was only the wake phrase
-        speak("I heard my name, but what would you like me to do?")
+        ask_followup("I heard my name, but what would you like me to do?", process_command_text)
         return
 
-    # 1. Exact match on processed_command (for simple commands)
-    if processed_command in COMMAND_DISPATCHER:
-        func_to_call = COMMAND_DISPATCHER[processed_command]
+    matcher = command_matcher # One table for the whole command, even if custom_commands.json is reloaded meanwhile
+    intents = split_intents(processed_command, matcher) # "open chrome and spotify and mute the system"
+    if len(intents) > 1:
+        run_intents(intents, matcher)
+        return
+    dispatch_command(processed_command, command_text, matcher)
+
+
+def dispatch_command(processed_command, command_text, matcher):
+    # 1./2. Exact match, otherwise the longest dispatcher phrase inside the command
+    # Useful for commands embedded in longer phrases, e.g., "assistant, can you tell me the time"
+    with timed_stage("match") as match_fields:
+        keyword = matcher.match_dispatcher(processed_command)
+        match_fields["keyword"] = keyword
+    if keyword:
+        func_to_call = COMMAND_DISPATCHER[keyword]
         # Pass original command_text if the function needs it (e.g., for note content)
         if func_to_call in [cmd_take_note, cmd_create_folder]:
-            func_to_call(command_text)
+            handler_text = command_text # These need the full text
+        elif keyword != processed_command and func_to_call == cmd_get_system_info and \
+                any(s_info in command_text for s_info in ["cpu", "ram", "disk", "memory"]):
+            # If asking for specific system info, pass full text so only the parts asked about are read out
+            handler_text = command_text
         else:
-            func_to_call(processed_command)
+            handler_text = processed_command # Others can use the stripped command
+        with timed_stage("handler", command=func_to_call.__name__):
+            func_to_call(handler_text)
         return
 
-    # 2. Substring match (longer keys first for better specificity)
-    # Useful for commands embedded in longer phrases, e.g., "assistant, can you tell me the time"
-    for keyword in sorted(COMMAND_DISPATCHER.keys(), key=len, reverse=True):
-        if keyword and keyword in processed_command: # Check if keyword is non-empty
-            func_to_call = COMMAND_DISPATCHER[keyword]
-            if func_to_call in [cmd_take_note, cmd_create_folder]:
-                func_to_call(command_text) # These need the full text
-            elif func_to_call == cmd_get_system_info and any(s_info in command_text for s_info in ["cpu", "ram", "disk", "memory"]):
-                 # If asking for specific system info, pass full text so it can be parsed if needed (though current cmd_get_system_info gives all)
-                func_to_call(command_text)
-            else:
-                func_to_call(processed_command) # Others can use the stripped command
-            return
-
     # 3. Handle "open <app>" or "launch <app>"
     if processed_command.startswith(("open ", "launch ")):
         parts = processed_command.split(" ", 1)
         if len(parts) > 1:
             app_to_launch = parts[1].strip()
             if app_to_launch:
-                # Check standard map first
-                app_exe = APP_LAUNCH_MAP.get(app_to_launch.lower())
-                if app_exe:
-                    launch_executable_async(app_exe, app_to_launch.title())
-                    return
-
-                # Check custom commands for this app name (if action is launch_executable)
-                for c_cmd in custom_commands:
-                    custom_app_name = c_cmd.get("app_name", "").lower()
-                    if custom_app_name == app_to_launch.lower() and c_cmd.get("action") == "launch_executable":
+                with timed_stage("handler", command="open_app"):
+                    # Check standard map first
+                    app_exe = matcher.app_map.get(app_to_launch.lower())
+                    if app_exe:
+                        launch_executable_async(app_exe, app_to_launch.title())
+                        return
+
+                    # Check custom commands for this app name (if action is launch_executable)
+                    c_cmd = matcher.custom_apps.get(app_to_launch.lower())
+                    if c_cmd:
                         exe_name_custom = c_cmd.get("exe_name")
                         if exe_name_custom:
                             launch_executable_async(exe_name_custom, app_to_launch.title())
                             return
                         else:
                             logging.warning(f"Custom command for '{app_to_launch}' is missing 'exe_name'.")
-                            break # Stop checking custom commands for this app
 
-                # If not in maps or custom app names, try a generic guess
-                # (e.g., "open mygame" -> "mygame.exe")
-                app_exe_guess = app_to_launch + ".exe" if not app_to_launch.lower().endswith(".exe") else app_to_launch
-                logging.info(f"Attempting generic launch for: {app_exe_guess} (app name: {app_to_launch.title()})")
-                launch_executable_async(app_exe_guess, app_to_launch.title())
-                return
+                    # Misheard or partial names ("spot a fi") against every app name we know of
+                    with timed_stage("app_match", app=app_to_launch) as app_match:
+                        match = current_app_name_index().resolve(app_to_launch)
+                        app_match["score"] = round(match[2], 3) if match else 0.0
+                    if match and match[2] >= APP_MATCH_THRESHOLD:
+                        matched_name, matched_exe, confidence = match
+                        logging.info(f"'{app_to_launch}' matched '{matched_name}' ({matched_exe}), confidence {confidence:.2f}")
+                        launch_executable_async(matched_exe, matched_name.title())
+                        return
+                    if match and match[2] >= APP_MATCH_PHONETIC_SCORE:
+                        # Close, but only by sound or a short name's one typo: "stream" may not mean Stremio
+                        matched_name, matched_exe, confidence = match
+                        logging.info(f"'{app_to_launch}' may be '{matched_name}' ({matched_exe}), confidence {confidence:.2f}; asking")
+
+                        def _launch_if_confirmed(answer):
+                            if is_yes(answer):
+                                launch_executable_async(matched_exe, matched_name.title())
+                            else:
+                                speak(f"Okay, I won't open {matched_name.title()}.")
+                        ask_followup(f"Did you mean {matched_name.title()}?", _launch_if_confirmed)
+                        return
+
+                    # If not in maps or custom app names, try a generic guess
+                    # (e.g., "open mygame" -> "mygame.exe")
+                    app_exe_guess = app_to_launch + ".exe" if not app_to_launch.lower().endswith(".exe") else app_to_launch
+                    logging.info(f"Attempting generic launch for: {app_exe_guess} (app name: {app_to_launch.title()})")
+                    launch_executable_async(app_exe_guess, app_to_launch.title())
+                    return
 
     # 4. Handle "Edge" specifically if not caught by "open edge"
     if "edge" in processed_command and "open" in processed_command: # "open microsoft edge"
@@ -903,13 +4754,14 @@ def handle_command(phrase_listen_timeout=5.0, phrase_time_limit=10.0):
         return
 
     # 6. Custom commands (by exact phrase match on the processed_command)
-    for cmd_config in custom_commands:
-        phrase = cmd_config.get("phrase", "").lower()
-        if phrase and phrase == processed_command: # Exact match on the user-defined phrase
-            action = cmd_config.get("action")
-            response = cmd_config.get("response", f"Okay, performing your custom action for '{phrase}'.")
-            logging.info(f"Executing custom command for exact phrase: '{phrase}', action: {action}")
-
+    cmd_config = matcher.custom_phrases.get(processed_command)
+    if cmd_config:
+        phrase = processed_command
+        action = cmd_config.get("action")
+        response = cmd_config.get("response", f"Okay, performing your custom action for '{phrase}'.")
+        logging.info(f"Executing custom command for exact phrase: '{phrase}', action: {action}")
+
+        with timed_stage("handler", command=f"custom_{action}"):
             if action == "launch_executable":
                 exe_name = cmd_config.get("exe_name")
                 # Use app_name from config, fallback to exe_name, then generic "application"
@@ -930,24 +4782,89 @@ def handle_command(phrase_listen_timeout=5.0, phrase_time_limit=10.0):
             elif action == "shell":
                 shell_command_to_run = cmd_config.get("shell_cmd")
                 if shell_command_to_run:
-                    try:
-                        # CREATE_NO_WINDOW flag for Windows to run silently in background
-                        subprocess.Popen(shell_command_to_run, shell=True,
-                                         creationflags=0x08000000 if os.name == 'nt' else 0)
+                    # Runs in the background, without a window; tracked, time-limited and its output logged
+                    job = shell_executor.submit(phrase, shell_command_to_run, timeout=cmd_config.get("timeout"),
+                                                speak_result=cmd_config.get("speak_result", False))
+                    if job.state == "error":
+                        if not job.speak_result: # Otherwise the executor already says so
+                            speak(f"I couldn't run the shell command for '{phrase}'.")
+                    elif job.state == "queued":
+                        speak(f"{response} It will start when one of the running commands finishes.")
+                    else:
                         speak(response)
-                    except Exception as e_shell:
-                        logging.error(f"Error executing shell command '{shell_command_to_run}': {e_shell}")
-                        speak(f"I couldn't run the shell command for '{phrase}'.")
                 else:
                     speak(f"Shell command ('shell_cmd') is missing for the custom command '{phrase}'.")
             else:
                 speak(f"The action type '{action}' for the custom command '{phrase}' is unknown or not supported.")
-            return # Custom command executed
+        return # Custom command executed
 
     # Fallback if no command matched
     speak("I'm not sure how to do that yet.")
 
 
+# === Follow-up Conversation ===
+FOLLOWUP_SECONDS = env_number("NOVA_FOLLOWUP_SECONDS", 5) # Wait for an answer or an "and ..." after a command; 0 turns it off
+FOLLOWUP_MAX_TURNS = 4 # Follow-ups per wake word, so a noisy room can't keep the microphone open
+CHAIN_PREFIXES = ("and then ", "and also ", "and ", "also ", "then ", "plus ") # "...and open Spotify"
+metrics.describe("followups_total", "counter", "Follow-up turns heard without the wake word, by kind.")
+
+followup_state = threading.local() # .pending: (question, on_answer) asked by a handler on this thread
+YES_ANSWERS = {"yes", "yeah", "yep", "yup", "sure", "correct", "right", "ok", "okay", "please", "do it", "open it", "that's right"}
+
+
+def ask_followup(question, on_answer):
+    """Ask the user something. Their reply, said within FOLLOWUP_SECONDS and without the wake word,
+    is passed to on_answer(text). Outside a voice command (e.g. a routine) it is only a prompt."""
+    speak(question)
+    if FOLLOWUP_SECONDS > 0:
+        followup_state.pending = (question, on_answer)
+
+
+def is_yes(answer):
+    # "Yes", "yeah please", "that's right": judged by the first word or two, so "yesterday" isn't a yes
+    words = re.findall(r"[a-z']+", answer.lower())
+    return bool(words) and (words[0] in YES_ANSWERS or " ".join(words[:2]) in YES_ANSWERS)
+
+
+def continue_conversation(phrase_time_limit=10.0):
+    """After a command, keep listening without the wake word: for the answer to a question the
+    handler asked, or for a chained command ("and open Spotify"). Ends at the first silence.
+
+    Returns the ring buffer position the wake word scan should resume from: the start of a
+    window that wasn't a follow-up, which may hold the wake word and a new command. None if
+    everything heard was handled.
+    """
+    for _ in range(FOLLOWUP_MAX_TURNS):
+        if FOLLOWUP_SECONDS <= 0 or audio_capture is None:
+            return None
+        pending, followup_state.pending = getattr(followup_state, "pending", None), None
+        tts_worker.wait_until_quiet(timeout=30) # Don't listen to our own reply
+        listen_from = audio_capture.ring.latest_seq
+        # An answer is free text, so it's never cut short by a command word inside it
+        text = listen_for_command(listen_from, FOLLOWUP_SECONDS, phrase_time_limit, early_dispatch=EARLY_DISPATCH and not pending,
+                                  quiet=not pending, followup="answer" if pending else "chain")
+        if not text:
+            return None if pending else listen_from
+        if pending:
+            question, on_answer = pending
+            metrics.inc("followups_total", kind="answer")
+            if text in DISMISSAL_PHRASES:
+                speak("Okay.")
+                return
+            logging.info(f"Answer to '{question}': '{text}'")
+            with timed_stage("handler", command=getattr(on_answer, "__name__", "followup"), followup=True):
+                on_answer(text)
+            continue
+        chained = next((text[len(prefix):] for prefix in CHAIN_PREFIXES if text.startswith(prefix)), None)
+        if chained is None and not text.startswith(COMMON_WAKE_PHRASES):
+            # Without "and ..." (or the wake word) it was probably meant for someone else
+            logging.info(f"Ignoring '{text}' heard after the command: not a follow-up.")
+            return listen_from
+        metrics.inc("followups_total", kind="chain")
+        process_command_text(chained or text)
+    return None
+
+
 # === Daily Text Function ===
 def fetch_daily_text():
     today_str = datetime.datetime.now().strftime("%Y-%m-%d")
@@ -976,123 +4893,474 @@ def fetch_daily_text():
     return full_text
 
 
-# === Scheduler Thread ===
-daily_greeting_done_today = False
+# === Scheduled Jobs ===
+MORNING_GREETING_HOUR = 7 # Said at 7 AM, or on starting up before 8 AM
+HOUSEKEEPING_INTERVAL = 30.0 # Seconds between saves of the adapted calibration and the notes index
 
-def scheduler_thread_func():
-    global daily_greeting_done_today
-    logging.info("Scheduler thread started.")
-    while True:
-        now = datetime.datetime.now()
-        hour = now.hour
 
-        # Morning greeting and daily text (e.g., between 7 AM and 8 AM)
-        if 7 <= hour < 8 and not daily_greeting_done_today:
-            logging.info("Scheduler: Morning sequence triggered.")
-            speak("Good morning! Here's something for your day.")
-            time.sleep(0.5) # Pause for effect
-            text_for_day = fetch_daily_text()
-            speak(text_for_day)
-            daily_greeting_done_today = True
+def morning_greeting():
+    logging.info("Scheduler: Morning sequence triggered.")
+    speak("Good morning! Here's something for your day.")
+    text_for_day = fetch_daily_text()
+    speak(text_for_day)
+
+
+def schedule_morning_greeting():
+    def _greet():
+        morning_greeting()
+        schedule_morning_greeting() # Tomorrow's
+    timer_scheduler.call_at(next_occurrence(MORNING_GREETING_HOUR, 0), _greet, "morning greeting")
+
+
+def housekeeping():
+    noise_calibration.save_if_changed() # Keep the adapted threshold for the next start
+    notes_search.save_if_dirty()
+
+
+def run_routine_command(phrase):
+    # Like a spoken command, minus the "You said" echo
+    keyword = command_matcher.match_dispatcher(phrase)
+    if keyword:
+        with timed_stage("handler", command=COMMAND_DISPATCHER[keyword].__name__):
+            COMMAND_DISPATCHER[keyword](phrase)
+    else:
+        process_command_text(phrase)
+
+
+def start_scheduler():
+    if datetime.datetime.now().hour == MORNING_GREETING_HOUR: # Started during the greeting hour
+        timer_scheduler.call_later(0, morning_greeting, "morning greeting")
+    schedule_morning_greeting()
+    timer_scheduler.call_every(HOUSEKEEPING_INTERVAL, housekeeping, "housekeeping")
+    timer_scheduler.start()
+
+
+reminders = ReminderStore(REMINDERS_FILE, timer_scheduler, run_command=run_routine_command)
+
+
+# === Command API ===
+API_PORT = env_number("NOVA_API_PORT", 0, int) # Text commands over HTTP on localhost (off when 0)
+API_SOCKET = os.getenv("NOVA_API_SOCKET", "").strip() # The same API on a Unix domain socket (off when empty)
+API_TOKEN = os.getenv("NOVA_API_TOKEN", "").strip() # Sent as "Authorization: Bearer <token>"
+API_TOKEN_FILE = os.path.join(writable_user_data_dir, "api-token.txt") # The HTTP API's token when NOVA_API_TOKEN isn't set
+DAEMON_API_PORT = 8765 # Used by --daemon when neither NOVA_API_PORT nor NOVA_API_SOCKET is set
+API_MAX_BODY = 64 * 1024
+API_ANSWER_SECONDS = 120 # How long a question asked by a handler waits for its answer
+metrics.describe("api_requests_total", "counter", "Text commands received over the command API, by outcome.")
+
+api_request = threading.local() # .stages: stage events of the command this thread is handling for the API
+_api_questions = {} # conversation id -> (asked at, question, on_answer)
+_api_questions_lock = threading.Lock()
+_api_conversation_ids = itertools.count(1)
+
+
+def load_api_token():
+    """NOVA_API_TOKEN, or the token in API_TOKEN_FILE, generated (readable by this user only) the first time."""
+    if API_TOKEN:
+        return API_TOKEN
+    with contextlib.suppress(FileNotFoundError):
+        with open(API_TOKEN_FILE, "r", encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    token = secrets.token_urlsafe(32)
+    tmp_path = f"{API_TOKEN_FILE}.{os.getpid()}.tmp"
+    with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, API_TOKEN_FILE)
+    logging.info(f"Created a token for the command API in {API_TOKEN_FILE}")
+    return token
+
+
+def _collect_api_stage(stage, started, ended, fields):
+    stages = getattr(api_request, "stages", None)
+    if stages is not None:
+        stages.append(dict(fields, stage=stage, ms=round((ended - started) * 1000, 3)))
+
+
+def run_text_command(text, conversation=None, say_replies=False):
+    """Handle a typed command like a spoken one and return what happened instead of saying it
+    (unless say_replies, e.g. for a hotkey while the microphone loop runs).
+
+    The reply lists what would have been said, the handlers that ran and each stage's timing.
+    If a handler asks a question, the reply carries a conversation id; sending the answer with
+    that id passes it to the handler, like answering out loud.
+    """
+    command_text = text.strip().lower()
+    on_answer = None
+    if conversation is not None:
+        with _api_questions_lock:
+            _, _, on_answer = _api_questions.pop(conversation, (None, None, None))
+        if on_answer is None:
+            raise KeyError(conversation)
+    replies, stages = [], []
+    compound_part.replies, api_request.stages = replies, stages # speak() and timed stages are collected
+    followup_state.pending = None
+    error = None
+    try:
+        with timed_stage("api_command", chars=len(command_text), answer=on_answer is not None):
+            if on_answer is None:
+                process_command_text(command_text)
+            elif command_text in DISMISSAL_PHRASES:
+                speak("Okay.")
+            else:
+                with timed_stage("handler", command=getattr(on_answer, "__name__", "followup"), followup=True):
+                    on_answer(command_text)
+    except Exception as e:
+        logging.error(f"Error handling API command '{command_text}': {e}", exc_info=True)
+        error = str(e)
+    finally:
+        compound_part.replies = api_request.stages = None
+        pending, followup_state.pending = getattr(followup_state, "pending", None), None
+    if say_replies and replies:
+        speak(" ".join(replies))
+
+    result = {
+        "text": command_text,
+        "handlers": [stage["command"] for stage in stages if stage["stage"] == "handler"],
+        "keyword": next((stage.get("keyword") for stage in stages if stage["stage"] == "match"), None),
+        "replies": replies,
+        "error": error,
+        "timing": {"total_ms": stages[-1]["ms"], "stages": stages[:-1]},
+    }
+    if pending:
+        question_id = next(_api_conversation_ids)
+        now = time.monotonic()
+        with _api_questions_lock:
+            for stale in [key for key, (asked, _, _) in _api_questions.items() if now - asked > API_ANSWER_SECONDS]:
+                del _api_questions[stale]
+            _api_questions[question_id] = (now, pending[0], pending[1])
+        result["question"] = pending[0]
+        result["conversation"] = question_id
+    metrics.inc("api_requests_total", outcome="error" if error else "handled" if result["handlers"] else "unmatched")
+    return result
+
+
+class _CommandRequestHandler(http.server.BaseHTTPRequestHandler):
+    """POST /command with {"text": "..."}, plus "conversation" when answering a question and
+    "speak": true to also say the replies out loud."""
+    protocol_version = "HTTP/1.1" # Keep-alive, so a client sending many commands doesn't reconnect for each
+
+    def setup(self):
+        # Headers and body are separate writes; with Nagle on, keep-alive clients would wait out a delayed ACK each time
+        self.disable_nagle_algorithm = self.request.family in (socket.AF_INET, socket.AF_INET6)
+        super().setup()
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/command":
+            self._reply(404, {"error": "not found"})
+            return
+        if self.headers.get("Origin"): # Only browsers send it; a web page must not drive the assistant
+            self._reply(403, {"error": "requests from web pages are not allowed"})
+            return
+        token = self.server.token # Always set over TCP: any local program can connect to a port
+        if token and not hmac.compare_digest(self.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+            metrics.inc("api_requests_total", outcome="unauthorized")
+            self._reply(401, {"error": "missing or wrong token"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._reply(415, {"error": "send application/json"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > API_MAX_BODY:
+            self._reply(413, {"error": "request too large"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length))
+            text, conversation, say_replies = body["text"], body.get("conversation"), body.get("speak") is True
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError('"text" must be a non-empty string')
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            metrics.inc("api_requests_total", outcome="bad_request")
+            self._reply(400, {"error": f"expected {{\"text\": \"...\"}}: {e}"})
+            return
+        try:
+            self._reply(200, run_text_command(text, conversation, say_replies))
+        except KeyError:
+            self._reply(404, {"error": f"no open question for conversation {conversation}"})
+
+    def _reply(self, status, result):
+        body = json.dumps(result, default=str).encode("utf-8")
+        if status != 200:
+            self.close_connection = True # The request body may not have been read
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Load tests would otherwise flood the console
+
+
+class _CommandHTTPServer(http.server.ThreadingHTTPServer):
+    request_queue_size = 64 # Connections waiting to be accepted, for many clients at once
+    token = None
+
+
+class _UnixCommandServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 64
+    token = API_TOKEN # Optional: only this user can open the socket
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0) # http.server expects a (host, port) client address
+
+
+def start_command_api(port=API_PORT, socket_path=API_SOCKET, host="127.0.0.1"):
+    """Serve the command API on localhost and/or a Unix domain socket. Returns the servers started.
+
+    Over HTTP a token is always required, as every local program and user can reach the port.
+    """
+    if _collect_api_stage not in stage_listeners:
+        stage_listeners.append(_collect_api_stage)
+    servers = []
+    if port:
+        token = load_api_token()
+        server = _CommandHTTPServer((host, port), _CommandRequestHandler)
+        server.token = token
+        threading.Thread(target=server.serve_forever, daemon=True, name="api-http").start()
+        logging.info(f"Accepting text commands at http://{host}:{server.server_address[1]}/command")
+        if not API_TOKEN:
+            print(f"Command API token: send 'Authorization: Bearer <token>' with the token in {API_TOKEN_FILE}")
+        servers.append(server)
+    if socket_path:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix domain sockets aren't available on this system; use NOVA_API_PORT")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(socket_path) # Left behind by an earlier run
+        server = _UnixCommandServer(socket_path, _CommandRequestHandler)
+        os.chmod(socket_path, 0o600) # Only this user's programs may connect
+        threading.Thread(target=server.serve_forever, daemon=True, name="api-socket").start()
+        logging.info(f"Accepting text commands on the Unix socket {socket_path}")
+        servers.append(server)
+    return servers
+
+
+def stop_command_api(servers):
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        if isinstance(server, _UnixCommandServer):
+            with contextlib.suppress(OSError):
+                os.remove(server.server_address)
+
+
+# === Startup ===
+def run_startup_tasks(tasks):
+    """Run independent startup steps concurrently. Returns {name: (result, error, seconds)} in task order."""
+    def _run(name, func):
+        started = time.perf_counter()
+        try:
+            result, error = func(), None
+        except Exception as e:
+            result, error = None, e
+        ended = time.perf_counter()
+        emit_stage("startup", started, ended, component=name)
+        return result, error, ended - started
+
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="startup") as pool:
+        futures = {name: pool.submit(_run, name, func) for name, func in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def log_startup_report(results, started):
+    lines = [f"  {name:<14} {seconds * 1000:7.0f} ms" + (f"  FAILED: {error}" if error else "")
+             for name, (_, error, seconds) in results.items()]
+    lines.append(f"  {'ready after':<14} {(time.perf_counter() - started) * 1000:7.0f} ms")
+    logging.info("Startup timing:\n" + "\n".join(lines))
+
+
+TTS_WARM_PHRASES = (
+    "Okay.", "Noted.", "Opening Google.", "Opening YouTube.", "Opening Microsoft Edge.", "System mute toggled.",
+    "What would you like me to do?", "I didn't hear anything.", "Sorry, I didn't catch that clearly.",
+    "I'm not sure how to do that yet.", "The Recycle Bin has been emptied.", "Goodbye.",
+)
+
+
+def tts_warm_phrases():
+    """Fixed replies worth rendering ahead of time, plus whatever the help and capabilities scripts say."""
+    phrases = list(TTS_WARM_PHRASES)
+    compound_part.replies = phrases # speak() collects the scripts instead of saying them
+    try:
+        cmd_show_help("")
+        cmd_tell_capabilities("")
+    finally:
+        compound_part.replies = None
+    return phrases
 
-        # Reset flag after midnight (e.g., if it's before 6 AM and flag is still true)
-        if hour < 6: # Resetting period
-            if daily_greeting_done_today:
-                logging.info("Scheduler: Resetting daily_greeting_done_today flag for the new day.")
-                daily_greeting_done_today = False
 
-        time.sleep(30) # Check every 30 seconds
+def start_services():
+    """Background work shared by the voice loop and --daemon."""
+    # Morning greeting, housekeeping, reminders and routines all run off one timer heap
+    start_scheduler()
+
+    # Build/refresh the executable index in the background
+    exe_index.start_background_refresh()
+    start_telemetry()
+    start_custom_commands_watcher() # Edits to custom_commands.json apply without a restart
+    system_sampler.start() # "System information" is then answered without waiting on psutil
+    threading.Thread(target=refresh_app_name_index, daemon=True, name="app-index").start()
+
+
+def stop_services():
+    timer_scheduler.stop()
+    noise_calibration.save_if_changed()
+    notes_search.save_if_dirty()
+    exe_cache.flush() # Don't lose launches made in the last couple of seconds
+    shell_executor.shutdown() # No custom commands left running (or waiting) without the assistant
+
+
+def create_porcupine():
+    import pvporcupine # Pulls in requests and the native library, so it loads on the startup pool
+    return pvporcupine.create(
+        access_key=PORCUPINE_ACCESS_KEY,
+        keyword_paths=[WAKE_WORD_PPN],
+        sensitivities=[0.65] # Adjust sensitivity as needed (0.0 to 1.0)
+    )
 
 
 # === Main Wake-Word Loop ===
 porcupine = None
 pa = None
 audio_stream = None
+audio_capture = None
 
 
 def main_loop():
-    global porcupine, pa, audio_stream
+    global porcupine, pa, audio_stream, audio_capture, recognizer_backend
+    startup_started = time.perf_counter()
+    wake_word_configured = PORCUPINE_ACCESS_KEY and WAKE_WORD_PPN and os.path.exists(WAKE_WORD_PPN)
+
+    # Independent pieces start side by side; nothing below touches hardware before this point
+    tasks = {"tts": start_tts, "audio_device": pyaudio.PyAudio}
+    if wake_word_configured:
+        tasks["wake_word"] = create_porcupine
+    if recognizer_backend is None: # Tests and benchmarks may have installed one already
+        tasks["recognizer"] = load_recognizer_backend
+    tasks["calibration"] = noise_calibration.load
+    tasks["exe_cache"] = exe_cache.load
+    tasks["notes"] = notes_search.open # Opens the store (recovery, notes.txt migration) and indexes any new notes
+    tasks["reminders"] = reminders.load # Armed now, fired once the scheduler starts
+    if PROMPT_STYLE == "earcon":
+        tasks["earcon"] = earcon.load # Decoded once, played from memory
+    results = run_startup_tasks(tasks)
+    pa = results["audio_device"][0]
+    if "recognizer" in results:
+        recognizer_backend = results["recognizer"][0] or GoogleRecognizerBackend()
 
     # Critical check for Porcupine setup
-    if not PORCUPINE_ACCESS_KEY or not WAKE_WORD_PPN or not os.path.exists(WAKE_WORD_PPN):
+    if not wake_word_configured:
         msg = "Porcupine Access Key or Wake Word PPN file is missing, invalid, or not found. Wake word engine cannot start."
         logging.error(msg)
-        speak(msg) if tts else print(f"ERROR: {msg}")
+        speak_and_wait(msg) if tts else print(f"ERROR: {msg}")
+        if pa: pa.terminate()
         return
 
-    try:
-        porcupine = pvporcupine.create(
-            access_key=PORCUPINE_ACCESS_KEY,
-            keyword_paths=[WAKE_WORD_PPN],
-            sensitivities=[0.65] # Adjust sensitivity as needed (0.0 to 1.0)
-        )
-    except pvporcupine.PorcupineError as pe: # Specific Porcupine errors
-        logging.error(f"Porcupine initialization failed: {pe}")
-        speak("I couldn't start my wake word engine. Please check the access key and the wake word file path and integrity.")
-        return
-    except Exception as e_porc_general: # Other unexpected errors
-        logging.error(f"An unexpected error occurred during Porcupine initialization: {e_porc_general}")
-        speak("An unexpected error occurred while starting my wake word engine. Please check the logs.")
+    porcupine, porcupine_error, _ = results["wake_word"]
+    if porcupine_error is not None:
+        porcupine_errors = getattr(sys.modules.get("pvporcupine"), "PorcupineError", ())
+        if isinstance(porcupine_error, porcupine_errors): # Specific Porcupine errors
+            logging.error(f"Porcupine initialization failed: {porcupine_error}")
+            speak_and_wait("I couldn't start my wake word engine. Please check the access key and the wake word file path and integrity.")
+        else: # Other unexpected errors
+            logging.error(f"An unexpected error occurred during Porcupine initialization: {porcupine_error}")
+            speak_and_wait("An unexpected error occurred while starting my wake word engine. Please check the logs.")
+        if pa: pa.terminate()
         return
 
-    pa = pyaudio.PyAudio()
+    stream_started = time.perf_counter()
     try:
-        audio_stream = pa.open(
-            rate=porcupine.sample_rate,
-            channels=1,
-            format=pyaudio.paInt16,
-            input=True,
-            frames_per_buffer=porcupine.frame_length,
-            input_device_index=None # Use default input device
-        )
+        if AUDIO_REPLAY_FILES: # Fake microphone for tests and benchmarks
+            logging.info(f"Replaying audio from {AUDIO_REPLAY_FILES} instead of the microphone.")
+            audio_stream = WavReplaySource(AUDIO_REPLAY_FILES)
+        else:
+            if pa is None:
+                raise results["audio_device"][1]
+            audio_stream = pa.open(
+                rate=porcupine.sample_rate,
+                channels=1,
+                format=pyaudio.paInt16,
+                input=True,
+                frames_per_buffer=porcupine.frame_length,
+                input_device_index=None # Use default input device
+            )
     except Exception as e_audio:
         logging.error(f"PyAudio stream opening failed: {e_audio}")
-        speak("I couldn't open the audio stream. Please check your microphone and audio settings.")
+        speak_and_wait("I couldn't open the audio stream. Please check your microphone and audio settings.")
         if porcupine: porcupine.delete() # Clean up Porcupine if audio fails
         if pa: pa.terminate() # Clean up PyAudio
         return
-
-    # Start the scheduler thread
-    scheduler = threading.Thread(target=scheduler_thread_func, daemon=True)
-    scheduler.start()
-
+    results["audio_stream"] = (audio_stream, None, time.perf_counter() - stream_started)
+    if PROMPT_STYLE == "earcon" and pa is not None and not results["earcon"][1]:
+        try:
+            earcon.open(pa) # Kept open, so playing the chime doesn't wait on the device
+        except Exception as e_earcon:
+            logging.warning(f"Could not open audio output for the earcon, prompting with speech instead: {e_earcon}")
+    tts_worker.attach_output(pa) # Cached replies are played on the same device instead of synthesized
+
+    start_services()
+    api_servers = []
+    if API_PORT or API_SOCKET: # Scripts and hotkeys can send text commands alongside the microphone
+        try:
+            api_servers = start_command_api()
+        except Exception as e_api:
+            logging.error(f"Could not start the command API: {e_api}")
+
+    # One capture thread owns the device; Porcupine and the command recognizer both read its ring buffer
+    audio_capture = AudioCapture(audio_stream, porcupine.frame_length)
+    audio_capture.start()
+    wake_cursor = audio_capture.ring.cursor()
+    if not results["calibration"][0]: # First run: measure the room once; afterwards the saved value is adapted
+        noise_calibration.calibrate_in_background(audio_capture.ring, audio_capture.frame_length)
+    log_startup_report(results, startup_started)
     speak("Assistant ready. Say 'Hey Google' or your wake word to begin.")
+    tts_worker.warm(tts_warm_phrases()) # Rendered once, after which they come from disk
     ppn_base = os.path.basename(WAKE_WORD_PPN if WAKE_WORD_PPN and isinstance(WAKE_WORD_PPN, str) else WAKE_WORD_PPN_FILENAME)
     logging.info(f"Listening for wake word '{ppn_base}'...")
 
     try:
         while True:
-            try:
-                pcm = audio_stream.read(porcupine.frame_length, exception_on_overflow=False)
-                frame = struct.unpack_from("h" * porcupine.frame_length, pcm)
-            except IOError as e_io:
-                if hasattr(e_io, 'errno') and e_io.errno == pyaudio.paInputOverflowed:
-                    logging.warning("Audio input overflowed. Skipping this frame.")
-                    continue # Skip this frame and try again
-                # For other IOErrors, log and briefly pause
-                logging.error(f"Audio stream read IOError (not overflow): {e_io}")
-                time.sleep(0.1)
-                continue
-            except Exception as e_read_generic: # Catch other potential errors during read/unpack
-                logging.error(f"Unexpected error reading or unpacking audio stream: {e_read_generic}")
-                time.sleep(0.1) # Brief pause before retrying
-                continue
+            pcm = wake_cursor.read_frame()
+            if pcm is None:
+                logging.info("Audio capture stopped.")
+                break
+            frame = struct.unpack_from("h" * porcupine.frame_length, pcm)
 
+            process_started = time.perf_counter()
             keyword_index = porcupine.process(frame)
+            metrics.observe("wake_process_seconds", time.perf_counter() - process_started)
             if keyword_index >= 0: # Wake word detected
                 logging.info("Wake word detected!")
+                emit_stage("wake", time.perf_counter(), seq=wake_cursor.seq)
+                tts_worker.cancel_pending() # The user is talking again; stale queued speech is dropped
                 # Potentially add a sound effect here if desired
-                handle_command() # Process the command
+                rescan_from = handle_command(wake_seq=wake_cursor.seq) # Process the command
+                if rescan_from is None:
+                    wake_cursor.seek_to_latest() # Don't scan the command audio for the wake word
+                else:
+                    wake_cursor.seek(rescan_from) # Heard after the command but not a follow-up; it may start with the wake word
                 logging.info(f"Listening for wake word '{ppn_base}' again...")
+            else:
+                noise_calibration.observe(pcm) # Track the room from audio we read anyway
 
     except KeyboardInterrupt:
         logging.info("Keyboard interrupt received. Shutting down assistant.")
-        if tts: speak("Goodbye.")
+        if tts: speak_and_wait("Goodbye.", timeout=5, urgent=True)
     except Exception as e_main_loop: # Catch-all for unexpected errors in the main loop
         logging.error(f"An unexpected error occurred in the main loop: {e_main_loop}", exc_info=True)
-        if tts: speak("An unexpected error occurred. I might need to restart.")
+        if tts: speak_and_wait("An unexpected error occurred. I might need to restart.", timeout=10, urgent=True)
     finally:
         logging.info("Cleaning up resources...")
+        stop_command_api(api_servers)
+        stop_services()
+        earcon.close()
+        tts_worker.close()
+        if audio_capture is not None:
+            audio_capture.stop()
         if audio_stream is not None:
             try:
                 if audio_stream.is_active(): audio_stream.stop_stream()
@@ -1112,34 +5380,66 @@ def main_loop():
         logging.info("Shutdown complete.")
 
 
+# === Headless Daemon ===
+def daemon_loop():
+    """Run the command pipeline without audio hardware: commands arrive as text over the command
+    API, and what the assistant would have said goes back in each response."""
+    startup_started = time.perf_counter()
+    results = run_startup_tasks({"exe_cache": exe_cache.load, "notes": notes_search.open, "reminders": reminders.load})
+    start_services()
+    try:
+        api_servers = start_command_api(API_PORT or (0 if API_SOCKET else DAEMON_API_PORT), API_SOCKET)
+    except Exception as e_api:
+        logging.error(f"Could not start the command API: {e_api}")
+        stop_services()
+        return
+    log_startup_report(results, startup_started)
+
+    stop_requested = threading.Event()
+    with contextlib.suppress(ValueError, OSError): # Only possible from the main thread
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_requested.set())
+    try:
+        while not stop_requested.wait(1.0): # Short waits so Ctrl+C is noticed on Windows too
+            pass
+        logging.info("Termination requested. Shutting down daemon.")
+    except KeyboardInterrupt:
+        logging.info("Keyboard interrupt received. Shutting down daemon.")
+    finally:
+        logging.info("Cleaning up resources...")
+        stop_command_api(api_servers)
+        stop_services()
+        logging.info("Shutdown complete.")
+
+
 if __name__ == "__main__":
     critical_failure = False
     error_messages = []
+    daemon_mode = "--daemon" in sys.argv[1:] # No microphone, wake word or speech; text commands only
 
-    if not mic:
-        error_messages.append("Microphone not available or not initialized.")
-    if not PORCUPINE_ACCESS_KEY:
+    # The microphone is opened during startup in main_loop, which reports it if that fails
+    if not daemon_mode and not PORCUPINE_ACCESS_KEY:
         error_messages.append("Porcupine Access Key (PORCUPINE_ACCESS_KEY) is missing. Check your .env file.")
-    if not WAKE_WORD_PPN or not os.path.exists(WAKE_WORD_PPN):
+    if not daemon_mode and (not WAKE_WORD_PPN or not os.path.exists(WAKE_WORD_PPN)):
         error_messages.append(
             f"Wake word PPN file ('{WAKE_WORD_PPN_FILENAME}') is missing, invalid, or could not be located at expected paths."
         )
 
     if error_messages:
         critical_failure = True
+        start_tts() # Only needed to read out the first error
         logging.error("Assistant cannot start due to the following critical errors:")
         for msg in error_messages:
             logging.error(f"- {msg}")
             # Attempt to speak the first critical error if TTS is available, otherwise print
             if tts and msg == error_messages[0]: # Only speak the first one to avoid too much talking
-                speak(msg + " The assistant cannot start.")
+                speak_and_wait(msg + " The assistant cannot start.")
             elif not tts: # Print all if TTS is not available
                  print(f"STARTUP ERROR: {msg} The assistant cannot start.")
             if tts and msg != error_messages[0]: # Print subsequent errors if TTS spoke the first
                  print(f"ADDITIONAL STARTUP ERROR: {msg}")
 
     if not critical_failure:
-        main_loop()
+        daemon_loop() if daemon_mode else main_loop()
     else:
         logging.info("Assistant did not start due to critical errors listed above. Please resolve them and try again.")
         if not tts: # Ensure there's some console output if TTS didn't cover it
@@ -0,0 +1,165 @@
+"""Command API throughput: requests per second through the headless daemon's dispatcher.
+
+Starts `NovaVoice.py --daemon` in a subprocess (its data in a temporary directory), then
+--clients threads send a mix of harmless commands over localhost HTTP or the Unix socket
+for --seconds each. Reports requests per second, client-side latency and the
+dispatcher time the daemon reports in each response.
+
+    python benchmarks/bench_api.py --clients 1 4 16 --seconds 5 --transport http
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import secrets
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from corpus import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Handlers run for real, so only commands that don't touch the system
+COMMANDS = [
+    "what time is it", "what is today's date", "what's my battery level", "read my notes",
+    "find my notes about passport", "what are my reminders", "what's running", "help",
+    "what time is it and what is today's date", "sing me a song",
+]
+TOKEN = secrets.token_urlsafe(16) # Given to the daemon as NOVA_API_TOKEN
+HEADERS = {"Content-Type": "application/json", "Authorization": f"Bearer {TOKEN}"}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def post(connection, text):
+    connection.request("POST", "/command", json.dumps({"text": text}), HEADERS)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def run_clients(connect, clients, seconds):
+    stop = threading.Event()
+    latencies, server_ms, errors = [], [], []
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        connection = connect()
+        local_latency, local_server = [], []
+        try:
+            while not stop.is_set():
+                text = rng.choice(COMMANDS)
+                started = time.perf_counter()
+                status, result = post(connection, text)
+                local_latency.append((time.perf_counter() - started) * 1000)
+                if status != 200 or result.get("error"):
+                    errors.append(f"'{text}': {status} {result.get('error')}")
+                else:
+                    local_server.append(result["timing"]["total_ms"])
+        except Exception as e:
+            errors.append(repr(e))
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(local_latency)
+            server_ms.extend(local_server)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, server_ms, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16], help="concurrent client counts")
+    parser.add_argument("--seconds", type=float, default=5.0, help="how long each client count runs")
+    parser.add_argument("--transport", choices=("http", "unix"), default="http")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="novavoice-api-")
+    env = dict(os.environ, LOCALAPPDATA=data_dir, NOVA_TRACE_FILE="", NOVA_METRICS_PORT="0", NOVA_API_TOKEN=TOKEN)
+    if args.transport == "unix":
+        socket_path = os.path.join(data_dir, "api.sock")
+        env.update(NOVA_API_SOCKET=socket_path, NOVA_API_PORT="0")
+
+        def connect():
+            return UnixHTTPConnection(socket_path)
+    else:
+        port = free_port()
+        env.update(NOVA_API_PORT=str(port), NOVA_API_SOCKET="")
+
+        def connect():
+            return http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    log = open(os.path.join(data_dir, "daemon.log"), "wb")
+    daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, "NovaVoice.py"), "--daemon"],
+                              env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                connection = connect()
+                status, result = post(connection, "what time is it")
+                connection.close()
+                break
+            except OSError:
+                if daemon.poll() is not None or time.monotonic() > deadline:
+                    log.flush()
+                    with open(log.name, "r", encoding="utf-8", errors="replace") as f:
+                        print("".join(f.readlines()[-20:]))
+                    raise SystemExit("The daemon didn't start (its log is above)")
+                time.sleep(0.2)
+        print(f"daemon ready over {args.transport}: '{result['text']}' -> {result['handlers']} {result['replies']}")
+
+        print(f"\n{'clients':>7} {'requests':>9} {'req/s':>8} | {'p50':>8} {'p95':>8} {'p99':>8} | {'server p50':>10} {'p99':>8} | errors")
+        failed = False
+        for clients in args.clients:
+            latencies, server_ms, errors, elapsed = run_clients(connect, clients, args.seconds)
+            failed = failed or bool(errors) or not latencies
+            if not latencies:
+                print(f"{clients:>7} no requests completed: {errors[:1]}")
+                continue
+            print(f"{clients:>7} {len(latencies):>9} {len(latencies) / elapsed:>8.0f} | "
+                  f"{statistics.median(latencies):>5.2f} ms {percentile(latencies, 95):>5.2f} ms "
+                  f"{percentile(latencies, 99):>5.2f} ms | {statistics.median(server_ms):>7.2f} ms "
+                  f"{percentile(server_ms, 99):>5.2f} ms | {len(errors)}")
+            for error in errors[:5]:
+                print(f"        {error}")
+    finally:
+        daemon.terminate()
+        daemon.wait(30)
+        log.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
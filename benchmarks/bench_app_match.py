@@ -0,0 +1,95 @@
+"""Fuzzy "open <app>" resolution: accuracy on misheard names and lookup time as the index grows.
+
+The index holds APP_LAUNCH_MAP plus --executables synthetic installed executables.
+Misheard names must resolve to the right executable: above NOVA_APP_MATCH_THRESHOLD
+it launches, just below it (APP_MATCH_PHONETIC_SCORE and up) "open X" asks "Did you
+mean ...?" first. Names of apps that aren't installed, including look-alikes of ones
+that are, must stay below the threshold, so they never launch the wrong thing.
+
+    python benchmarks/bench_app_match.py --executables 1000 10000 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+from corpus import percentile  # noqa: E402
+
+INSTALLED = ["notepad++.exe", "winrar.exe", "thunderbird.exe", "postman.exe", "obsidian.exe", "telegram.exe",
+             "stremio.exe", "maps.exe", "times.exe", "setup.exe", "unins000.exe", "update.exe", "crashhelper.exe"]
+
+# What a recognizer plausibly hears -> the executable that should open
+MISHEARD = {
+    "spot a fi": "spotify.exe", "spot if i": "spotify.exe", "fire fox": "firefox.exe",
+    "note pad": "notepad.exe", "calculater": "calc.exe", "dis cord": "discord.exe",
+    "power point": "powerpnt.exe", "photo shop": "photoshop.exe", "blend er": "blender.exe",
+    "audacity app": "audacity.exe", "file zilla": "filezilla.exe", "virtual box": "VirtualBox.exe",
+    "v s code": "Code.exe", "pie charm": "pycharm64.exe", "visual studios": "devenv.exe",
+    "notepad plus plus": "notepad++.exe", "thunder bird": "thunderbird.exe", "post man": "postman.exe",
+    "obsidien": "obsidian.exe", "tele gram": "telegram.exe", "win rar": "winrar.exe",
+}
+# Not installed, and mostly close to something that is: these must never launch without asking
+NOT_INSTALLED = ["minecraft", "kindle", "garage band", "my game", "tax helper", "cold", "word pad",
+                 "stop", "stream", "mops", "timer", "time", "uninstaller", "crash", "updates"]
+
+SYLLABLES = ("ka", "lo", "mi", "zen", "tor", "bex", "qua", "rin", "dus", "fel", "gor", "hap", "jin", "vos", "wex")
+
+
+def synthetic_names(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + rng.choice(("", "64", "_x86", "-setup")) + ".exe")
+    return sorted(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--executables", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="synthetic installed executable counts")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'names':>7} | {'build':>8} | {'correct':>8} {'asked':>6} {'false accept':>13} | {'p50':>8} {'p99':>8} {'max':>8}")
+    for count in args.executables:
+        entries = [(alias, exe, NovaVoice.APP_SOURCE_BUILTIN) for alias, exe in NovaVoice.APP_LAUNCH_MAP.items()]
+        entries += [(os.path.splitext(name)[0], name, NovaVoice.APP_SOURCE_INDEX)
+                    for name in INSTALLED + synthetic_names(count, rng)]
+        started = time.perf_counter()
+        index = NovaVoice.AppNameIndex(entries)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        correct, asked, wrong = 0, 0, []
+        for spoken, expected in MISHEARD.items():
+            match = index.resolve(spoken)
+            if match and match[1] == expected and match[2] >= NovaVoice.APP_MATCH_THRESHOLD:
+                correct += 1
+            elif match and match[1] == expected and match[2] >= NovaVoice.APP_MATCH_PHONETIC_SCORE:
+                asked += 1
+            else:
+                wrong.append(f"'{spoken}' -> {match}")
+        false_accepts = []
+        for spoken in NOT_INSTALLED:
+            match = index.resolve(spoken)
+            if match and match[2] >= NovaVoice.APP_MATCH_THRESHOLD:
+                false_accepts.append(f"'{spoken}' -> {match}")
+
+        samples = []
+        queries = list(MISHEARD) + NOT_INSTALLED
+        for _ in range(20):
+            for spoken in queries:
+                started = time.perf_counter()
+                index.resolve(spoken)
+                samples.append((time.perf_counter() - started) * 1000)
+        print(f"{len(index.entries):>7} | {build_ms:>5.0f} ms | {correct:>3}/{len(MISHEARD):<4} {asked:>6} "
+              f"{len(false_accepts):>6}/{len(NOT_INSTALLED):<6} | {statistics.median(samples):>5.3f} ms "
+              f"{percentile(samples, 99):>5.3f} ms {max(samples):>5.3f} ms")
+        for line in wrong + false_accepts:
+            print(f"          {line}")
+
+
+if __name__ == "__main__":
+    main()
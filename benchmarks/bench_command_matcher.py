@@ -0,0 +1,81 @@
+"""Compare the old per-utterance command scan with the compiled CommandMatcher.
+
+The old path re-sorted COMMAND_DISPATCHER by length for every utterance and then
+scanned custom_commands linearly. This replays a mix of transcripts against both
+with a few thousand synthetic custom phrases.
+
+    python benchmarks/bench_command_matcher.py --custom 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet",
+         "kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango")
+
+
+def legacy_match(processed_command, dispatcher, custom_cmds):
+    # Steps 2 and 6 of the original handle_command
+    for keyword in sorted(dispatcher.keys(), key=len, reverse=True):
+        if keyword and keyword in processed_command:
+            return keyword
+    for cmd_config in custom_cmds:
+        phrase = cmd_config.get("phrase", "").lower()
+        if phrase and phrase == processed_command:
+            return cmd_config
+    return None
+
+
+def compiled_match(processed_command, matcher):
+    return matcher.match_dispatcher(processed_command) or matcher.custom_phrases.get(processed_command)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--custom", type=int, default=3000, help="number of synthetic custom phrases")
+    parser.add_argument("--utterances", type=int, default=20000, help="transcripts to match")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    custom_cmds = [{"phrase": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))) + f" {i}",
+                    "action": "url", "url": "https://example.com"} for i in range(args.custom)]
+    # Routine phrases ("every monday") without a time deliberately match nothing now, unlike the old scan
+    dispatcher_phrases = [phrase for phrase, handler in NovaVoice.COMMAND_DISPATCHER.items()
+                          if handler is not NovaVoice.cmd_add_routine]
+    utterances = []
+    for i in range(args.utterances):
+        kind = i % 3
+        if kind == 0: # Built-in command embedded in a sentence
+            utterances.append(f"can you {rng.choice(dispatcher_phrases)} please")
+        elif kind == 1: # Custom phrase (hits the end of the old linear scan on average)
+            utterances.append(rng.choice(custom_cmds)["phrase"])
+        else: # Nothing matches
+            utterances.append(" ".join(rng.choice(WORDS) for _ in range(5)))
+
+    started = time.perf_counter()
+    matcher = NovaVoice.CommandMatcher(NovaVoice.COMMAND_DISPATCHER, NovaVoice.APP_LAUNCH_MAP, custom_cmds)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    legacy_results = [legacy_match(u, NovaVoice.COMMAND_DISPATCHER, custom_cmds) for u in utterances]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled_results = [compiled_match(u, matcher) for u in utterances]
+    compiled_s = time.perf_counter() - started
+
+    assert legacy_results == compiled_results, "matchers disagree"
+    per_legacy = legacy_s / len(utterances) * 1e6
+    per_compiled = compiled_s / len(utterances) * 1e6
+    print(f"{args.custom} custom phrases, {len(utterances)} utterances (matcher built in {build_s * 1000:.1f} ms)")
+    print(f"  legacy scan : {per_legacy:8.1f} us/utterance")
+    print(f"  compiled    : {per_compiled:8.1f} us/utterance  (x{per_legacy / per_compiled:.1f})")
+
+
+if __name__ == "__main__":
+    main()
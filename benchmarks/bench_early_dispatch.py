@@ -0,0 +1,78 @@
+"""Time-to-dispatch with and without early dispatch on partial transcripts.
+
+Each corpus file is replayed through listen_streaming() twice, once waiting for
+end-of-phrase and once allowing early dispatch. Times are audio time from the
+start of the file, so they equal wall-clock latency on a live microphone
+(recognition compute is reported separately).
+
+    python benchmarks/bench_early_dispatch.py                  # synthetic corpus, stub backend
+    python benchmarks/bench_early_dispatch.py --corpus DIR --backend vosk
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+from corpus import load_corpus, percentile, synthesize_corpus  # noqa: E402
+
+FRAME_LENGTH = 512 # Porcupine's frame length
+
+
+def fill_ring(wav_path):
+    source = NovaVoice.WavReplaySource([wav_path], realtime=False, trailing_silence=0)
+    frames = []
+    while True:
+        try:
+            frames.append(source.read(FRAME_LENGTH))
+        except EOFError:
+            break
+    ring = NovaVoice.AudioRingBuffer(len(frames) + 1)
+    for frame in frames:
+        ring.write(frame)
+    ring.close()
+    return ring
+
+
+def run_item(item, early, backend_name):
+    if backend_name == "stub":
+        backend = NovaVoice.StubRecognizerBackend([item.transcript])
+    else:
+        backend = NovaVoice.load_recognizer_backend(backend_name)
+    ring = fill_ring(item.wav_path)
+    started = time.perf_counter()
+    text, dispatched_early, audio_ms = NovaVoice.listen_streaming(
+        ring.cursor(0), timeout=5.0, phrase_time_limit=10.0, early_dispatch=early, backend=backend)
+    compute_ms = (time.perf_counter() - started) * 1000
+    return text, dispatched_early, audio_ms, compute_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of WAV + JSON files (default: synthesize one)")
+    parser.add_argument("--backend", default="stub", help="streaming recognizer backend (stub or vosk)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="novavoice-corpus-") as tmp_dir:
+        items = load_corpus(args.corpus) if args.corpus else synthesize_corpus(tmp_dir)
+        waits, earlies = [], []
+        print(f"{'file':<36} {'end-of-phrase':>14} {'early':>9}  transcript")
+        for item in items:
+            _, _, wait_ms, _ = run_item(item, False, args.backend)
+            text, was_early, early_ms, compute_ms = run_item(item, True, args.backend)
+            waits.append(wait_ms)
+            earlies.append(early_ms)
+            marker = "*" if was_early else " "
+            print(f"{item.name[:36]:<36} {wait_ms:11.0f} ms {early_ms:6.0f} ms{marker} {text!r} "
+                  f"(compute {compute_ms:.1f} ms)")
+
+    print("\n* = dispatched from a partial transcript")
+    for label, values in (("end-of-phrase", waits), ("early dispatch", earlies)):
+        print(f"{label:>15}: p50 {percentile(values, 50):6.0f} ms | p95 {percentile(values, 95):6.0f} ms "
+              f"| mean {sum(values) / len(values):6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
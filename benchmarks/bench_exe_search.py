@@ -0,0 +1,98 @@
+"""Compare the old sequential os.walk search with the parallel ExecutableSearch.
+
+Builds a synthetic tree (three roots, like SEARCH_PATHS) with 100k+ files and
+times a deep hit and a full miss with both engines.
+
+    python benchmarks/bench_exe_search.py --files 120000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+
+
+def legacy_find_executable(exe_name, search_paths):
+    # The original find_executable: sequential os.walk, splitext on every file
+    for base in search_paths:
+        if not os.path.exists(base):
+            continue
+        for root, dirs, files in os.walk(base, topdown=True):
+            current_depth = os.path.abspath(root).count(os.sep) - os.path.abspath(base).count(os.sep)
+            if current_depth > 5:
+                dirs[:] = []
+                continue
+            exe_name_lower_no_ext, exe_ext = os.path.splitext(exe_name.lower())
+            if not exe_ext: exe_ext = ".exe"
+            for f in files:
+                f_lower_no_ext, f_ext = os.path.splitext(f.lower())
+                if f_lower_no_ext == exe_name_lower_no_ext and f_ext == exe_ext:
+                    return os.path.join(root, f)
+    return None
+
+
+def build_tree(base, total_files, fanout=6, max_depth=4):
+    roots = [os.path.join(base, name) for name in ("Program Files", "Program Files (x86)", "home")]
+    dirs_per_root = sum(fanout ** d for d in range(max_depth + 1))
+    files_per_dir = -(-total_files // (dirs_per_root * len(roots))) # Ceiling division
+    created = 0
+    dirs = [(root, 0) for root in roots]
+    while dirs and created < total_files:
+        next_dirs = []
+        for dir_path, depth in dirs:
+            os.makedirs(dir_path, exist_ok=True)
+            for i in range(files_per_dir):
+                ext = ".exe" if i % 5 == 0 else ".dll"
+                open(os.path.join(dir_path, f"file{i}{ext}"), "w").close()
+                created += 1
+            if depth < max_depth:
+                next_dirs.extend((os.path.join(dir_path, f"dir{j}"), depth + 1) for j in range(fanout))
+            if created >= total_files:
+                break
+        dirs = next_dirs
+    # The hit lives deep in the last root, the worst case for a sequential walk
+    deep_dir = os.path.join(roots[-1], "dir5", "dir5", "dir5", "dir5")
+    os.makedirs(deep_dir, exist_ok=True)
+    open(os.path.join(deep_dir, "TargetApp.exe"), "w").close()
+    return roots, created + 1
+
+
+def time_call(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=120000, help="approximate number of files to create")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    parser.add_argument("--workers", type=int, default=NovaVoice.SEARCH_MAX_WORKERS)
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(prefix="novavoice-search-bench-")
+    try:
+        print(f"Building synthetic tree under {base} ...")
+        roots, created = build_tree(base, args.files)
+        print(f"Created {created} files.")
+        for label, exe_name in (("deep hit", "targetapp.exe"), ("miss", "doesnotexist.exe")):
+            legacy_s, legacy_path = time_call(lambda: legacy_find_executable(exe_name, roots), args.repeat)
+            parallel_s, parallel_path = time_call(
+                lambda: NovaVoice.ExecutableSearch(exe_name, roots).run(max_workers=args.workers), args.repeat)
+            assert bool(legacy_path) == bool(parallel_path), (legacy_path, parallel_path)
+            print(f"{label:>9}: os.walk {legacy_s * 1000:8.1f} ms | parallel scandir {parallel_s * 1000:8.1f} ms "
+                  f"| speedup x{legacy_s / parallel_s:.2f}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
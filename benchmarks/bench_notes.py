@@ -0,0 +1,103 @@
+"""Notes read and search latency: the old readlines() of notes.txt vs. the indexed NotesStore.
+
+Grows both to --notes entries and, at each checkpoint, times reading the latest
+three notes the way cmd_read_notes does, plus NotesSearchIndex term and date
+lookups (cmd_find_notes) and the index saves housekeeping makes: the one after the
+checkpoint's notes, and one after a single new note. The store's time should stay flat.
+
+    python benchmarks/bench_notes.py --notes 1000000
+"""
+import argparse
+import datetime
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+
+WORDS = ("buy", "milk", "call", "dentist", "tuesday", "meeting", "remember", "the", "report", "passport")
+
+
+def legacy_tail(notes_file, n=3):
+    # The original cmd_read_notes
+    with open(notes_file, "r", encoding="utf-8") as f:
+        notes = f.readlines()
+    return [line.split(": ", 1)[1].strip() for line in notes[-min(len(notes), n):]]
+
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=1000000, help="total notes to write")
+    args = parser.parse_args()
+
+    checkpoints = [c for c in (1000, 10000, 100000, 1000000, 10000000) if c < args.notes] + [args.notes]
+    base = tempfile.mkdtemp(prefix="novavoice-notes-bench-")
+    try:
+        legacy_file = os.path.join(base, "notes.txt")
+        store = NovaVoice.NotesStore(os.path.join(base, "notes"))
+        search = NovaVoice.NotesSearchIndex(store, os.path.join(base, "notes", "search-index.json"))
+        when = datetime.datetime(2020, 1, 1)
+        written = 0
+        print(f"{'notes':>9} {'notes.txt':>10} | {'readlines':>12} | {'store open':>11} {'tail(3)':>10} {'get(id)':>10} "
+              f"| {'index +notes':>12} {'term':>9} {'2 terms':>9} {'rare+common':>11} {'one day':>9} "
+              f"| {'save':>9} {'save +1':>9}")
+        for checkpoint in checkpoints:
+            while written < checkpoint:
+                batch = []
+                for i in range(written, min(checkpoint, written + 50000)):
+                    text = " ".join(WORDS[(i * k) % len(WORDS)] for k in (1, 3, 7)) + f" {i}"
+                    batch.append((text, when + datetime.timedelta(minutes=i)))
+                store.append_many(batch, durable=False)
+                with open(legacy_file, "a", encoding="utf-8") as f:
+                    f.writelines(f"{w.strftime(NovaVoice.NOTE_TIME_FORMAT)}: {t}\n" for t, w in batch)
+                written += len(batch)
+
+            assert [text for _, _, text in store.tail(3)] == legacy_tail(legacy_file)
+            started = time.perf_counter()
+            search.sync() # Only the notes added since the last checkpoint
+            sync_s = time.perf_counter() - started
+            started = time.perf_counter()
+            search.save_if_dirty()
+            save_ms = (time.perf_counter() - started) * 1000
+            one_more = ("one more note", when + datetime.timedelta(minutes=written))
+            store.append_many([one_more], durable=False)
+            with open(legacy_file, "a", encoding="utf-8") as f:
+                f.write(f"{one_more[1].strftime(NovaVoice.NOTE_TIME_FORMAT)}: {one_more[0]}\n")
+            written += 1
+            search.sync()
+            started = time.perf_counter()
+            search.save_if_dirty() # Appends to the delta log unless it's due for compaction
+            save_one_ms = (time.perf_counter() - started) * 1000
+            day = (when + datetime.timedelta(minutes=checkpoint // 2)).date()
+            term_ms = median_ms(lambda: search.search("passport", limit=4), 200) # As cmd_find_notes asks
+            terms_ms = median_ms(lambda: search.search("dentist milk", limit=4), 200)
+            rare_ms = median_ms(lambda: search.search(f"{checkpoint // 3} dentist", limit=4), 200)
+            day_ms = median_ms(lambda: search.on_dates(day, day), 200)
+            legacy_ms = median_ms(lambda: legacy_tail(legacy_file), 3 if checkpoint >= 100000 else 20)
+            open_ms = median_ms(lambda: NovaVoice.NotesStore(store.directory).open(), 5)
+            tail_ms = median_ms(lambda: store.tail(3), 200)
+            get_ms = median_ms(lambda: store.get(checkpoint // 2), 200)
+            size_mb = os.path.getsize(legacy_file) / 1e6
+            print(f"{checkpoint:>9} {size_mb:>7.1f} MB | {legacy_ms:>9.2f} ms | {open_ms:>8.2f} ms "
+                  f"{tail_ms:>7.3f} ms {get_ms:>7.3f} ms | {sync_s:>10.2f} s {term_ms:>6.3f} ms {terms_ms:>6.3f} ms "
+                  f"{rare_ms:>8.3f} ms "
+                  f"{day_ms:>6.3f} ms | {save_ms:>6.1f} ms {save_one_ms:>6.2f} ms")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""End-to-end latency of the voice pipeline, from the end of the wake word to the action.
+
+The real main_loop() runs headless against stand-ins: a fake PyAudio whose input
+stream replays the corpus in real time, a fake Porcupine that fires on each
+file's labelled wake_end, a silent pyttsx3 engine that "speaks" at 160 words per
+minute, and the stub recognizer returning each file's transcript. Handlers run
+for real, so keep the transcripts to harmless commands.
+
+Per utterance, using the stage timings NovaVoice emits (see timed_stage):
+
+* wake          labelled wake_end -> wake word reported
+* prompt        continuation check (and the earcon or spoken prompt, if the user paused)
+* listen        start of listening -> end-of-speech (or early dispatch)
+* wake_to_listen  labelled wake_end -> listening starts
+* recognize     final recognition
+* match         dispatcher lookup
+* handler       cmd_* handler run time
+* tts_queue     first response queued -> starts speaking
+* wake_to_action, speech_to_action, speech_to_tts   end-to-end totals
+
+p50/p95/p99 per stage are printed and written to a JSON file; with --baseline a
+previous result file is compared and the exit status is 1 if any p95 regressed.
+
+    python benchmarks/bench_pipeline.py --output pipeline.json
+    python benchmarks/bench_pipeline.py --repeat 3 --baseline pipeline.json
+    python benchmarks/bench_pipeline.py --pause-ms 600 --prompt speech   # The user waits to be prompted
+"""
+import argparse
+import array
+import datetime
+import json
+import logging
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import wave
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+from corpus import SAMPLE_RATE, load_corpus, percentile, synthesize_corpus  # noqa: E402
+
+FRAME_LENGTH = 512 # Porcupine's frame length
+TTS_WORDS_PER_MINUTE = 160 # Same rate NovaVoice sets on the real engine
+# Commands without side effects outside the user data directory
+BENCH_TRANSCRIPTS = (
+    "what time is it", "what is today's date", "what's my battery level", "system information",
+    "what can you do", "help", "read my notes", "list apps", "can you tell me the time", "what's the date",
+)
+STAGES = ("wake", "prompt", "wake_to_listen", "listen", "recognize", "match", "handler", "tts_queue",
+          "wake_to_action", "speech_to_action", "speech_to_tts")
+
+
+# --- Stand-ins installed before NovaVoice is imported ---
+class FakeInputStream:
+    """What the fake PyAudio.open() returns: the replayed corpus, paced like a microphone."""
+
+    def __init__(self, source):
+        self.source = source
+        self.started = None # perf_counter() of the first read, i.e. when sample 0 "was spoken"
+
+    def read(self, num_frames, exception_on_overflow=False):
+        if self.started is None:
+            self.started = time.perf_counter()
+        return self.source.read(num_frames, exception_on_overflow)
+
+    def is_active(self):
+        return self.source.is_active()
+
+    def stop_stream(self):
+        self.source.stop_stream()
+
+    def close(self):
+        self.source.close()
+
+
+class FakeOutputStream:
+    """Takes the earcon and "plays" it in real time."""
+
+    def __init__(self, rate, channels):
+        self.bytes_per_second = rate * channels * 2
+
+    def write(self, data):
+        time.sleep(len(data) / self.bytes_per_second)
+
+    def close(self):
+        pass
+
+
+class FakePyAudio:
+    stream_factory = None # Set by the benchmark once NovaVoice (and WavReplaySource) is importable
+    last_stream = None
+
+    @staticmethod
+    def get_format_from_width(width):
+        return 8
+
+    def open(self, **kwargs):
+        if kwargs.get("output"):
+            return FakeOutputStream(kwargs["rate"], kwargs["channels"])
+        FakePyAudio.last_stream = FakeInputStream(FakePyAudio.stream_factory())
+        return FakePyAudio.last_stream
+
+    def get_sample_size(self, fmt):
+        return 2
+
+    def terminate(self):
+        pass
+
+
+class FakePorcupine:
+    """Fires when it is handed one of the wake frames, i.e. at each file's labelled wake_end."""
+    wake_frames = {} # frame samples (tuple) -> corpus position
+    detections = []
+
+    sample_rate = SAMPLE_RATE
+    frame_length = FRAME_LENGTH
+
+    def process(self, frame):
+        position = self.wake_frames.get(tuple(frame))
+        if position is None:
+            return -1
+        FakePorcupine.detections.append(position)
+        return 0
+
+    def delete(self):
+        pass
+
+
+class FakeTTSEngine:
+    def getProperty(self, name):
+        return [] if name == "voices" else None
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, text):
+        self._text, self._file = text, None
+
+    def save_to_file(self, text, path):
+        self._text, self._file = text, path
+
+    def runAndWait(self):
+        seconds = len(self._text.split()) * 60 / TTS_WORDS_PER_MINUTE
+        if self._file: # A silent clip as long as the speech would be
+            with wave.open(self._file, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(SAMPLE_RATE)
+                wav_file.writeframes(b"\0\0" * int(seconds * SAMPLE_RATE))
+        else:
+            time.sleep(seconds)
+
+
+def install_fakes():
+    fake_pyaudio = types.ModuleType("pyaudio")
+    fake_pyaudio.paInt16 = 8
+    fake_pyaudio.paInputOverflowed = -9981
+    fake_pyaudio.PyAudio = FakePyAudio
+    fake_porcupine = types.ModuleType("pvporcupine")
+    fake_porcupine.PorcupineError = type("PorcupineError", (Exception,), {})
+    fake_porcupine.create = lambda **kwargs: FakePorcupine()
+    fake_pyttsx3 = types.ModuleType("pyttsx3")
+    fake_pyttsx3.init = FakeTTSEngine
+    sys.modules.update(pyaudio=fake_pyaudio, pvporcupine=fake_porcupine, pyttsx3=fake_pyttsx3)
+
+
+# --- Replay stream ---
+def build_replay(items, repeat, wav_path):
+    """Concatenate the corpus into one WAV; return [(item, wake_end_s, speech_end_s, wake_seq)] in stream time."""
+    samples = array.array("h")
+    schedule = []
+    for _ in range(repeat):
+        for item in items:
+            offset = len(samples)
+            with wave.open(item.wav_path, "rb") as wav_file:
+                samples.frombytes(wav_file.readframes(wav_file.getnframes()))
+            wake_sample = offset + int(item.wake_end * SAMPLE_RATE)
+            schedule.append((item, wake_sample / SAMPLE_RATE, offset / SAMPLE_RATE + item.speech_end,
+                             wake_sample // FRAME_LENGTH + 1))
+
+    # The fake Porcupine recognises wake frames by content, so each must be unique in the stream
+    def frame_at(start):
+        return samples[start:start + FRAME_LENGTH].tobytes()
+
+    counts = Counter(frame_at(start) for start in range(0, len(samples) - FRAME_LENGTH + 1, FRAME_LENGTH))
+    for position, (_, _, _, wake_seq) in enumerate(schedule):
+        start = (wake_seq - 1) * FRAME_LENGTH
+        while counts[frame_at(start)] > 1:
+            counts[frame_at(start)] -= 1
+            samples[start] += 1 if samples[start] < 32767 else -1 # One LSB of dither, inaudible
+            counts[frame_at(start)] += 1
+        FakePorcupine.wake_frames[struct.unpack_from(f"{FRAME_LENGTH}h", samples, start * 2)] = position
+
+    with wave.open(wav_path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(samples.tobytes())
+    return schedule
+
+
+# --- Analysis ---
+def per_utterance(events, schedule, stream_started):
+    """Split the recorded stage events at each wake and turn them into one row of stage timings per utterance."""
+    events = sorted(events, key=lambda event: event[1])
+    rows = []
+    wakes = [event for event in events if event[0] == "wake"]
+    for index, (_, wake_at, _, fields) in enumerate(wakes):
+        position = next((p for p, entry in enumerate(schedule) if entry[3] == fields["seq"]), None)
+        if position is None:
+            continue
+        item, wake_end_s, speech_end_s, _ = schedule[position]
+        until = wakes[index + 1][1] if index + 1 < len(wakes) else float("inf")
+        mine = [event for event in events if wake_at <= event[1] < until and event[0] != "wake"]
+        row = {"file": item.name, "transcript": item.transcript,
+               "wake": (wake_at - (stream_started + wake_end_s)) * 1000}
+        for stage, started, ended, stage_fields in mine:
+            if stage in ("prompt", "listen", "recognize", "match", "handler") and stage not in row:
+                row[stage] = (ended - started) * 1000
+                if stage == "handler":
+                    row["command"] = stage_fields.get("command")
+                    row["wake_to_action"] = (started - (stream_started + wake_end_s)) * 1000
+                    row["speech_to_action"] = (started - (stream_started + speech_end_s)) * 1000
+                elif stage == "listen":
+                    row["early"] = bool(stage_fields.get("early"))
+                    row["wake_to_listen"] = (started - (stream_started + wake_end_s)) * 1000
+                elif stage == "prompt":
+                    row["prompted"] = "earcon" if stage_fields.get("earcon") else "speech" if stage_fields.get("spoken") else None
+            elif stage == "tts_start" and "tts_queue" not in row:
+                row["tts_queue"] = (ended - started) * 1000
+                row["speech_to_tts"] = (ended - (stream_started + speech_end_s)) * 1000
+        rows.append(row)
+    return rows
+
+
+def summarize(rows):
+    summary = {}
+    for stage in STAGES:
+        values = [row[stage] for row in rows if stage in row]
+        if values:
+            summary[stage] = {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+                              "p99": percentile(values, 99), "mean": sum(values) / len(values), "max": max(values)}
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(summary, baseline_path, tolerance):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["stages"]
+    regressed = []
+    print(f"\nAgainst {baseline_path} (p95, tolerance {tolerance:.0%} or 10 ms):")
+    for stage, stats in summary.items():
+        if stage not in baseline:
+            continue
+        before, after = baseline[stage]["p95"], stats["p95"]
+        limit = max(before * (1 + tolerance), before + 10)
+        flag = "REGRESSED" if after > limit else ""
+        if flag:
+            regressed.append(stage)
+        print(f"  {stage:<17} {before:8.1f} -> {after:8.1f} ms  {flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of WAV + JSON files with wake_end labels (default: synthesize)")
+    parser.add_argument("--repeat", type=int, default=1, help="times to replay the corpus (more samples for p99)")
+    parser.add_argument("--no-streaming", action="store_true", help="recognize after end-of-speech instead")
+    parser.add_argument("--no-early-dispatch", action="store_true", help="never act on partial transcripts")
+    parser.add_argument("--prompt", choices=("earcon", "speech"), default="earcon",
+                        help="how the user is prompted after pausing at the wake word (NOVA_PROMPT)")
+    parser.add_argument("--pause-ms", type=int, default=150,
+                        help="silence between wake word and command in the synthetic corpus; over 250 ms gets a prompt")
+    parser.add_argument("--output", default="bench_pipeline.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier results file to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown vs. the baseline")
+    parser.add_argument("--verbose", action="store_true", help="show NovaVoice's log output")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory(prefix="novavoice-pipeline-")
+    # Caches, notes and settings go to a throwaway data directory; no .env or hardware is needed
+    os.environ["LOCALAPPDATA"] = tmp.name
+    os.environ["NOVA_STREAMING"] = "0" if args.no_streaming else "1"
+    os.environ["NOVA_EARLY_DISPATCH"] = "0" if args.no_early_dispatch else "1"
+    os.environ["NOVA_RECOGNIZER"] = "stub"
+    os.environ["NOVA_FOLLOWUP_SECONDS"] = "0" # Every utterance starts with its own wake word
+    os.environ["NOVA_PROMPT"] = args.prompt
+    install_fakes()
+    # Configured first, so NovaVoice's own basicConfig() leaves it alone
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    import NovaVoice
+
+    if args.corpus:
+        items = load_corpus(args.corpus)
+        if any(item.wake_end is None for item in items):
+            parser.error("every corpus file needs a wake_end label")
+    else:
+        corpus_dir = os.path.join(tmp.name, "corpus")
+        os.makedirs(corpus_dir)
+        items = synthesize_corpus(corpus_dir, BENCH_TRANSCRIPTS, with_wake_word=True, noise=100, pause_ms=args.pause_ms)
+    replay_path = os.path.join(tmp.name, "replay.wav")
+    schedule = build_replay(items, args.repeat, replay_path)
+
+    events = []
+    events_lock = threading.Lock()
+
+    def record(stage, started, ended, fields):
+        with events_lock:
+            events.append((stage, started, ended, dict(fields)))
+
+    FakePyAudio.stream_factory = lambda: NovaVoice.WavReplaySource([replay_path])
+    NovaVoice.PORCUPINE_ACCESS_KEY = "benchmark"
+    NovaVoice.WAKE_WORD_PPN = replay_path # Only has to exist; the fake Porcupine never reads it
+    NovaVoice.recognizer_backend = NovaVoice.StubRecognizerBackend([entry[0].transcript for entry in schedule])
+    NovaVoice.morning_greeting = lambda: None # Keep the scheduler quiet
+    NovaVoice.stage_listeners.append(record)
+
+    total_s = schedule[-1][2] + 2.5
+    print(f"Replaying {len(schedule)} utterances ({total_s:.0f} s of audio in real time)...")
+    NovaVoice.main_loop()
+    NovaVoice.speak_and_wait("", timeout=30) # Queued last, so everything before it has been spoken
+    NovaVoice.stage_listeners.remove(record)
+
+    rows = per_utterance(events, schedule, FakePyAudio.last_stream.started)
+    summary = summarize(rows)
+    prompted = Counter(row["prompted"] for row in rows if row.get("prompted"))
+    print(f"\n{len(rows)}/{len(schedule)} wake words detected, "
+          f"{sum(1 for row in rows if 'handler' in row)} commands handled"
+          + (f", prompted by {', '.join(f'{kind} {count}x' for kind, count in prompted.items())}" if prompted else ""))
+    print(f"{'stage':<17} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}   (ms, n)")
+    for stage, stats in summary.items():
+        print(f"{stage:<17} {stats['p50']:8.1f} {stats['p95']:8.1f} {stats['p99']:8.1f} {stats['max']:8.1f}   "
+              f"n={stats['count']}")
+
+    result = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "config": {"streaming": not args.no_streaming, "early_dispatch": not args.no_early_dispatch,
+                   "prompt": args.prompt, "pause_ms": args.pause_ms,
+                   "vad": NovaVoice.VAD_ENABLED, "vad_hangover_ms": NovaVoice.VAD_HANGOVER_MS,
+                   "corpus": args.corpus or "synthetic", "utterances": len(schedule)},
+        "stages": summary,
+        "utterances": rows,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    regressed = compare(summary, args.baseline, args.tolerance) if args.baseline else []
+    tmp.cleanup()
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
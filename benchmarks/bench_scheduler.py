@@ -0,0 +1,79 @@
+"""Timer scheduler: how late timers fire and how often the thread wakes, as the number of timers grows.
+
+Arms --timers timers spread over --spread seconds (a mix of monotonic, wall-clock and
+cancelled ones), then measures firing lateness, the cost of arming and cancelling, and
+the wakeups per fired timer. Last, with the timers all days away, counts idle wakeups;
+the old scheduler loop woke every 30 seconds whether anything was due or not.
+
+    python benchmarks/bench_scheduler.py --timers 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+from corpus import percentile  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timers", type=int, nargs="+", default=[1000, 10000, 100000], help="timers to arm")
+    parser.add_argument("--spread", type=float, default=2.0, help="seconds the deadlines are spread over")
+    parser.add_argument("--idle", type=float, default=3.0, help="seconds to count idle wakeups for")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    print(f"{'timers':>7} | {'arm':>9} {'cancel':>9} | {'fired':>7} {'wakeups':>8} | {'late p50':>9} {'p99':>8} {'max':>8} "
+          f"| {'idle wakeups':>12}")
+    for count in args.timers:
+        scheduler = NovaVoice.TimerScheduler()
+        scheduler.start()
+        lateness, done = [], threading.Event()
+        expected = count - count // 10 # Every tenth timer is cancelled
+
+        def fire(deadline):
+            lateness.append((time.monotonic() - deadline) * 1000)
+            if len(lateness) == expected:
+                done.set()
+
+        start = time.monotonic() + 0.5 + count * 2e-5 # Nothing is due before arming and cancelling finish
+        timers = []
+        started = time.perf_counter()
+        for i in range(count):
+            deadline = start + rng.random() * args.spread
+            if i % 2: # Half by the wall clock, as reminders are
+                wall = time.time() + (deadline - time.monotonic())
+                timers.append(scheduler.call_at(wall, lambda d=deadline: fire(d)))
+            else:
+                timers.append(scheduler.call_later(deadline - time.monotonic(), lambda d=deadline: fire(d)))
+        arm_us = (time.perf_counter() - started) / count * 1e6
+        started = time.perf_counter()
+        for timer in timers[::10]:
+            scheduler.cancel(timer)
+        cancel_us = (time.perf_counter() - started) / len(timers[::10]) * 1e6
+        if not done.wait(args.spread + 30):
+            print(f"FAIL: only {len(lateness)} of {expected} timers fired")
+        time.sleep(0.2)
+        if len(lateness) != expected:
+            print(f"FAIL: {len(lateness)} timers fired, expected {expected}")
+        busy_wakeups = scheduler.wakeups
+
+        for _ in range(count): # Idle: everything is days away
+            scheduler.call_at(time.time() + 86400 * (2 + rng.random()), lambda: None)
+        time.sleep(0.1)
+        before = scheduler.wakeups
+        time.sleep(args.idle)
+        idle = scheduler.wakeups - before
+        scheduler.stop()
+        print(f"{count:>7} | {arm_us:>6.1f} us {cancel_us:>6.2f} us | {len(lateness):>7} {busy_wakeups:>8} | "
+              f"{statistics.median(lateness):>6.2f} ms {percentile(lateness, 99):>5.2f} ms {max(lateness):>5.2f} ms "
+              f"| {idle:>4} in {args.idle:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""TTS clip cache: time to first audio for cached vs. live-synthesized replies, and cache lookup cost.
+
+A fake pyttsx3 engine stands in for the platform voice: it takes --synth-ms before any
+audio comes out, then "speaks" in real time, and save_to_file() writes a 22 kHz clip of
+the same length. A fake output device records when the first cached frame is written.
+The session replays a mix of fixed replies (warmed at startup) and one-off text, then
+times TTSClipCache.get() from memory and from disk and checks the budgets are kept.
+
+    python benchmarks/bench_tts_cache.py --synth-ms 250 --messages 200
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+import wave
+
+DATA_DIR = tempfile.mkdtemp(prefix="novavoice-tts-cache-")
+os.environ["LOCALAPPDATA"] = DATA_DIR # Keep the real clips out of this
+
+CLIP_RATE = 22050 # What SAPI5 writes by default
+WORDS_PER_MINUTE = 160
+first_audio = [] # perf_counter() when each message became audible
+
+
+class FakeEngine:
+    synth_seconds = 0.25
+
+    def getProperty(self, name):
+        return {"voices": [], "voice": "fake-voice", "rate": 160}.get(name)
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, text):
+        self._text, self._file = text, None
+
+    def save_to_file(self, text, path):
+        self._text, self._file = text, path
+
+    def runAndWait(self):
+        seconds = len(self._text.split()) * 60 / WORDS_PER_MINUTE
+        time.sleep(FakeEngine.synth_seconds) # Rendering takes as long as it does before live speech starts
+        if self._file:
+            with wave.open(self._file, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(CLIP_RATE)
+                wav_file.writeframes(b"\0\0" * int(seconds * CLIP_RATE))
+        else:
+            first_audio.append(time.perf_counter())
+            time.sleep(seconds)
+
+
+class FakeOutputStream:
+    def __init__(self, rate, channels):
+        self.bytes_per_second = rate * channels * 2
+        self.started = False
+
+    def write(self, data):
+        if not self.started:
+            self.started = True
+            first_audio.append(time.perf_counter())
+        time.sleep(len(data) / self.bytes_per_second)
+
+    def close(self):
+        pass
+
+
+class FakePyAudio:
+    @staticmethod
+    def get_format_from_width(width):
+        return 8
+
+    def open(self, rate, channels, **kwargs):
+        return FakeOutputStream(rate, channels)
+
+
+fake_pyttsx3 = types.ModuleType("pyttsx3")
+fake_pyttsx3.init = FakeEngine
+sys.modules["pyttsx3"] = fake_pyttsx3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+from corpus import percentile  # noqa: E402
+
+
+class OneShotStreams(dict):
+    # A new fake stream per message, so each one reports its own first write
+    def get(self, key, default=None):
+        return None
+
+
+def speak_session(worker, messages, rng):
+    fixed = list(NovaVoice.TTS_WARM_PHRASES)
+    latencies = {"cached": [], "live": []}
+    for _ in range(messages):
+        if rng.random() < 0.7:
+            text = rng.choice(fixed)
+        else:
+            text = f"It's {rng.randint(1, 12)}:{rng.randint(0, 59):02d} {rng.choice(('AM', 'PM'))}."
+        key = worker.clip_cache.key(text, "fake-voice", 160)
+        cached = worker.clip_cache.has(key)
+        del first_audio[:]
+        started = time.perf_counter()
+        worker.say(text).result(30)
+        latencies["cached" if cached else "live"].append((first_audio[0] - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--synth-ms", type=float, default=250.0,
+                        help="fake engine delay before live speech starts (and per rendered clip)")
+    parser.add_argument("--messages", type=int, default=200, help="replies spoken in the session")
+    parser.add_argument("--clips", type=int, default=300, help="clips for the lookup and budget test")
+    parser.add_argument("--memory-mb", type=float, default=4.0, help="memory budget for the lookup test")
+    args = parser.parse_args()
+    FakeEngine.synth_seconds = args.synth_ms / 1000
+    rng = random.Random(7)
+
+    try:
+        worker = NovaVoice.TTSWorker(NovaVoice.TTSClipCache(os.path.join(DATA_DIR, "session")))
+        worker.start()
+        worker._streams = OneShotStreams()
+        worker.attach_output(FakePyAudio())
+        started = time.perf_counter()
+        queued = worker.warm(NovaVoice.TTS_WARM_PHRASES)
+        while worker._rendering:
+            time.sleep(0.01)
+        print(f"warmed {queued} phrases in {time.perf_counter() - started:.1f} s "
+              f"({args.synth_ms:.0f} ms synthesis each)")
+
+        latencies = speak_session(worker, args.messages, rng)
+        print(f"\n{'time to first audio':<22} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for kind, samples in latencies.items():
+            if samples:
+                print(f"{kind:<22} {len(samples):>5} {statistics.median(samples):>6.1f} ms "
+                      f"{percentile(samples, 95):>6.1f} ms {percentile(samples, 99):>6.1f} ms")
+
+        # Lookups with clips of 0.5 to 5 seconds, more of them than the memory budget holds
+        cache = NovaVoice.TTSClipCache(os.path.join(DATA_DIR, "lookup"), memory_budget=int(args.memory_mb * 1e6),
+                                       disk_budget=int(args.memory_mb * 4e6))
+        os.makedirs(cache.directory)
+        keys = []
+        for i in range(args.clips):
+            path = os.path.join(cache.directory, "render.wav")
+            with wave.open(path, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(CLIP_RATE)
+                wav_file.writeframes(b"\0\0" * int(rng.uniform(0.5, 5.0) * CLIP_RATE))
+            keys.append(cache.key(f"clip {i}", "fake-voice", 160))
+            cache.add(keys[-1], path)
+        on_disk = sum(os.path.getsize(os.path.join(cache.directory, name)) for name in os.listdir(cache.directory))
+        kept = [key for key in keys if cache.has(key)]
+        memory_ms = []
+        for _ in range(2000):
+            key = kept[-1]
+            lookup_started = time.perf_counter()
+            cache.get(key)
+            memory_ms.append((time.perf_counter() - lookup_started) * 1000)
+        disk_ms = []
+        for key in kept[:50]: # The oldest kept clips were evicted from memory long ago
+            lookup_started = time.perf_counter()
+            cache.get(key)
+            disk_ms.append((time.perf_counter() - lookup_started) * 1000)
+        print(f"\n{args.clips} clips: {len(kept)} kept on disk ({on_disk / 1e6:.1f} MB, budget {cache.disk_budget / 1e6:.0f} MB), "
+              f"{len(cache._clips)} in memory ({cache._memory_bytes / 1e6:.1f} MB, budget {cache.memory_budget / 1e6:.0f} MB)")
+        print(f"get() from memory: p50 {statistics.median(memory_ms) * 1000:.1f} us, "
+              f"p99 {percentile(memory_ms, 99) * 1000:.1f} us")
+        print(f"get() from disk:   p50 {statistics.median(disk_ms):.2f} ms, p99 {percentile(disk_ms, 99):.2f} ms")
+        failed = on_disk > cache.disk_budget or cache._memory_bytes > cache.memory_budget
+        if failed:
+            print("FAIL: a budget was exceeded")
+        sys.exit(1 if failed else 0)
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
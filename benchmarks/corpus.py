@@ -0,0 +1,116 @@
+"""Replay corpus helpers shared by the benchmarks.
+
+A corpus is a directory of 16 kHz mono 16-bit WAV files, each with a sidecar
+``<name>.json`` describing it:
+
+    {"transcript": "what time is it", "wake_end": 0.9, "speech_end": 2.3}
+
+``wake_end`` (seconds) is where the wake word finishes, if the file contains one;
+``speech_end`` is where the command speech finishes. Without a corpus directory
+the benchmarks synthesize one: each word is a 250 ms voiced burst (a harmonic
+series, so it looks like speech to the VAD) followed by a 50 ms gap, optionally
+over broadband background noise.
+"""
+import json
+import math
+import os
+import random
+import struct
+import wave
+
+SAMPLE_RATE = 16000
+WORD_MS = 300 # 250 ms burst + 50 ms gap per synthetic word
+
+DEFAULT_TRANSCRIPTS = (
+    "what time is it", "what's my battery level", "what is today's date", "system information",
+    "what can you do", "mute the system", "list apps", "open chrome", "take a note buy milk",
+    "help",
+)
+
+
+class CorpusItem:
+    def __init__(self, name, wav_path, transcript, wake_end=None, speech_end=None):
+        self.name = name
+        self.wav_path = wav_path
+        self.transcript = transcript
+        self.wake_end = wake_end
+        self.speech_end = speech_end
+
+
+def load_corpus(directory):
+    items = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.lower().endswith(".wav"):
+            continue
+        wav_path = os.path.join(directory, file_name)
+        with open(os.path.splitext(wav_path)[0] + ".json", "r", encoding="utf-8") as f:
+            labels = json.load(f)
+        items.append(CorpusItem(os.path.splitext(file_name)[0], wav_path, labels["transcript"],
+                                labels.get("wake_end"), labels.get("speech_end")))
+    return items
+
+
+def _burst(rng, milliseconds, amplitude):
+    # Voiced "syllable": decaying harmonics of a random pitch with 10 ms fades
+    count = SAMPLE_RATE * milliseconds // 1000
+    fade = SAMPLE_RATE // 100
+    f0 = rng.uniform(110, 220)
+    phases = [rng.uniform(0, 2 * math.pi) for _ in range(8)]
+    samples = []
+    for n in range(count):
+        t = n / SAMPLE_RATE
+        value = sum(math.sin(2 * math.pi * f0 * k * t + phases[k - 1]) / k for k in range(1, 9))
+        envelope = min(1.0, n / fade, (count - n) / fade)
+        samples.append(amplitude * 0.4 * value * envelope)
+    return samples
+
+
+def _silence(milliseconds):
+    return [0.0] * (SAMPLE_RATE * milliseconds // 1000)
+
+
+def synthesize_corpus(directory, transcripts=DEFAULT_TRANSCRIPTS, with_wake_word=False, noise=0, seed=7, pause_ms=150):
+    """Write synthetic WAV + JSON pairs into directory and return them as CorpusItems.
+
+    noise is the peak amplitude of uniform background noise added everywhere (0 for a silent room).
+    pause_ms is the silence between the wake word and the command.
+    """
+    rng = random.Random(seed)
+    items = []
+    for index, transcript in enumerate(transcripts):
+        samples = _silence(200)
+        wake_end = None
+        if with_wake_word: # Two "words" standing in for "hey google"
+            for _ in range(2):
+                samples += _burst(rng, 250, 6000) + _silence(50)
+            wake_end = len(samples) / SAMPLE_RATE
+            samples += _silence(pause_ms)
+        for _ in transcript.split():
+            samples += _burst(rng, 250, 6000) + _silence(50)
+        speech_end = (len(samples) - SAMPLE_RATE * 50 // 1000) / SAMPLE_RATE
+        samples += _silence(1500)
+        if noise:
+            samples = [sample + rng.uniform(-noise, noise) for sample in samples]
+        samples = [max(-32768, min(32767, int(sample))) for sample in samples]
+
+        name = f"{index:02d}_{transcript.replace(' ', '_').replace(chr(39), '')}"
+        wav_path = os.path.join(directory, name + ".wav")
+        with wave.open(wav_path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+        with open(os.path.join(directory, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump({"transcript": transcript, "wake_end": wake_end, "speech_end": speech_end}, f)
+        items.append(CorpusItem(name, wav_path, transcript, wake_end, speech_end))
+    return items
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
@@ -0,0 +1,103 @@
+"""Evaluate end-of-utterance endpointing on labelled WAV files.
+
+For each file, the VAD endpointer (vad_segment) and, for reference, speech_recognition's
+energy-threshold Recognizer.listen() are run over the audio after the wake word.
+Reported per method:
+
+* endpoint latency: how long after the labelled speech_end the end-of-speech decision is made
+* truncation rate: share of files whose captured audio stops before speech_end
+
+    python benchmarks/eval_vad.py                         # synthetic corpus at several noise levels
+    python benchmarks/eval_vad.py --corpus DIR --hangover 200 300 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+from corpus import load_corpus, percentile, synthesize_corpus  # noqa: E402
+from bench_early_dispatch import FRAME_LENGTH, fill_ring  # noqa: E402
+
+TRUNCATION_TOLERANCE_MS = 20
+PHRASE_TIME_LIMIT = 10.0
+
+
+def start_seq(item):
+    # Endpointing starts where handle_command would start listening: after the wake word
+    return int((item.wake_end or 0.0) * NovaVoice.AUDIO_SAMPLE_RATE / FRAME_LENGTH)
+
+
+def run_vad(item, hangover_ms):
+    cursor = fill_ring(item.wav_path).cursor(start_seq(item))
+    offset_ms = cursor.seq * FRAME_LENGTH / NovaVoice.AUDIO_SAMPLE_RATE * 1000
+    vad = NovaVoice.VoiceActivityDetector(hangover_ms=hangover_ms)
+    decided_ms = None
+    for _, heard_ms in NovaVoice.vad_segment(cursor, timeout=5.0, phrase_time_limit=PHRASE_TIME_LIMIT, vad=vad):
+        decided_ms = offset_ms + heard_ms
+    return decided_ms, decided_ms # The segment ends on the frame where the decision was made
+
+
+def run_energy_listen(item):
+    recognizer = NovaVoice.sr.Recognizer() # Fresh defaults, as a baseline
+    cursor = fill_ring(item.wav_path).cursor(start_seq(item))
+    offset_ms = cursor.seq * FRAME_LENGTH / NovaVoice.AUDIO_SAMPLE_RATE * 1000
+    first_seq = cursor.seq
+    with NovaVoice.RingBufferSource(cursor, FRAME_LENGTH) as source:
+        try:
+            recognizer.listen(source, timeout=5.0, phrase_time_limit=PHRASE_TIME_LIMIT)
+        except NovaVoice.sr.WaitTimeoutError:
+            return None, None
+    decided_ms = offset_ms + (cursor.seq - first_seq) * FRAME_LENGTH / NovaVoice.AUDIO_SAMPLE_RATE * 1000
+    # listen() drops trailing non-speech buffers, so captured audio ends before the decision point
+    trailing_ms = (recognizer.pause_threshold - recognizer.non_speaking_duration) * 1000
+    return decided_ms, decided_ms - trailing_ms
+
+
+def summarize(label, items, results):
+    latencies, truncated, missed = [], 0, 0
+    for item, (decided_ms, captured_end_ms) in zip(items, results):
+        if decided_ms is None:
+            missed += 1
+            continue
+        speech_end_ms = item.speech_end * 1000
+        latencies.append(decided_ms - speech_end_ms)
+        if captured_end_ms < speech_end_ms - TRUNCATION_TOLERANCE_MS:
+            truncated += 1
+    if latencies:
+        print(f"  {label:<22} latency p50 {percentile(latencies, 50):6.0f} ms | p95 {percentile(latencies, 95):6.0f} ms "
+              f"| max {max(latencies):6.0f} ms | truncated {truncated}/{len(items)} | no onset {missed}")
+    else:
+        print(f"  {label:<22} no utterances detected ({missed} files)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of labelled WAV + JSON files (default: synthesize)")
+    parser.add_argument("--noise", type=int, nargs="+", default=[0, 300, 1000, 2000],
+                        help="background noise amplitudes for the synthetic corpus")
+    parser.add_argument("--hangover", type=int, nargs="+", default=[NovaVoice.VAD_HANGOVER_MS],
+                        help="VAD hangover values (ms) to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="novavoice-vad-") as tmp_dir:
+        if args.corpus:
+            corpora = [(args.corpus, load_corpus(args.corpus))]
+        else:
+            corpora = []
+            for noise in args.noise:
+                noise_dir = os.path.join(tmp_dir, f"noise{noise}")
+                os.makedirs(noise_dir)
+                corpora.append((f"synthetic, noise amplitude {noise}",
+                                synthesize_corpus(noise_dir, with_wake_word=True, noise=noise)))
+
+        for corpus_label, items in corpora:
+            print(f"{corpus_label} ({len(items)} files)")
+            for hangover_ms in args.hangover:
+                summarize(f"VAD hangover {hangover_ms} ms", items, [run_vad(item, hangover_ms) for item in items])
+            summarize("energy listen()", items, [run_energy_listen(item) for item in items])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Stress the executable cache with many concurrent launches.
+
+Threads launch apps through launch_executable_async (cache hits, misses that run the
+filesystem search and store the result, stale entries whose file was deleted) while
+others put/discard entries directly and a reader keeps parsing exe_cache.json.
+Checks that the file always parses, ends up equal to the in-memory cache, respects
+the LRU limit, and reports cache lookup latency and how many writes were batched.
+
+    python benchmarks/stress_exe_cache.py --threads 32 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+DATA_DIR = tempfile.mkdtemp(prefix="novavoice-exe-cache-")
+os.environ["LOCALAPPDATA"] = DATA_DIR # Keep the real cache and index files out of this
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+
+
+def fake_startfile(path):
+    # Like the real one, a missing file fails the launch
+    if not os.path.isfile(path):
+        raise FileNotFoundError(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32, help="concurrent launcher threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="how long to run")
+    parser.add_argument("--apps", type=int, default=400, help="distinct executables on disk")
+    parser.add_argument("--max-entries", type=int, default=256, help="cache LRU limit")
+    args = parser.parse_args()
+
+    bin_dir = os.path.join(DATA_DIR, "bin")
+    os.makedirs(bin_dir)
+    apps = [f"app{i:04d}.exe" for i in range(args.apps)]
+    for app in apps:
+        with open(os.path.join(bin_dir, app), "wb") as f:
+            f.write(b"MZ")
+
+    cache_file = os.path.join(DATA_DIR, "exe_cache.json")
+    with open(cache_file, "w", encoding="utf-8") as f: # Start from the old {name: path} format
+        json.dump({app: os.path.join(bin_dir, app) for app in apps[:50]}, f)
+
+    cache = NovaVoice.ExeCache(cache_file, max_entries=args.max_entries, flush_delay=0.05, validate_interval=0.5)
+    NovaVoice.exe_cache = cache
+    NovaVoice.SEARCH_PATHS = [bin_dir] # Misses are found by a real (small) search
+    NovaVoice.speak = lambda text, urgent=False: None
+    NovaVoice.os.startfile = fake_startfile
+
+    stop = threading.Event()
+    get_us, errors, counts = [], [], {"launches": 0, "puts": 0, "discards": 0, "reads": 0, "deleted": 0}
+    count_lock = threading.Lock()
+
+    def launcher(seed):
+        rng = random.Random(seed)
+        local_get_us, launches, puts, discards = [], 0, 0, 0
+        try:
+            while not stop.is_set():
+                app = rng.choice(apps)
+                roll = rng.random()
+                if roll < 0.6:
+                    NovaVoice.launch_executable_async(app, app[:-4])
+                    launches += 1
+                elif roll < 0.9:
+                    started = time.perf_counter()
+                    cache.get(app)
+                    local_get_us.append((time.perf_counter() - started) * 1e6)
+                elif roll < 0.97:
+                    cache.put(app, os.path.join(bin_dir, app))
+                    puts += 1
+                else:
+                    cache.discard(app)
+                    discards += 1
+        except Exception as e:
+            errors.append(f"launcher: {e!r}")
+        with count_lock:
+            get_us.extend(local_get_us)
+            counts["launches"] += launches
+            counts["puts"] += puts
+            counts["discards"] += discards
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if not isinstance(data, dict):
+                    errors.append("exe_cache.json is not an object")
+                counts["reads"] += 1
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                errors.append(f"torn exe_cache.json: {e}")
+
+    def deleter():
+        # Uninstall a few apps mid-run so validation and failed launches drop their entries
+        rng = random.Random(1)
+        for app in rng.sample(apps, 20):
+            if stop.wait(args.seconds / 25):
+                break
+            os.remove(os.path.join(bin_dir, app))
+            counts["deleted"] += 1
+
+    threads = [threading.Thread(target=launcher, args=(i,)) for i in range(args.threads)]
+    threads += [threading.Thread(target=reader), threading.Thread(target=deleter)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    time.sleep(1.0) # Let in-flight searches and validations finish
+    cache.flush()
+
+    with open(cache_file, "r", encoding="utf-8") as f:
+        on_disk = json.load(f)
+    in_memory = {key: entry for key, entry in cache._entries.items()}
+    if on_disk != in_memory:
+        errors.append(f"exe_cache.json ({len(on_disk)} entries) differs from memory ({len(in_memory)})")
+    if len(in_memory) > args.max_entries:
+        errors.append(f"{len(in_memory)} entries exceed the limit of {args.max_entries}")
+    for key in cache.names():
+        cache.validate(key)
+    gone = [key for key, (path, _, _) in cache._entries.items() if not os.path.isfile(path)]
+    if gone:
+        errors.append(f"{len(gone)} entries still point at deleted files after validation")
+
+    changes = counts["puts"] + counts["discards"]
+    print(f"{args.threads} threads for {elapsed:.1f}s: {counts['launches']} launches, {counts['puts']} puts, "
+          f"{counts['discards']} discards, {counts['deleted']} apps deleted")
+    print(f"cache.get(): p50 {statistics.median(get_us):.1f} us, p99 {sorted(get_us)[int(len(get_us) * 0.99)]:.1f} us "
+          f"over {len(get_us)} calls")
+    print(f"exe_cache.json: {cache.flushes} writes for {changes}+ changes, parsed {counts['reads']} times by a reader, "
+          f"{len(on_disk)} entries at the end")
+    stale = sum(v for k, v in NovaVoice.metrics.counters().items() if "exe_cache_lookups_total" in k and "stale" in k)
+    print(f"stale entries dropped: {stale:.0f}")
+    for error in errors[:10]:
+        print(f"FAIL: {error}")
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Answers to "When should I remind you?" are worded like the times parse_reminder reads.
+
+    python -m pytest tests
+"""
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="novavoice-tests-") # Keep the real reminders out of this
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import NovaVoice  # noqa: E402
+
+NOW = datetime.datetime(2026, 10, 16, 10, 0) # A Friday morning
+
+
+class ReminderTimeAnswerTest(unittest.TestCase):
+    def due(self, answer):
+        parsed = NovaVoice.parse_reminder(f"remind me to stretch {NovaVoice.reminder_time_answer(answer)}", now=NOW)
+        self.assertIsNotNone(parsed, answer)
+        due, subject = parsed
+        self.assertEqual(subject, "stretch", answer)
+        return due
+
+    def test_bare_times(self):
+        self.assertEqual(self.due("5 pm"), NOW.replace(hour=17))
+        self.assertEqual(self.due("5 PM."), NOW.replace(hour=17))
+        self.assertEqual(self.due("5:30"), NOW.replace(hour=17, minute=30))
+        self.assertEqual(self.due("noon"), NOW.replace(hour=12))
+        self.assertEqual(self.due("midnight"), datetime.datetime(2026, 10, 17, 0, 0))
+
+    def test_spoken_numbers(self):
+        self.assertEqual(self.due("five o'clock"), NOW.replace(hour=17))
+        self.assertEqual(self.due("five thirty pm"), NOW.replace(hour=17, minute=30))
+        self.assertEqual(self.due("eleven forty five"), NOW.replace(hour=11, minute=45))
+
+    def test_bare_durations(self):
+        self.assertEqual(self.due("ten minutes"), NOW + datetime.timedelta(minutes=10))
+        self.assertEqual(self.due("20 minutes"), NOW + datetime.timedelta(minutes=20))
+        self.assertEqual(self.due("an hour"), NOW + datetime.timedelta(hours=1))
+
+    def test_day_and_time(self):
+        self.assertEqual(self.due("tomorrow 9 am"), datetime.datetime(2026, 10, 17, 9, 0))
+        self.assertEqual(self.due("monday at 8"), datetime.datetime(2026, 10, 19, 8, 0))
+
+    def test_already_worded_answers_are_unchanged(self):
+        for answer in ("at 5 pm", "in ten minutes", "tomorrow at noon"):
+            self.assertEqual(NovaVoice.reminder_time_answer(answer), answer)
+
+    def test_no_time_is_still_no_time(self):
+        self.assertIsNone(NovaVoice.parse_reminder(
+            f"remind me to stretch {NovaVoice.reminder_time_answer('later')}", now=NOW))
+
+
+class ReminderFollowupTest(unittest.TestCase):
+    def setUp(self):
+        NovaVoice.compound_part.replies = [] # speak() collects instead of talking
+        NovaVoice.followup_state.pending = None
+        self.addCleanup(setattr, NovaVoice.compound_part, "replies", None)
+        self.addCleanup(setattr, NovaVoice.followup_state, "pending", None)
+
+    def answer(self, command, answer):
+        with mock.patch.object(NovaVoice, "FOLLOWUP_SECONDS", 5), \
+                mock.patch.object(NovaVoice.reminders, "add") as add:
+            NovaVoice.cmd_set_reminder(command)
+            question, on_answer = NovaVoice.followup_state.pending
+            self.assertIn("When should I remind you", question)
+            NovaVoice.followup_state.pending = None
+            on_answer(answer)
+        self.assertIsNone(NovaVoice.followup_state.pending, f"asked again after '{answer}'")
+        return add
+
+    def test_answers_set_the_reminder(self):
+        for answer in ("5 pm", "ten minutes", "noon"):
+            with self.subTest(answer=answer):
+                add = self.answer("remind me to stretch", answer)
+                add.assert_called_once()
+                self.assertEqual(add.call_args.args[2], "stretch")
+
+    def test_answer_completes_a_routine(self):
+        add = self.answer("remind me every day to drink water", "8 am")
+        add.assert_called_once()
+        self.assertEqual(add.call_args.kwargs["repeat"], {"days": list(range(7)), "time": "08:00"})
+
+
+if __name__ == "__main__":
+    unittest.main()